@@ -0,0 +1,220 @@
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# IVF 기본 설정
+DEFAULT_NPROBE = 16
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLES_PER_LIST = 32
+ASSIGN_BATCH_SIZE = 8192
+
+
+def suggest_nlist(n_vectors: int) -> int:
+    """벡터 수에 맞는 클러스터 수 (대략 sqrt(n))"""
+    return int(min(4096, max(16, np.sqrt(n_vectors))))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BATCH_SIZE):
+        batch = np.asarray(vectors[start:start + ASSIGN_BATCH_SIZE], dtype=np.float32)
+        assignments[start:start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """정규화된 벡터용 k-means (코사인 유사도 기준), 중심점 행렬 반환"""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(vectors))
+    centroids = np.array(vectors[rng.choice(len(vectors), nlist, replace=False)], dtype=np.float32)
+
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        counts = np.bincount(assignments, minlength=nlist)
+        order = np.argsort(assignments, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        nonempty = np.flatnonzero(counts)
+        sums[nonempty] = np.add.reduceat(vectors[order], starts[nonempty], axis=0)
+
+        # 빈 클러스터는 임의의 벡터로 다시 시작
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+def sample_vectors(vectors: np.ndarray, rows: np.ndarray, nlist: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """k-means 학습용 표본 벡터 복사본 (클러스터당 KMEANS_SAMPLES_PER_LIST개)"""
+    nlist = nlist or suggest_nlist(len(rows))
+    sample_size = min(len(rows), nlist * KMEANS_SAMPLES_PER_LIST)
+    sample_rows = np.sort(np.random.default_rng(seed).choice(rows, sample_size, replace=False))
+    return np.array(vectors[sample_rows], dtype=np.float32)
+
+
+def assign_rows(vectors: np.ndarray, rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """행마다 가장 가까운 중심점 번호"""
+    assignments = np.empty(len(rows), dtype=np.int32)
+    for start in range(0, len(rows), ASSIGN_BATCH_SIZE):
+        batch_rows = rows[start:start + ASSIGN_BATCH_SIZE]
+        assignments[start:start + len(batch_rows)] = _assign(vectors[batch_rows], centroids)
+    return assignments
+
+
+class IVFIndex:
+    """역파일(IVF) 근사 최근접 이웃 인덱스
+
+    k-means 중심점으로 벡터 공간을 나누고, 질의와 가까운 nprobe개 클러스터의 행만
+    정확히 점수화한다. nprobe가 클수록 재현율이 오르고 지연 시간도 늘어난다.
+    벡터 자체는 엔진의 memmap 행렬을 그대로 쓰고, 여기서는 행 번호만 관리한다.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None, nprobe: int = DEFAULT_NPROBE):
+        self.index_dir = index_dir
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+        self.trained_size = 0
+        self.next_row = 0  # 배정된 가장 큰 행 번호 + 1
+        # 읽어 둔 파일 식별값과 배정 로그 위치 (다른 프로세스가 덧붙인 부분만 이어 읽는다)
+        self._files = None
+        self._assign_bytes = 0
+
+        if index_dir:
+            self.centroids_path = os.path.join(index_dir, "ivf_centroids.npy")
+            self.assign_path = os.path.join(index_dir, "ivf_assign.i64")
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def size(self) -> int:
+        return int(sum(len(rows) for rows in self.lists))
+
+    def _file_identity(self):
+        try:
+            return os.stat(self.centroids_path).st_ino, os.stat(self.assign_path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def load(self, max_row: int):
+        """저장된 중심점과 (행, 클러스터) 로그를 읽어 리스트 재구성"""
+        if not self.index_dir or not os.path.exists(self.centroids_path):
+            return
+        self._files = self._file_identity()
+        self.centroids = np.load(self.centroids_path)
+        pairs = np.fromfile(self.assign_path, dtype=np.int64).reshape(-1, 2) if os.path.exists(self.assign_path) else np.empty((0, 2), dtype=np.int64)
+        # 엔진에 커밋되지 않은 행은 무시 (로그는 행 번호 순이므로 앞부분만 남는다)
+        pairs = pairs[pairs[:, 0] < max_row]
+        self._build_lists(pairs[:, 0], pairs[:, 1])
+        self._assign_bytes = pairs.nbytes
+        self.trained_size = len(pairs)
+        self.next_row = int(pairs[:, 0].max()) + 1 if len(pairs) else 0
+        logger.info(f"IVF 인덱스 로드 완료: 클러스터 {len(self.centroids)}개, 행 {len(pairs)}개")
+
+    def refresh(self, max_row: int):
+        """다른 프로세스의 변경 반영: 파일이 교체되었으면(재학습/정리) 다시 읽고, 아니면 덧붙은 배정만 읽음"""
+        if not self.index_dir or not os.path.exists(self.centroids_path):
+            return
+        if self.centroids is None or self._file_identity() != self._files:
+            self.load(max_row)
+            return
+        with open(self.assign_path, 'rb') as f:
+            f.seek(self._assign_bytes)
+            pairs = np.frombuffer(f.read(), dtype=np.int64)
+        pairs = pairs[:len(pairs) // 2 * 2].reshape(-1, 2)
+        pairs = pairs[pairs[:, 0] < max_row]
+        if len(pairs) == 0:
+            return
+        self._extend_lists(pairs[:, 0], pairs[:, 1])
+        self._assign_bytes += pairs.nbytes
+        self.next_row = max(self.next_row, int(pairs[:, 0].max()) + 1)
+
+    def _extend_lists(self, rows: np.ndarray, assignments: np.ndarray):
+        for cluster in np.unique(assignments):
+            self.lists[cluster] = np.concatenate([self.lists[cluster], rows[assignments == cluster]])
+
+    def _build_lists(self, rows: np.ndarray, assignments: np.ndarray):
+        nlist = len(self.centroids)
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(nlist + 1))
+        sorted_rows = rows[order].astype(np.int64)
+        self.lists = [sorted_rows[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+
+    def train(self, vectors: np.ndarray, rows: np.ndarray, nlist: Optional[int] = None, seed: int = 0):
+        """살아있는 행으로 중심점을 학습하고 전체 행을 클러스터에 배정"""
+        centroids = spherical_kmeans(sample_vectors(vectors, rows, nlist, seed), nlist or suggest_nlist(len(rows)), seed=seed)
+        self.install(centroids, rows, assign_rows(vectors, rows, centroids))
+
+    def install(self, centroids: np.ndarray, rows: np.ndarray, assignments: np.ndarray):
+        """따로 학습한 중심점과 행 배정으로 인덱스를 교체"""
+        self.centroids = centroids
+        self._build_lists(rows, assignments)
+        self.trained_size = len(rows)
+        self.next_row = int(rows.max()) + 1 if len(rows) else 0
+
+        if self.index_dir:
+            # 다른 프로세스가 읽는 중일 수 있으므로 임시 파일에 쓰고 교체
+            with open(f"{self.centroids_path}.tmp", 'wb') as f:
+                np.save(f, self.centroids)
+            np.stack([rows.astype(np.int64), assignments.astype(np.int64)], axis=1).tofile(f"{self.assign_path}.tmp")
+            os.replace(f"{self.assign_path}.tmp", self.assign_path)
+            os.replace(f"{self.centroids_path}.tmp", self.centroids_path)
+            self._files = self._file_identity()
+            self._assign_bytes = len(rows) * 16
+        logger.info(f"IVF 인덱스 학습 완료: 클러스터 {len(self.centroids)}개, 행 {len(rows)}개")
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """새 행을 가장 가까운 클러스터에 추가 (재학습 없음)"""
+        if not self.is_trained or len(rows) == 0:
+            return
+        rows = np.asarray(rows, dtype=np.int64)
+        assignments = _assign(vectors, self.centroids)
+        self._extend_lists(rows, assignments)
+        self.next_row = max(self.next_row, int(rows.max()) + 1)
+
+        if self.index_dir:
+            with open(self.assign_path, 'ab') as f:
+                np.stack([rows, assignments.astype(np.int64)], axis=1).tofile(f)
+            self._assign_bytes += len(rows) * 16
+
+    def prune(self, alive: np.ndarray):
+        """삭제 표시된 행을 리스트에서 빼고 배정 로그를 다시 씀 (세그먼트 병합 후)"""
+        if not self.is_trained:
+            return
+        self.lists = [rows[alive[rows] != 0] for rows in self.lists]
+        if not self.index_dir:
+            return
+        rows = np.concatenate(self.lists) if self.lists else np.empty(0, dtype=np.int64)
+        clusters = np.repeat(np.arange(len(self.lists), dtype=np.int64), [len(rows) for rows in self.lists])
+        order = np.argsort(rows, kind='stable')
+        np.stack([rows[order], clusters[order]], axis=1).tofile(f"{self.assign_path}.tmp")
+        os.replace(f"{self.assign_path}.tmp", self.assign_path)
+        self._files = self._file_identity()
+        self._assign_bytes = len(rows) * 16
+
+    def search(self, query_vector: np.ndarray, vectors: np.ndarray, alive: Optional[np.ndarray] = None,
+               nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """가까운 클러스터의 후보 행과 점수 반환 (삭제 표시된 행은 제외)"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query_vector
+        if nprobe < len(centroid_scores):
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(len(centroid_scores))
+
+        rows = np.concatenate([self.lists[c] for c in probe])
+        if alive is not None and len(rows):
+            rows = rows[alive[rows] != 0]
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        return rows, vectors[rows] @ query_vector
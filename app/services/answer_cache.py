@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 답변 캐시 기본 설정
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_SIMILARITY = 0.92  # 질문 임베딩 코사인 유사도가 이 이상이어야 같은 질문으로 본다
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    vector: np.ndarray
+    chunk_ids: frozenset
+    document_ids: frozenset
+    answer: str
+    sources: List[str]
+    created_at: float = field(default_factory=time.time)
+
+
+class AnswerCache:
+    """질문 임베딩 유사도 + 검색된 청크 집합으로 매칭하는 채팅 답변 캐시
+
+    새 질문이 이전 질문과 충분히 비슷하고(임베딩 유사도), 지금 검색된 청크 ID 집합이
+    그때와 같을 때만(순서 무관) 저장된 답변을 돌려준다. 오래된 항목은 TTL로, 넘치는 항목은 LRU로 제거한다.
+
+    캐시는 워커 프로세스마다 따로 있으므로 invalidate_document는 호출한 워커의 항목만 지운다.
+    다른 워커에서의 정확성은 청크 ID 검사에 기대므로, 청크 ID는 문서 버전마다 달라야 한다
+    (엔진의 행 번호처럼 재색인하면 새로 배정되는 값). 삭제/교체된 문서의 청크는 더 이상 검색되지 않으므로
+    그 답변은 어느 워커에서도 다시 쓰이지 않는다.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        similarity_threshold: float = DEFAULT_SIMILARITY
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _expire_locked(self, now: float):
+        expired = [key for key, entry in self.entries.items() if now - entry.created_at > self.ttl_seconds]
+        for key in expired:
+            del self.entries[key]
+        self.evictions += len(expired)
+
+    def get(self, vector: np.ndarray, chunk_ids: Iterable[Hashable]) -> Optional[CachedAnswer]:
+        chunk_key = frozenset(chunk_ids)
+        with self.lock:
+            self._expire_locked(time.time())
+            candidates = [(key, entry) for key, entry in self.entries.items() if entry.chunk_ids == chunk_key]
+            best_key, best_score = None, self.similarity_threshold
+            if candidates:
+                scores = np.stack([entry.vector for _, entry in candidates]) @ vector
+                index = int(np.argmax(scores))
+                if scores[index] >= best_score:
+                    best_key, best_score = candidates[index][0], float(scores[index])
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(best_key)
+            self.hits += 1
+            entry = self.entries[best_key]
+        logger.info(f"답변 캐시 적중: '{entry.question}' (유사도 {best_score:.3f})")
+        return entry
+
+    def put(self, question: str, vector: np.ndarray, chunk_ids: Iterable[Hashable], document_ids: List[str],
+            answer: str, sources: List[str]):
+        entry = CachedAnswer(
+            question=question,
+            vector=np.asarray(vector, dtype=np.float32),
+            chunk_ids=frozenset(chunk_ids),
+            document_ids=frozenset(document_ids),
+            answer=answer,
+            sources=list(sources)
+        )
+        with self.lock:
+            self.entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_document(self, document_id: str) -> int:
+        """이 워커에서 문서를 근거로 한 답변 제거 (문서 삭제/재색인 시 메모리를 일찍 비운다)"""
+        with self.lock:
+            stale = [key for key, entry in self.entries.items() if document_id in entry.document_ids]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+        if stale:
+            logger.info(f"답변 캐시 무효화: 문서 {document_id} ({len(stale)}개 답변)")
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
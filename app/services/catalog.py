@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join("data", "catalog.sqlite3")
+CATALOG_FIELDS = (
+    "id", "filename", "file_type", "size", "upload_time", "word_count", "char_count", "filepath", "sha256"
+)
+SORTABLE_FIELDS = ("upload_time", "filename", "file_type", "size", "word_count", "char_count")
+MAX_PAGE_SIZE = 500
+
+
+class DocumentCatalog:
+    """문서 메타데이터 카탈로그 (SQLite)
+
+    문서 목록/삭제가 인덱스를 열어 보지 않도록 메타데이터만 따로 보관한다.
+    업로드 성공 시 add, 삭제 시 remove로 함께 갱신한다.
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id TEXT PRIMARY KEY, filename TEXT NOT NULL, file_type TEXT NOT NULL, "
+            "size INTEGER NOT NULL DEFAULT 0, upload_time TEXT NOT NULL, "
+            "word_count INTEGER NOT NULL DEFAULT 0, char_count INTEGER NOT NULL DEFAULT 0, "
+            "filepath TEXT, sha256 TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents(sha256)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_upload_time ON documents(upload_time)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_file_type ON documents(file_type, upload_time)")
+        self.conn.commit()
+
+    def _row(self, metadata: Dict[str, Any]) -> List[Any]:
+        return [metadata.get(field) for field in CATALOG_FIELDS]
+
+    def add(self, metadata: Dict[str, Any]):
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO documents ({', '.join(CATALOG_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(CATALOG_FIELDS))})",
+                self._row(metadata)
+            )
+            self.conn.commit()
+
+    def remove(self, document_id: str) -> bool:
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+            self.conn.commit()
+        return cursor.rowcount > 0
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock, stage_timer("catalog_read"):
+            row = self.conn.execute("SELECT * FROM documents WHERE id = ?", (document_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_hash(self, sha256: str) -> Optional[Dict[str, Any]]:
+        with self.lock, stage_timer("catalog_read"):
+            row = self.conn.execute("SELECT * FROM documents WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def list(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        sort: str = "upload_time",
+        descending: bool = True,
+        file_type: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """조건에 맞는 문서 한 페이지와 전체 개수 반환
+
+        date_from/date_to는 ISO 형식 접두어(예: "2024-03", "2024-03-15")로 비교하며 양쪽 모두 포함한다.
+        """
+        if sort not in SORTABLE_FIELDS:
+            raise ValueError(f"정렬할 수 없는 필드: {sort}")
+
+        conditions, params = [], []
+        if file_type:
+            conditions.append("file_type = ?")
+            params.append(file_type.lower())
+        if date_from:
+            conditions.append("upload_time >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("substr(upload_time, 1, ?) <= ?")
+            params.extend([len(date_to), date_to])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "DESC" if descending else "ASC"
+
+        with self.lock, stage_timer("catalog_read"):
+            total = self.conn.execute(f"SELECT COUNT(*) FROM documents {where}", params).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT * FROM documents {where} ORDER BY {sort} {order}, id {order} LIMIT ? OFFSET ?",
+                [*params, min(limit, MAX_PAGE_SIZE), offset]
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def migrate_from(self, processed_dir: str) -> int:
+        """processed/*.json 메타데이터를 카탈로그로 옮김 (카탈로그가 비어 있을 때 한 번)"""
+        if self.count() > 0 or not os.path.isdir(processed_dir):
+            return 0
+
+        rows = []
+        for filename in os.listdir(processed_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(processed_dir, filename), 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                if not all(metadata.get(field) for field in ("id", "filename", "upload_time")):
+                    raise ValueError("id/filename/upload_time 누락")
+                metadata.setdefault("file_type", metadata["filename"].lower().split('.')[-1])
+                rows.append(self._row(metadata))
+            except Exception as e:
+                logger.warning(f"카탈로그 마이그레이션 건너뜀: {filename} - {e}")
+
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO documents ({', '.join(CATALOG_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(CATALOG_FIELDS))})",
+                rows
+            )
+            self.conn.commit()
+        if rows:
+            logger.info(f"카탈로그 마이그레이션 완료: {len(rows)}개 문서 ({processed_dir})")
+        return len(rows)
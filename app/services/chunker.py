@@ -0,0 +1,156 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+# 청크 기본 설정
+DEFAULT_MAX_CHARS = 1000
+DEFAULT_OVERLAP_CHARS = 100
+SEGMENT_SEPARATOR = "\n"  # 문서 전체 텍스트 = 세그먼트(페이지 등)를 이 문자로 이은 것
+
+# 제목 줄: 마크다운 제목, 제N조/장/절, "1." / "가." / "I." 번호, 글머리 기호
+_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:#{1,6}\s|제\s*\d+\s*[조장절관편]|\d{1,2}\.\s|[가-하]\.\s|[IVX]{1,4}\.\s|[■□◆◇●○【])",
+    re.MULTILINE
+)
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+# 문장 끝: 마침표/물음표/느낌표(닫는 따옴표·괄호 포함) 뒤 공백
+_SENTENCE_END = re.compile(r"[.!?。？！][\"'”’)\]]*\s+")
+
+KIND_SENTENCE = 0
+KIND_PARAGRAPH = 1
+KIND_HEADING = 2
+
+
+@dataclass
+class Chunk:
+    """문서 텍스트 조각과 원문 내 위치
+
+    start/end는 세그먼트를 SEGMENT_SEPARATOR로 이은 문서 전체 텍스트 기준 문자 오프셋이다.
+    """
+    text: str
+    start: int
+    end: int
+    page: Optional[int] = None
+    index: int = 0
+
+
+Segment = Union[str, Tuple[Optional[int], str]]
+
+
+def _split_units(text: str) -> List[Tuple[int, int, int]]:
+    """세그먼트를 (시작, 끝, 경계 종류) 단위로 분할, 단위들은 원문을 빈틈없이 덮는다"""
+    boundaries = {0: KIND_PARAGRAPH}
+    for match in _SENTENCE_END.finditer(text):
+        boundaries.setdefault(match.end(), KIND_SENTENCE)
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        boundaries[match.end()] = KIND_PARAGRAPH
+    for match in _HEADING_PATTERN.finditer(text):
+        boundaries[match.start()] = KIND_HEADING
+
+    positions = sorted(p for p in boundaries if p < len(text))
+    units = []
+    for i, start in enumerate(positions):
+        end = positions[i + 1] if i + 1 < len(positions) else len(text)
+        units.append((start, end, boundaries[start]))
+    return units
+
+
+def _hard_split(start: int, text: str, max_chars: int) -> Iterator[Tuple[int, str]]:
+    """max_chars보다 긴 단위를 공백 기준으로 자른다"""
+    pos = 0
+    while len(text) - pos > max_chars:
+        cut = text.rfind(" ", pos + max_chars // 2, pos + max_chars)
+        if cut <= pos:
+            cut = pos + max_chars
+        yield start + pos, text[pos:cut]
+        pos = cut
+    yield start + pos, text[pos:]
+
+
+class _Buffer:
+    def __init__(self):
+        self.units: List[Tuple[int, str, Optional[int]]] = []  # (문서 오프셋, 텍스트, 페이지)
+        self.length = 0
+        self.fresh = False  # 마지막 청크 이후 새 단위가 들어왔는지
+
+    def append(self, offset: int, text: str, page: Optional[int]):
+        self.units.append((offset, text, page))
+        self.length += len(text)
+        self.fresh = True
+
+    def build(self, index: int) -> Optional[Chunk]:
+        parts = []
+        cursor = self.units[0][0]
+        for offset, text, _ in self.units:
+            # 세그먼트 경계에서 빠진 구분 문자 복원
+            if offset > cursor:
+                parts.append(SEGMENT_SEPARATOR * (offset - cursor))
+            parts.append(text)
+            cursor = offset + len(text)
+        raw = "".join(parts)
+        stripped = raw.strip()
+        if not stripped:
+            return None
+        start = self.units[0][0] + (len(raw) - len(raw.lstrip()))
+        return Chunk(text=stripped, start=start, end=start + len(stripped), page=self.units[0][2], index=index)
+
+    def keep_tail(self, overlap_chars: int):
+        """다음 청크와 겹칠 마지막 단위들만 남긴다"""
+        tail, total = [], 0
+        for unit in reversed(self.units):
+            if total + len(unit[1]) > overlap_chars:
+                break
+            tail.append(unit)
+            total += len(unit[1])
+        self.units = list(reversed(tail))
+        self.length = total
+        self.fresh = False
+
+
+def iter_chunks(
+    segments: Iterable[Segment],
+    max_chars: int = DEFAULT_MAX_CHARS,
+    overlap_chars: int = DEFAULT_OVERLAP_CHARS
+) -> Iterator[Chunk]:
+    """세그먼트(페이지, 단락 등)를 받아 문단/제목/문장 경계에서 자른 청크를 차례로 생성
+
+    세그먼트는 문자열 또는 (페이지 번호, 문자열) 튜플이며, 전체를 한 문자열로 합치지 않으므로
+    큰 문서도 한 페이지 분량의 메모리로 청크를 만들 수 있다.
+    """
+    min_chars = max_chars // 4
+    buffer = _Buffer()
+    base = 0
+    index = 0
+
+    def flush(overlap: int) -> Optional[Chunk]:
+        nonlocal index
+        chunk = buffer.build(index)
+        if chunk:
+            index += 1
+        buffer.keep_tail(overlap)
+        return chunk
+
+    for segment in segments:
+        page, text = segment if isinstance(segment, tuple) else (None, segment)
+        text = text or ""
+        for unit_start, unit_end, kind in _split_units(text):
+            for offset, piece in _hard_split(base + unit_start, text[unit_start:unit_end], max_chars):
+                if kind == KIND_HEADING and (buffer.length >= min_chars or not buffer.fresh):
+                    # 새 제목은 새 청크에서 시작 (앞 절과 겹치지 않게)
+                    chunk = flush(0) if buffer.fresh else buffer.keep_tail(0)
+                    if chunk:
+                        yield chunk
+                elif buffer.fresh and buffer.length + len(piece) > max_chars:
+                    chunk = flush(overlap_chars)
+                    if chunk:
+                        yield chunk
+                if buffer.length + len(piece) > max_chars:
+                    buffer.keep_tail(0)
+                buffer.append(offset, piece, page)
+                kind = KIND_SENTENCE
+        base += len(text) + len(SEGMENT_SEPARATOR)
+
+    if buffer.fresh:
+        chunk = buffer.build(index)
+        if chunk:
+            yield chunk
@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.storage import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# 본문은 BLOCK_CHARS 문자 단위 블록으로 나눠 각각 압축한다 (범위 읽기 시 필요한 블록만 해제)
+BLOCK_CHARS = 16384
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+INDEX_CACHE_SIZE = 1024
+BLOCK_CACHE_SIZE = 256  # 압축을 푼 블록 LRU 캐시 (블록당 최대 BLOCK_CHARS 문자, 기본 약 8MB)
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+
+class ZlibCodec:
+    name = CODEC_ZLIB
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, ZLIB_LEVEL)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec:
+    """zstandard 패키지 래퍼 (선택 의존성)"""
+
+    name = CODEC_ZSTD
+
+    def __init__(self):
+        import zstandard
+
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+def create_codec(name: Optional[str] = None):
+    """코덱 생성: 기본은 zstd, 패키지가 없으면 zlib로 대체"""
+    if name in (None, CODEC_ZSTD):
+        try:
+            return ZstdCodec()
+        except ImportError:
+            if name == CODEC_ZSTD:
+                raise
+    return ZlibCodec()
+
+
+class ContentStore:
+    """문서 본문 압축 저장소
+
+    문서마다 압축 블록 파일(.blk)과 블록 위치 색인(.json)을 둔다. 청크는 문서 내 문자
+    오프셋(char_start, char_end)만 기억하고, 읽을 때 해당 범위가 걸친 블록만 풀어 잘라낸다.
+    푼 블록은 LRU로 캐시하므로, 같은 블록에 있는 청크(검색 결과 상위 청크는 대개 몇 문서에 몰린다)는
+    파일을 다시 열거나 압축을 다시 풀지 않는다.
+    """
+
+    def __init__(self, root: str, codec: Optional[str] = None, block_chars: int = BLOCK_CHARS,
+                 block_cache_size: int = BLOCK_CACHE_SIZE):
+        self.root = root
+        self.block_chars = block_chars
+        self.codec = create_codec(codec)
+        self._codecs = {self.codec.name: self.codec}
+        self._index_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.index_hits = 0
+        self.index_misses = 0
+        # (문서 ID, 블록 번호) -> 푼 텍스트
+        self.block_cache_size = block_cache_size
+        self._block_cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self.block_hits = 0
+        self.block_misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        logger.info(f"본문 저장소 준비: {root} (코덱: {self.codec.name})")
+
+    def _paths(self, document_id: str):
+        base = os.path.join(self.root, document_id)
+        return f"{base}.blk", f"{base}.json"
+
+    def _codec_for(self, name: str):
+        if name not in self._codecs:
+            self._codecs[name] = create_codec(name)
+        return self._codecs[name]
+
+    def put(self, document_id: str, content: str) -> Dict[str, Any]:
+        """본문을 블록 단위로 압축 저장 (같은 ID는 덮어쓴다), 색인 반환"""
+        writer = self.writer(document_id)
+        try:
+            writer.write(content)
+        except Exception:
+            writer.abort()
+            raise
+        return writer.close()
+
+    def writer(self, document_id: str) -> "ContentWriter":
+        """본문을 조각 단위로 받아 저장하는 쓰기 객체 (close 전까지 기존 본문은 그대로)"""
+        return ContentWriter(self, document_id)
+
+    def _commit(self, document_id: str, blocks_tmp_path: str, index: Dict[str, Any]):
+        blocks_path, index_path = self._paths(document_id)
+        os.replace(blocks_tmp_path, blocks_path)
+        write_json_atomic(index_path, index)
+        with self.lock:
+            self._forget(document_id)
+        logger.debug(
+            f"본문 저장: {document_id} ({index['length']:,}자 -> {index['stored_bytes']:,} bytes, "
+            f"블록 {len(index['blocks'])}개)"
+        )
+
+    def _index(self, document_id: str) -> Dict[str, Any]:
+        with self.lock:
+            index = self._index_cache.get(document_id)
+            if index is not None:
+                self._index_cache.move_to_end(document_id)
+                self.index_hits += 1
+                return index
+            self.index_misses += 1
+
+        _, index_path = self._paths(document_id)
+        if not os.path.exists(index_path):
+            raise KeyError(f"저장된 본문이 없습니다: {document_id}")
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        with self.lock:
+            self._index_cache[document_id] = index
+            while len(self._index_cache) > INDEX_CACHE_SIZE:
+                self._index_cache.popitem(last=False)
+        return index
+
+    def _forget(self, document_id: str):
+        """문서의 색인과 푼 블록을 캐시에서 제거 (self.lock을 쥔 채로 호출)"""
+        self._index_cache.pop(document_id, None)
+        for key in [key for key in self._block_cache if key[0] == document_id]:
+            del self._block_cache[key]
+
+    def has(self, document_id: str) -> bool:
+        return os.path.exists(self._paths(document_id)[1])
+
+    def read(self, document_id: str, start: int = 0, end: Optional[int] = None) -> str:
+        """본문의 [start, end) 문자 범위만 읽기"""
+        index = self._index(document_id)
+        length = index["length"]
+        end = length if end is None else min(end, length)
+        start = max(0, start)
+        if start >= end:
+            return ""
+
+        block_chars = index["block_chars"]
+        first, last = start // block_chars, (end - 1) // block_chars
+        texts = {}
+        with self.lock:
+            for number in range(first, last + 1):
+                text = self._block_cache.get((document_id, number))
+                if text is not None:
+                    self._block_cache.move_to_end((document_id, number))
+                    texts[number] = text
+            self.block_hits += len(texts)
+            self.block_misses += last + 1 - first - len(texts)
+
+        missing = [number for number in range(first, last + 1) if number not in texts]
+        if missing:
+            # 캐시에 없는 블록은 연속 구간 하나로 읽어 푼다
+            blocks = index["blocks"][missing[0]:missing[-1] + 1]
+            codec = self._codec_for(index["codec"])
+            blocks_path, _ = self._paths(document_id)
+            with open(blocks_path, 'rb') as f:
+                f.seek(blocks[0][0])
+                raw = f.read(blocks[-1][0] + blocks[-1][1] - blocks[0][0])
+            for number, (offset, size) in enumerate(blocks, missing[0]):
+                if number in texts:
+                    continue
+                relative = offset - blocks[0][0]
+                texts[number] = codec.decompress(raw[relative:relative + size]).decode('utf-8')
+            with self.lock:
+                for number in missing:
+                    self._block_cache[(document_id, number)] = texts[number]
+                while len(self._block_cache) > self.block_cache_size:
+                    self._block_cache.popitem(last=False)
+
+        text = "".join(texts[number] for number in range(first, last + 1))
+        base = first * block_chars
+        return text[start - base:end - base]
+
+    def remove(self, document_id: str):
+        with self.lock:
+            self._forget(document_id)
+        for path in self._paths(document_id):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def clear_cache(self, document_ids: Optional[Iterable[str]] = None):
+        """블록 색인/블록 캐시 비우기 (다른 프로세스가 같은 문서를 다시 썼을 수 있을 때), 문서를 주면 그 문서만"""
+        with self.lock:
+            if document_ids is None:
+                self._index_cache.clear()
+                self._block_cache.clear()
+            else:
+                for document_id in document_ids:
+                    self._forget(document_id)
+
+    def stats(self) -> Dict[str, Any]:
+        documents = 0
+        stored_bytes = 0
+        for entry in os.scandir(self.root):
+            if entry.name.endswith('.blk'):
+                documents += 1
+                stored_bytes += entry.stat().st_size
+        return {
+            "documents": documents,
+            "stored_bytes": stored_bytes,
+            "codec": self.codec.name,
+            "index_cache": self.cache_stats()
+        }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """블록 색인 LRU 캐시와 푼 블록 LRU 캐시 적중률"""
+        with self.lock:
+            total = self.index_hits + self.index_misses
+            block_total = self.block_hits + self.block_misses
+            return {
+                "entries": len(self._index_cache),
+                "hits": self.index_hits,
+                "misses": self.index_misses,
+                "hit_rate": round(self.index_hits / total, 4) if total else 0.0,
+                "block_entries": len(self._block_cache),
+                "block_hits": self.block_hits,
+                "block_misses": self.block_misses,
+                "block_hit_rate": round(self.block_hits / block_total, 4) if block_total else 0.0
+            }
+
+
+class ContentWriter:
+    """본문 조각을 이어 받아 BLOCK_CHARS 문자마다 압축 블록으로 쓰는 객체
+
+    문서 전체를 한 문자열로 만들지 않고 페이지/단락이 들어오는 대로 저장한다.
+    close()에서 임시 파일을 바꿔 끼우고, abort()는 임시 파일만 지운다.
+    """
+
+    def __init__(self, store: ContentStore, document_id: str):
+        self.store = store
+        self.document_id = document_id
+        self.tmp_path = f"{store._paths(document_id)[0]}.tmp"
+        self.file = open(self.tmp_path, 'wb')
+        self.pending: List[str] = []
+        self.pending_chars = 0
+        self.length = 0
+        self.offset = 0
+        self.blocks: List[List[int]] = []
+
+    def write(self, text: str):
+        if not text:
+            return
+        self.pending.append(text)
+        self.pending_chars += len(text)
+        self.length += len(text)
+        if self.pending_chars >= self.store.block_chars:
+            data = "".join(self.pending)
+            block_chars = self.store.block_chars
+            full = len(data) - len(data) % block_chars
+            for start in range(0, full, block_chars):
+                self._write_block(data[start:start + block_chars])
+            self.pending = [data[full:]] if full < len(data) else []
+            self.pending_chars = len(data) - full
+
+    def _write_block(self, text: str):
+        data = self.store.codec.compress(text.encode('utf-8'))
+        self.file.write(data)
+        self.blocks.append([self.offset, len(data)])
+        self.offset += len(data)
+
+    def close(self) -> Dict[str, Any]:
+        if self.pending_chars:
+            self._write_block("".join(self.pending))
+            self.pending, self.pending_chars = [], 0
+        self.file.close()
+        index = {
+            "codec": self.store.codec.name,
+            "block_chars": self.store.block_chars,
+            "length": self.length,
+            "stored_bytes": self.offset,
+            "blocks": self.blocks
+        }
+        self.store._commit(self.document_id, self.tmp_path, index)
+        return index
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
@@ -0,0 +1,139 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# 컨텍스트 구성 기본 설정
+DEFAULT_TOKEN_BUDGET = 1200  # 문서 내용에 쓸 토큰 수 (llama3.2:1b 기본 컨텍스트 2048 중 질문/지침 몫 제외)
+DEFAULT_MMR_LAMBDA = 0.7  # 1에 가까울수록 관련도, 0에 가까울수록 다양성 우선
+MERGE_GAP_CHARS = 1  # 같은 문서의 청크 사이 간격이 이 이하면 하나로 합친다 (세그먼트 구분 문자 허용)
+PIECE_HEADER_TOKENS = 8  # "문서명: ... 내용:" 머리글 몫
+
+_HANGUL = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]")
+_LATIN_RUN = re.compile(r"[A-Za-z]+")
+_DIGIT_RUN = re.compile(r"[0-9]+")
+_SYMBOL = re.compile(r"[^\sA-Za-z0-9가-힣ㄱ-ㅎㅏ-ㅣ]")
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 근사 토큰 수 (llama 계열 BPE 기준으로 조금 넉넉하게)
+
+    한글은 음절당 1토큰, 영문은 4자당, 숫자는 3자당 1토큰, 기호는 1개당 1토큰으로 센다.
+    """
+    hangul = len(_HANGUL.findall(text))
+    latin = sum(math.ceil(len(run) / 4) for run in _LATIN_RUN.findall(text))
+    digits = sum(math.ceil(len(run) / 3) for run in _DIGIT_RUN.findall(text))
+    symbols = len(_SYMBOL.findall(text))
+    return hangul + latin + digits + symbols
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """estimate_tokens가 max_tokens 이하인 가장 긴 앞부분 (글자당 토큰 수가 고르지 않으므로 이분 탐색)"""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def mmr_order(relevance: np.ndarray, vectors: np.ndarray, lambda_: float = DEFAULT_MMR_LAMBDA) -> List[int]:
+    """Maximal Marginal Relevance 순서: 관련도가 높으면서 이미 고른 청크와 덜 겹치는 순"""
+    n = len(relevance)
+    if n == 0:
+        return []
+    similarity = vectors @ vectors.T
+    order = [int(np.argmax(relevance))]
+    redundancy = similarity[order[0]].copy()
+    remaining = np.ones(n, dtype=bool)
+    remaining[order[0]] = False
+    while remaining.any():
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~remaining] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return order
+
+
+@dataclass
+class ContextPiece:
+    """프롬프트에 들어갈 문서 조각 (같은 문서의 인접/겹치는 청크를 합친 범위)"""
+    document_id: str
+    filename: str
+    start: int
+    end: int
+    rank: int
+    chunk_ids: List[str] = field(default_factory=list)
+    pages: List[int] = field(default_factory=list)
+    text: str = ""
+    tokens: int = 0
+
+
+def merge_adjacent(chunks: List[Dict[str, Any]]) -> List[ContextPiece]:
+    """같은 문서에서 겹치거나 맞닿은 청크를 한 범위로 합침 (rank는 구성 청크 중 가장 좋은 순위)"""
+    by_document: Dict[str, List[Dict[str, Any]]] = {}
+    for rank, chunk in enumerate(chunks):
+        by_document.setdefault(chunk["document_id"], []).append(dict(chunk, rank=rank))
+
+    pieces = []
+    for document_id, items in by_document.items():
+        items.sort(key=lambda item: item["char_start"])
+        current: Optional[ContextPiece] = None
+        for item in items:
+            if current is not None and item["char_start"] <= current.end + MERGE_GAP_CHARS:
+                current.end = max(current.end, item["char_end"])
+                current.rank = min(current.rank, item["rank"])
+            else:
+                current = ContextPiece(
+                    document_id=document_id,
+                    filename=item.get("metadata", {}).get("filename", "알 수 없는 파일"),
+                    start=item["char_start"],
+                    end=item["char_end"],
+                    rank=item["rank"]
+                )
+                pieces.append(current)
+            current.chunk_ids.append(item["id"])
+            if item.get("page") is not None and item["page"] not in current.pages:
+                current.pages.append(item["page"])
+    return sorted(pieces, key=lambda piece: piece.rank)
+
+
+def build_context(
+    chunks: List[Dict[str, Any]],
+    read_text: Callable[[str, int, int], str],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    lambda_: float = DEFAULT_MMR_LAMBDA
+) -> List[ContextPiece]:
+    """검색 결과를 MMR로 재정렬하고 인접 청크를 합쳐 토큰 예산 안에 담는다
+
+    chunks는 검색 결과(similarity, vector, document_id, char_start/char_end 포함)이고,
+    read_text(document_id, start, end)로 합친 범위의 원문을 읽는다 (겹치는 부분은 한 번만 들어간다).
+    """
+    if not chunks:
+        return []
+    relevance = np.array([chunk["similarity"] for chunk in chunks], dtype=np.float32)
+    vectors = np.stack([chunk["vector"] for chunk in chunks])
+    ordered = [chunks[i] for i in mmr_order(relevance, vectors, lambda_)]
+
+    selected = []
+    used = 0
+    for piece in merge_adjacent(ordered):
+        piece.text = read_text(piece.document_id, piece.start, piece.end)
+        piece.tokens = estimate_tokens(piece.text) + PIECE_HEADER_TOKENS
+        if used + piece.tokens <= token_budget:
+            selected.append(piece)
+            used += piece.tokens
+        elif not selected:
+            # 가장 관련 높은 조각 하나도 예산을 넘으면 예산에 맞게 앞부분만 잘라서라도 넣는다
+            piece.text = truncate_to_tokens(piece.text, token_budget - PIECE_HEADER_TOKENS)
+            piece.end = piece.start + len(piece.text)
+            piece.tokens = estimate_tokens(piece.text) + PIECE_HEADER_TOKENS
+            selected.append(piece)
+            used += piece.tokens
+    return selected
@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 임베딩 기본 설정
+DEFAULT_EMBEDDING_DIM = 384
+HASHING_MODEL_NAME = "hashing-ngram"
+
+# 캐시 / 마이크로배치 설정
+DEFAULT_CACHE_PATH = os.path.join("data", "embedding_cache.sqlite3")
+DEFAULT_CACHE_MAX_ENTRIES = 100000
+MEMORY_CACHE_SIZE = 2048
+MAX_BATCH_SIZE = 64
+MAX_BATCH_WAIT_MS = 5
+SQLITE_MAX_PARAMS = 500
+TOUCH_FLUSH_SIZE = 1024  # 이만큼 쌓이면 last_used 갱신을 한 번에 기록
+
+_HASH_PRIME = np.uint64(1099511628211)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _word_char_mask(codes: np.ndarray) -> np.ndarray:
+    """영문/숫자/한글 음절 여부 (n-gram이 공백·구두점을 넘지 않도록)"""
+    return (
+        ((codes >= 0x30) & (codes <= 0x39))
+        | ((codes >= 0x61) & (codes <= 0x7A))
+        | ((codes >= 0xAC00) & (codes <= 0xD7A3))
+    )
+
+
+class HashingEmbedder:
+    """문자 n-gram을 해싱하는 결정적 로컬 임베더
+
+    네트워크나 모델 파일 없이 동작하며, 한국어처럼 띄어쓰기 단위가 일정하지 않은
+    텍스트도 문자 n-gram으로 부분 일치를 잡아낸다.
+    """
+
+    def __init__(self, dim: int = DEFAULT_EMBEDDING_DIM, ngram_range=(2, 3)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.model_name = f"{HASHING_MODEL_NAME}-{dim}"
+
+    def _ngram_hashes(self, text: str) -> np.ndarray:
+        codes = np.frombuffer(text.lower().encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        valid = _word_char_mask(codes)
+        min_n, max_n = self.ngram_range
+
+        parts = []
+        hashes, runs = codes, valid
+        for n in range(1, max_n + 1):
+            if n > 1:
+                if len(hashes) < 2:
+                    break
+                hashes = hashes[:-1] * _HASH_PRIME + codes[n - 1:]
+                runs = runs[:-1] & valid[n - 1:]
+            if n >= min_n:
+                parts.append(hashes[runs] + np.uint64(n))
+
+        merged = np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+        if merged.size == 0:
+            # 한 글자 질의처럼 n-gram이 없으면 단일 문자라도 사용
+            merged = codes[valid] + np.uint64(1)
+        return merged
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            mixed = (self._ngram_hashes(text) * _HASH_MIX) >> np.uint64(32)
+            if mixed.size == 0:
+                continue
+            buckets = (mixed % np.uint64(self.dim)).astype(np.intp)
+            signs = np.where(mixed & np.uint64(1 << 31), 1.0, -1.0)
+            vectors[row] = np.bincount(buckets, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """sentence-transformers 모델 래퍼 (선택 의존성)"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            texts,
+            batch_size=32,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+def create_embedder(model_name: Optional[str] = None):
+    """모델 이름에 맞는 임베더 생성, 실패 시 해싱 임베더로 대체"""
+    if model_name and not model_name.startswith(HASHING_MODEL_NAME):
+        try:
+            embedder = SentenceTransformerEmbedder(model_name)
+            logger.info(f"임베딩 모델 로드 완료: {model_name} (차원: {embedder.dim})")
+            return embedder
+        except Exception as e:
+            logger.warning(f"임베딩 모델 로드 실패, 해싱 임베더 사용: {model_name} - {e}")
+    return HashingEmbedder()
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키/임베딩 입력용 정규화 (유니코드 NFC, 공백 정리)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """정규화 텍스트 해시 + 모델 이름을 키로 하는 영속 임베딩 캐시 (LRU 제거)
+
+    자주 쓰는 항목은 메모리 LRU에, 전체는 SQLite 파일에 보관한다.
+    조회할 때마다 last_used를 쓰고 커밋하지 않도록, 사용 시각은 모아 두었다가 일정 개수가
+    쌓이거나 제거(put_many) 직전에 한 번에 기록한다. 종료 시 기록되지 못한 시각은 LRU 순서만 조금 흐려진다.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.touched: Dict[bytes, float] = {}  # 아직 기록하지 않은 last_used
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name: str, normalized_text: str) -> bytes:
+        return hashlib.sha256(f"{model_name}\0{normalized_text}".encode("utf-8")).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        with self.lock:
+            missing = []
+            for key in keys:
+                vector = self.memory.get(key)
+                if vector is not None:
+                    self.memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    missing.append(key)
+
+            rows = []
+            for i in range(0, len(missing), SQLITE_MAX_PARAMS):
+                batch = missing[i:i + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows += self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+            for key, blob in rows:
+                found[bytes(key)] = np.frombuffer(blob, dtype=np.float32)
+                self._remember(bytes(key), found[bytes(key)])
+
+            now = time.time()
+            for key in found:
+                self.touched[key] = now
+            if len(self.touched) >= TOUCH_FLUSH_SIZE:
+                self._flush_touched()
+                self.conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: List[Tuple[bytes, np.ndarray]]):
+        if not items:
+            return
+        now = time.time()
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items]
+            )
+            self.size += self.conn.total_changes - before
+            if self.size > self.max_entries:
+                # 최근에 쓴 항목이 제거되지 않도록 모아 둔 사용 시각부터 기록
+                self._flush_touched()
+                overflow = self.size - self.max_entries
+                self.conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (overflow,)
+                )
+                self.size -= overflow
+            self.conn.commit()
+            for key, vector in items:
+                self._remember(key, vector)
+
+    def _flush_touched(self):
+        """모아 둔 last_used를 기록 (커밋은 호출한 쪽에서, lock 안에서 호출)"""
+        if self.touched:
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self.touched.items()]
+            )
+            self.touched.clear()
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > MEMORY_CACHE_SIZE:
+            self.memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": self.size,
+            "memory_entries": len(self.memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class EmbeddingService:
+    """임베더 앞단의 캐시 + 마이크로배치 계층
+
+    동기 encode()는 캐시를 거쳐 미스만 배치로 인코딩하고, 비동기 embed()는 동시에 들어온
+    요청들을 MAX_BATCH_WAIT_MS 동안 모아 스레드 풀에서 한 번에 인코딩한다.
+    embedder와 같은 인터페이스(dim, model_name, encode)를 제공하므로 검색 엔진에 그대로 넘길 수 있다.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        cache: Optional[EmbeddingCache] = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_BATCH_WAIT_MS,
+        workers: int = 1
+    ):
+        self.embedder = embedder
+        self.cache = cache
+        self.dim = embedder.dim
+        self.model_name = embedder.model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._pending_count = 0
+        self._flush_handle = None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        normalized = [normalize_text(text) for text in texts]
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return vectors
+
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in normalized]
+        cached = self.cache.get_many(list(set(keys))) if self.cache else {}
+
+        # 캐시 미스만 (중복 제거 후) 인코딩
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, normalized):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            missing_keys = list(missing.keys())
+            encoded = []
+            for i in range(0, len(missing_keys), self.max_batch_size):
+                batch = [missing[key] for key in missing_keys[i:i + self.max_batch_size]]
+                encoded.append(self.embedder.encode(batch))
+            encoded = np.vstack(encoded).astype(np.float32, copy=False)
+            fresh = dict(zip(missing_keys, encoded))
+            cached.update(fresh)
+            if self.cache:
+                self.cache.put_many(list(fresh.items()))
+
+        for row, key in enumerate(keys):
+            vectors[row] = cached[key]
+        return vectors
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """동시 요청과 묶어서 스레드 풀에서 인코딩 (이벤트 루프를 막지 않음)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((list(texts), future))
+        self._pending_count += len(texts)
+
+        if self._pending_count >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending, self._pending_count = self._pending, [], 0
+        if not batch:
+            return
+
+        texts = [text for items, _ in batch for text in items]
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self.executor, self.encode, texts)
+
+        def distribute(done):
+            error = done.exception()
+            vectors = None if error else done.result()
+            offset = 0
+            for items, future in batch:
+                # 취소된 대기자(클라이언트 연결 끊김 등)도 자기 몫만큼 offset을 넘겨야 다음 대기자가 제 벡터를 받는다
+                result = None if error else vectors[offset:offset + len(items)]
+                offset += len(items)
+                if future.done():
+                    continue
+                if error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        task.add_done_callback(distribute)
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats() if self.cache else {}
+
+
+def create_embedding_service(model_name: Optional[str] = None, cache_path: str = DEFAULT_CACHE_PATH) -> EmbeddingService:
+    return EmbeddingService(create_embedder(model_name), EmbeddingCache(cache_path))
@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.page_cache import PageTextCache
+
+logger = logging.getLogger(__name__)
+
+# 추출 기본 설정
+DEFAULT_TIMEOUT = 120  # 문서 하나당 초
+PAGES_PER_TASK = 8
+
+
+# --- 워커 프로세스에서 실행되는 함수 (pickle 가능하도록 모듈 최상위에 둔다) ---
+
+def _page_key(page, version: str) -> Optional[str]:
+    """페이지 내용 스트림과 글꼴(ToUnicode 포함)의 해시, 추출 결과는 이것들로만 정해진다"""
+    try:
+        digest = hashlib.sha256(version.encode())
+        contents = page.get("/Contents")
+        if contents is not None:
+            contents = contents.get_object()
+            # 내용 스트림은 하나이거나 여러 스트림의 배열 (연산자 해석 없이 원본 바이트만 해시)
+            for stream in (contents if isinstance(contents, list) else [contents]):
+                digest.update(stream.get_object().get_data())
+        resources = page.get("/Resources")
+        fonts = resources.get_object().get("/Font") if resources is not None else None
+        if fonts is not None:
+            for name, font in sorted(fonts.get_object().items()):
+                font = font.get_object()
+                digest.update(f"{name}:{font.get('/BaseFont')}:{font.get('/Encoding')}".encode())
+                if "/ToUnicode" in font:
+                    digest.update(font["/ToUnicode"].get_object().get_data())
+        return digest.hexdigest()
+    except Exception:
+        # 구조가 특이한 페이지는 캐시하지 않고 매번 추출
+        return None
+
+
+def _pdf_page_keys(file_path: str) -> List[Optional[str]]:
+    import PyPDF2
+
+    # 추출기 버전이 바뀌면 캐시도 새로 만든다
+    version = f"pypdf2-{PyPDF2.__version__}"
+    with open(file_path, 'rb') as file:
+        return [_page_key(page, version) for page in PyPDF2.PdfReader(file).pages]
+
+
+def _extract_pdf_pages(file_path: str, indices: List[int]) -> List[str]:
+    import PyPDF2
+
+    with open(file_path, 'rb') as file:
+        pages = PyPDF2.PdfReader(file).pages
+        return [pages[i].extract_text() or "" for i in indices]
+
+
+def _warm_up() -> None:
+    return None
+
+
+def _extract_docx_paragraphs(file_path: str) -> List[str]:
+    from docx import Document
+
+    return [paragraph.text for paragraph in Document(file_path).paragraphs]
+
+
+_started_queue = None  # 워커가 작업을 시작할 때 (작업 ID, pid)를 알리는 큐
+
+
+def _init_worker(started) -> None:
+    global _started_queue
+    _started_queue = started
+
+
+def _tracked(task_id: int, func, *args):
+    """작업 시작을 부모에게 알리고 실행 (시간 초과 시 이 작업을 맡은 워커만 종료할 수 있도록)"""
+    if _started_queue is not None:
+        _started_queue.put((task_id, os.getpid()))
+    return func(*args)
+
+
+class _Job:
+    """풀에 제출한 작업 하나: 어느 풀의 어느 워커가 실행 중인지 추적한다"""
+
+    def __init__(self, task_id: int):
+        self.task_id = task_id
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.started = None
+        self.future: Optional[Future] = None
+        self.pid: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class DocumentExtractor:
+    """PDF/DOCX 텍스트 추출을 프로세스 풀에서 실행
+
+    PyPDF2/python-docx는 순수 파이썬이라 이벤트 루프에서 돌리면 다른 요청이 모두 멈춘다.
+    PDF는 페이지 묶음 단위 작업으로 나눠 여러 코어에서 추출하고, 결과는 페이지 순서대로 흘려보낸다.
+    page_cache를 주면 내용이 같은 페이지는 추출하지 않고 캐시된 텍스트를 쓴다.
+    소비자가 중간에 멈추거나(취소) 시간 제한을 넘기면 남은 작업을 취소한다.
+    실행 중인 작업은 취소할 수 없으므로, 시간 제한을 넘긴 작업을 맡은 워커만 종료하고 풀을 새로 만든다.
+    """
+
+    def __init__(self, max_workers: int, timeout: float = DEFAULT_TIMEOUT, pages_per_task: int = PAGES_PER_TASK,
+                 page_cache: Optional[PageTextCache] = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.pages_per_task = pages_per_task
+        self.page_cache = page_cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._started = None  # 현재 풀의 작업 시작 알림 큐
+        self._task_ids = itertools.count()
+        self._jobs: Dict[int, _Job] = {}  # 결과를 기다리는 작업 (작업 ID 기준)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._started = multiprocessing.Queue()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                 initargs=(self._started,))
+            logger.info(f"추출 프로세스 풀 시작: {self.max_workers}개 워커")
+        return self._executor
+
+    def _collect(self, started, job: Optional[_Job] = None, timeout: float = 0.0):
+        """알림 큐에 쌓인 작업 시작 알림을 읽어 기다리는 작업에 워커 pid를 기록
+
+        job을 주면 그 작업의 알림이 올 때까지 최대 timeout초 기다린다.
+        """
+        if started is None:
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if job is not None and job.pid is None:
+                    task_id, pid = started.get(timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    task_id, pid = started.get_nowait()
+            except queue.Empty:
+                return
+            target = job if job is not None and job.task_id == task_id else self._jobs.get(task_id)
+            if target is not None:
+                target.pid = pid
+
+    async def _call(self, job: _Job, func, *args):
+        """풀에서 func 실행
+
+        다른 작업의 시간 초과로 교체된(깨진) 풀에 있던 작업은 실패시키지 않고 새 풀에서 다시 실행한다.
+        """
+        while True:
+            job.executor, job.started, job.pid = self.executor, self._started, None
+            self._jobs[job.task_id] = job
+            job.future = job.executor.submit(_tracked, job.task_id, func, *args)
+            try:
+                return await asyncio.wrap_future(job.future)
+            except BrokenProcessPool:
+                if job.executor is self._executor:
+                    # 워커가 스스로 비정상 종료한 경우: 이 작업은 실패로 두고, 다음 작업은 새 풀에서
+                    self._executor = self._started = None
+                    raise
+                logger.warning(f"교체된 추출 풀에서 중단된 작업을 새 풀에서 다시 실행: {func.__name__}")
+            finally:
+                self._collect(job.started)
+                self._jobs.pop(job.task_id, None)
+
+    def _submit(self, func, *args) -> _Job:
+        job = _Job(next(self._task_ids))
+        job.task = asyncio.ensure_future(self._call(job, func, *args))
+        return job
+
+    def _abandon(self, job: _Job):
+        """시간 초과된 작업 정리: 아직 시작 전이면 취소, 실행 중이면 그 작업을 맡은 워커만 종료하고 풀을 교체
+
+        ProcessPoolExecutor는 워커 하나만 갈아 끼울 수 없어 워커가 종료되면 그 풀 전체가 깨진다.
+        같은 풀에서 실행 중이거나 대기 중이던 다른 문서의 작업은 실패하지 않고 새 풀에서 다시
+        실행되지만(_call), 이미 실행 중이던 작업(최대 pages_per_task 페이지)의 진행분은 버려진다.
+        멈춘 워커를 기다리며 CPU와 워커 자리를 계속 내주는 것보다 이 재실행 비용이 작다고 본다.
+        """
+        future = job.future
+        if future is None or future.cancel() or future.done():
+            return
+        self._collect(job.started, job, timeout=1.0)
+        if job.executor is self._executor:
+            self._executor = self._started = None
+            logger.warning("추출 프로세스 풀 교체: 대기/실행 중이던 다른 작업은 새 풀에서 다시 실행")
+        if job.pid is None:
+            # 시작 알림을 받지 못하면 어느 워커인지 알 수 없으므로 기존 풀이 스스로 끝나게 둔다
+            logger.error("멈춘 추출 작업의 워커를 찾지 못함: 기존 풀은 작업이 끝나면 정리된다")
+        else:
+            logger.warning(f"멈춘 추출 워커 강제 종료: pid {job.pid}")
+            try:
+                os.kill(job.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        job.executor.shutdown(wait=False)
+
+    def _timed_out(self, kind: str, file_path: str) -> TimeoutError:
+        logger.error(f"{kind} 텍스트 추출 시간 초과: {file_path} ({self.timeout}초)")
+        return TimeoutError(f"{kind} 텍스트 추출 시간 초과 ({self.timeout}초)")
+
+    def start(self):
+        """워커 프로세스를 미리 띄운다 (서버 시작 시, 스레드가 생기기 전에 호출)"""
+        for future in [self.executor.submit(_warm_up) for _ in range(self.max_workers)]:
+            future.result()
+
+    async def _wait(self, job: _Job, timeout: float):
+        try:
+            return await asyncio.wait_for(job.task, max(0.0, timeout))
+        except asyncio.TimeoutError:
+            self._abandon(job)
+            raise
+
+    async def iter_pdf_pages(self, file_path: str) -> AsyncIterator[Tuple[int, str]]:
+        """PDF 페이지를 (페이지 번호, 텍스트)로 순서대로 생성
+
+        시간 제한은 추출 결과를 기다린 시간의 합에 적용한다. 소비자가 페이지를 처리(임베딩)하는
+        동안에는 다음 작업이 미리 추출되므로, 그 시간은 제한에 포함하지 않는다.
+        """
+        budget = self.timeout
+        pending: List[_Job] = []
+
+        async def wait(job: _Job):
+            nonlocal budget
+            clock = time.monotonic()
+            try:
+                return await self._wait(job, budget)
+            finally:
+                budget -= time.monotonic() - clock
+
+        try:
+            keys = await wait(self._submit(_pdf_page_keys, file_path))
+            cached: Dict[str, str] = {}
+            if self.page_cache is not None:
+                cached = self.page_cache.get_many(key for key in keys if key is not None)
+
+            # 캐시에 없는 페이지만 추출 (같은 내용의 페이지가 여러 번 나오면 처음 것만)
+            missing, seen = [], set()
+            for index, key in enumerate(keys):
+                if key is None or (key not in cached and key not in seen):
+                    missing.append(index)
+                    seen.add(key)
+            tasks = [missing[start:start + self.pages_per_task] for start in range(0, len(missing), self.pages_per_task)]
+            if len(missing) < len(keys):
+                logger.info(f"PDF 페이지 {len(keys)}개 중 {len(keys) - len(missing)}개 캐시 재사용: {file_path}")
+
+            # 풀을 독점하지 않도록 동시에 제출하는 작업 수를 워커 수의 2배로 제한
+            window = self.max_workers * 2
+            next_task = 0
+            while next_task < len(tasks) and len(pending) < window:
+                pending.append(self._submit(_extract_pdf_pages, file_path, tasks[next_task]))
+                next_task += 1
+
+            uncached: Dict[int, str] = {}  # 키가 없는(캐시하지 않는) 페이지의 텍스트
+            done_tasks = 0
+            for index, key in enumerate(keys):
+                # 아직 추출되지 않은 페이지면 다음 작업(페이지 순서대로 제출됨)의 결과를 기다린다
+                if (key is None and index not in uncached) or (key is not None and key not in cached):
+                    indices = tasks[done_tasks]
+                    texts = await wait(pending.pop(0))
+                    done_tasks += 1
+                    if next_task < len(tasks):
+                        pending.append(self._submit(_extract_pdf_pages, file_path, tasks[next_task]))
+                        next_task += 1
+                    fresh = {}
+                    for page_index, text in zip(indices, texts):
+                        if keys[page_index] is None:
+                            uncached[page_index] = text
+                        else:
+                            fresh[keys[page_index]] = text
+                    cached.update(fresh)
+                    if self.page_cache is not None:
+                        self.page_cache.put_many(fresh)
+                yield index + 1, uncached.pop(index) if key is None else cached[key]
+        except asyncio.TimeoutError:
+            raise self._timed_out("PDF", file_path)
+        finally:
+            for job in pending:
+                job.task.cancel()
+
+    async def extract_docx_paragraphs(self, file_path: str) -> List[str]:
+        try:
+            return await self._wait(self._submit(_extract_docx_paragraphs, file_path), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out("DOCX", file_path)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._started = None
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.services.storage import FileLock
+
+logger = logging.getLogger(__name__)
+
+# 작업 상태
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+# 작업 단계
+STAGE_QUEUED = "queued"
+STAGE_EXTRACTING = "extracting"
+STAGE_INDEXING = "indexing"
+STAGE_DONE = "done"
+
+DEFAULT_JOBS_PATH = os.path.join("data", "jobs.sqlite3")
+DEFAULT_LOCK_PATH = os.path.join("data", "ingestion.lock")
+DEFAULT_POLL_INTERVAL = 2.0  # 쓰기 담당 워커가 다른 프로세스의 새 작업을 확인하는 간격 (초)
+_JOB_FIELDS = (
+    "id", "filename", "filepath", "sha256", "status", "stage", "pages", "chunks", "reused_chunks",
+    "document_id", "error", "created_at", "updated_at"
+)
+
+
+class JobStore:
+    """수집 작업 상태를 SQLite에 보관 (서버 재시작 후에도 조회/재개 가능)"""
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, filename TEXT NOT NULL, filepath TEXT NOT NULL, sha256 TEXT, "
+            "status TEXT NOT NULL, stage TEXT NOT NULL, pages INTEGER NOT NULL DEFAULT 0, "
+            "chunks INTEGER NOT NULL DEFAULT 0, reused_chunks INTEGER NOT NULL DEFAULT 0, "
+            "document_id TEXT, error TEXT, "
+            "created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_sha256 ON jobs(sha256)")
+        self.conn.commit()
+
+    def create(self, filename: str, filepath: str, sha256: Optional[str] = None,
+               document_id: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        job = {
+            "id": uuid.uuid4().hex[:16],
+            "filename": filename,
+            "filepath": filepath,
+            "sha256": sha256,
+            "status": STATUS_QUEUED,
+            "stage": STAGE_QUEUED,
+            "pages": 0,
+            "chunks": 0,
+            "reused_chunks": 0,
+            "document_id": document_id,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO jobs ({', '.join(_JOB_FIELDS)}) VALUES ({', '.join('?' * len(_JOB_FIELDS))})",
+                [job[field] for field in _JOB_FIELDS]
+            )
+            self.conn.commit()
+        return job
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = datetime.now().isoformat()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+            self.conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_active(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """같은 내용(SHA-256)의 대기/진행 중 작업"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE sha256 = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (sha256, STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class IngestionQueue:
+    """업로드된 파일을 백그라운드 워커들이 순서대로 처리하는 큐
+
+    handler(job)가 실제 추출/색인을 하고, 예외가 나면 작업을 실패로 기록한다.
+    시작 시 끝나지 않은 작업(서버 중단으로 멈춘 작업 포함)을 다시 큐에 넣는다.
+
+    lock_path를 주면 여러 웹 워커 프로세스 중 파일 잠금을 잡은 하나만 작업을 처리한다(쓰기 담당).
+    나머지 프로세스는 작업을 JobStore에 등록만 하고, 쓰기 담당이 주기적으로 가져간다.
+    쓰기 담당 프로세스가 죽으면 잠금이 풀리고 다른 프로세스가 이어받아 멈춘 작업을 재개한다.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[Dict[str, Any]], Awaitable[None]], workers: int = 2,
+                 lock_path: Optional[str] = None, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.file_lock = FileLock(lock_path) if lock_path else None
+        self.is_writer = False
+        self.queue: Optional[asyncio.Queue] = None
+        self._enqueued: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._try_lead()
+        if self.file_lock is not None:
+            self._tasks.append(asyncio.create_task(self._watch()))
+        if not self.is_writer:
+            logger.info("수집 작업은 다른 프로세스가 처리 (쓰기 담당 아님)")
+
+    def _try_lead(self) -> bool:
+        """쓰기 담당 잠금을 잡으면 멈춘 작업을 다시 넣고 워커 시작"""
+        if self.file_lock is not None and not self.file_lock.acquire(blocking=False):
+            return False
+        self.is_writer = True
+        for job in self.store.list_unfinished():
+            if job["id"] in self._enqueued:
+                continue
+            self.store.update(job["id"], status=STATUS_QUEUED, stage=STAGE_QUEUED)
+            self._enqueue(job["id"])
+            logger.info(f"미완료 수집 작업 재개: {job['id']} ({job['filename']})")
+        self._tasks.extend(asyncio.create_task(self._worker(i)) for i in range(self.workers))
+        logger.info(f"수집 작업 큐 시작: 워커 {self.workers}개 (pid {os.getpid()})")
+        return True
+
+    async def _watch(self):
+        """쓰기 담당이면 다른 프로세스가 등록한 작업을 가져오고, 아니면 잠금을 다시 시도"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if not self.is_writer:
+                    self._try_lead()
+                    continue
+                for job in self.store.list_unfinished():
+                    if job["status"] == STATUS_QUEUED and job["id"] not in self._enqueued:
+                        self._enqueue(job["id"])
+            except Exception as e:
+                logger.error(f"수집 작업 확인 실패: {e}")
+
+    def _enqueue(self, job_id: str):
+        self._enqueued.add(job_id)
+        self.queue.put_nowait(job_id)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.file_lock is not None and self.file_lock.locked:
+            self.file_lock.release()
+        self.is_writer = False
+
+    def submit(self, filename: str, filepath: str, sha256: Optional[str] = None,
+               document_id: Optional[str] = None) -> Dict[str, Any]:
+        job = self.store.create(filename, filepath, sha256, document_id)
+        if self.is_writer:
+            self._enqueue(job["id"])
+            logger.info(f"수집 작업 등록: {job['id']} ({filename}), 대기 {self.queue.qsize()}개")
+        else:
+            logger.info(f"수집 작업 등록: {job['id']} ({filename}), 쓰기 담당 프로세스가 처리")
+        return job
+
+    def retry(self, job_id: str) -> Dict[str, Any]:
+        """실패한 작업을 처음 단계부터 다시 큐에 넣음 (업로드 파일은 그대로 재사용)"""
+        self.store.update(job_id, status=STATUS_QUEUED, stage=STAGE_QUEUED, error=None)
+        if self.is_writer and job_id not in self._enqueued:
+            self._enqueue(job_id)
+        logger.info(f"수집 작업 재시도: {job_id}")
+        return self.store.get(job_id)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                job = self.store.get(job_id)
+                if job is None or job["status"] not in (STATUS_QUEUED, STATUS_RUNNING):
+                    continue
+                self.store.update(job_id, status=STATUS_RUNNING)
+                await self.handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"수집 작업 실패: {job_id} (워커 {worker_id}) - {e}")
+                self.store.update(job_id, status=STATUS_FAILED, error=str(e))
+            finally:
+                self._enqueued.discard(job_id)
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "is_writer": self.is_writer
+        }
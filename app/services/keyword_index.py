@@ -0,0 +1,323 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.storage import MappedArray
+
+logger = logging.getLogger(__name__)
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_TERM_LENGTH = 20
+
+# 포스팅 블록 병합 설정
+MERGE_FANOUT = 8  # 같은 단계 블록이 이만큼 쌓이면 다음 단계 블록 하나로 합친다
+MERGE_TERM_BATCH = 512  # 병합 시 한 번에 합치는 용어 수
+PART_POSTINGS = 4096  # 병합 블록의 용어별 포스팅은 영향도 순으로 정렬해 이 크기의 조각으로 나눠 저장
+SCAN_PARTS = 2  # 검색 때 블록마다 읽는 조각 수 (흔한 용어는 영향도 상위 포스팅만 점수화)
+DEFAULT_DEAD_FRACTION = 0.3  # 삭제된 문서 비율이 이 이상인 블록은 다시 쓴다
+
+_RUN_PATTERN = re.compile(r"[0-9a-z가-힣]+")
+_HANGUL_PATTERN = re.compile(r"[가-힣]")
+
+
+def tokenize(text: str) -> List[str]:
+    """형태소 분석기 없이 쓰는 토큰화: 영숫자/한글 연속 구간 + 한글 포함 구간의 문자 bigram
+
+    "제12조"처럼 붙어 있는 조문 번호는 구간 전체로도 색인되어 정확히 일치하고,
+    "비밀번호는" 같은 어절은 bigram("비밀", "밀번", ...)으로 조사와 무관하게 매칭된다.
+    """
+    tokens = []
+    for run in _RUN_PATTERN.findall(text.lower()):
+        if len(run) <= MAX_TERM_LENGTH:
+            tokens.append(run)
+        if len(run) > 2 and _HANGUL_PATTERN.search(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class KeywordIndex:
+    """청크 단위 BM25 역색인 (SQLite)
+
+    포스팅은 블록 단위로 묶는다. 새 문서 버전은 0단계 블록 하나가 되고, 같은 단계의 블록이
+    MERGE_FANOUT개 쌓이면 다음 단계 블록으로 병합한다(LSM 방식). 그래서 용어 하나당 읽는 SQLite
+    행 수는 문서 수가 아니라 대략 MERGE_FANOUT x 단계 수로 제한된다.
+    병합 블록은 용어별 포스팅을 BM25 영향도(빈도와 청크 길이로 정한 점수) 순으로 PART_POSTINGS개씩
+    나눠 저장하고, 검색은 블록마다 앞의 SCAN_PARTS개 조각만 읽는다. 거의 모든 청크에 나오는 용어도
+    점수화하는 포스팅 수가 제한되며, 그런 용어는 IDF가 낮아 순위에 주는 영향도 작다.
+    행 번호는 벡터 엔진과 같은 번호를 쓴다.
+    """
+
+    def __init__(self, index_dir: str):
+        self.path = os.path.join(index_dir, "keywords.sqlite3")
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS blocks ("
+            "id INTEGER PRIMARY KEY, level INTEGER NOT NULL, docs INTEGER NOT NULL, dead INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "doc_start INTEGER PRIMARY KEY, count INTEGER NOT NULL, block INTEGER NOT NULL, "
+            "dead INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, block INTEGER NOT NULL, part INTEGER NOT NULL, df INTEGER NOT NULL, "
+            "rows BLOB NOT NULL, tfs BLOB NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_term ON postings(term, part)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_block ON postings(block)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_block ON docs(block)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.commit()
+
+        self.lengths = MappedArray(os.path.join(index_dir, "keyword_lengths.i32"), np.int32)
+        stats = dict(self.conn.execute("SELECT key, value FROM stats").fetchall())
+        self.total_tokens = stats.get("total_tokens", 0)
+        self.total_chunks = stats.get("total_chunks", 0)
+
+    def reload(self):
+        """다른 프로세스가 커밋한 통계와 길이 배열 다시 읽기 (포스팅은 SQLite가 매번 최신을 읽는다)"""
+        with self.lock:
+            stats = dict(self.conn.execute("SELECT key, value FROM stats").fetchall())
+            self.total_tokens = stats.get("total_tokens", 0)
+            self.total_chunks = stats.get("total_chunks", 0)
+            self.lengths.refresh()
+
+    def _save_stats(self):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)",
+            [("total_tokens", self.total_tokens), ("total_chunks", self.total_chunks)]
+        )
+
+    def add(self, doc_start: int, first_row: int, texts: List[str]):
+        """청크 배치를 색인 (doc_start는 문서 버전을 구분하는 첫 행 번호, 문서 버전마다 0단계 블록 하나)"""
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths = []
+        for row, text in enumerate(texts, first_row):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                rows, tfs = postings.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+
+        with self.lock:
+            self.lengths.reserve(first_row + len(texts))
+            self.lengths.data[first_row:first_row + len(texts)] = lengths
+            found = self.conn.execute("SELECT block FROM docs WHERE doc_start = ?", (doc_start,)).fetchone()
+            if found is None:
+                block = self.conn.execute("INSERT INTO blocks (level, docs) VALUES (0, 1)").lastrowid
+                self.conn.execute("INSERT INTO docs (doc_start, count, block) VALUES (?, 0, ?)", (doc_start, block))
+            else:
+                block = found[0]
+            self.conn.execute("UPDATE docs SET count = count + ? WHERE doc_start = ?", (len(texts), doc_start))
+            self.conn.executemany(
+                "INSERT INTO postings (term, block, part, df, rows, tfs) VALUES (?, ?, 0, ?, ?, ?)",
+                [
+                    (term, block, len(rows), np.asarray(rows, dtype=np.int64).tobytes(),
+                     np.asarray(tfs, dtype=np.int32).tobytes())
+                    for term, (rows, tfs) in postings.items()
+                ]
+            )
+            self.total_tokens += int(sum(lengths))
+            self.total_chunks += len(texts)
+            self._save_stats()
+            self.conn.commit()
+
+    def remove(self, doc_start: int, count: int):
+        """추가가 끝나지 않은 문서 버전의 포스팅과 길이 통계 제거 (아직 병합되지 않은 0단계 블록)"""
+        with self.lock:
+            found = self.conn.execute("SELECT block FROM docs WHERE doc_start = ?", (doc_start,)).fetchone()
+            if found is not None:
+                self.conn.execute("DELETE FROM postings WHERE block = ?", found)
+                self.conn.execute("DELETE FROM blocks WHERE id = ?", found)
+                self.conn.execute("DELETE FROM docs WHERE doc_start = ?", (doc_start,))
+                self.total_tokens -= int(self.lengths.data[doc_start:doc_start + count].sum())
+                self.total_chunks -= count
+                self._save_stats()
+            self.conn.commit()
+
+    def mark_deleted(self, doc_start: int, count: int):
+        """삭제된 문서 버전을 통계에서만 뺀다 (포스팅은 검색 때 alive로 걸러지고 블록 병합 때 지운다)"""
+        with self.lock:
+            found = self.conn.execute("SELECT block, dead FROM docs WHERE doc_start = ?", (doc_start,)).fetchone()
+            if found is None or found[1]:
+                return
+            self.conn.execute("UPDATE docs SET dead = 1 WHERE doc_start = ?", (doc_start,))
+            self.conn.execute("UPDATE blocks SET dead = dead + 1 WHERE id = ?", (found[0],))
+            self.total_tokens -= int(self.lengths.data[doc_start:doc_start + count].sum())
+            self.total_chunks -= count
+            self._save_stats()
+            self.conn.commit()
+
+    @staticmethod
+    def _plan(blocks: List[Tuple[int, int, int, int]], dead_fraction: float) -> Optional[Tuple[List[int], int]]:
+        """병합할 블록들과 새 블록의 단계 (할 일이 없으면 None)
+
+        1. 삭제된 문서 비율이 dead_fraction 이상인 블록은 혼자 다시 쓴다.
+        2. 같은 단계 블록이 MERGE_FANOUT개 이상이면 오래된 것부터 MERGE_FANOUT개를 다음 단계로 합친다.
+        """
+        for block, level, docs, dead in blocks:
+            if dead and dead >= docs * dead_fraction:
+                return [block], level
+        by_level: Dict[int, List[int]] = {}
+        for block, level, _, _ in blocks:
+            by_level.setdefault(level, []).append(block)
+        for level in sorted(by_level):
+            if len(by_level[level]) >= MERGE_FANOUT:
+                return by_level[level][:MERGE_FANOUT], level + 1
+        return None
+
+    def _impact(self, rows: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        """IDF를 뺀 BM25 용어 점수 (병합 블록 안 포스팅 정렬 기준)"""
+        avg_length = self.total_tokens / self.total_chunks if self.total_chunks > 0 else 1.0
+        tfs = tfs.astype(np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths.data[rows] / max(avg_length, 1.0))
+        return tfs * (BM25_K1 + 1) / (tfs + norm)
+
+    def compact(self, alive: np.ndarray, dead_fraction: float = DEFAULT_DEAD_FRACTION,
+                max_merges: Optional[int] = None) -> int:
+        """병합 정책에 걸리는 블록을 병합하고 삭제된 행의 포스팅을 버림, 병합 횟수 반환
+
+        쓰기(add/remove)와 동시에 부르면 안 된다 (엔진의 쓰기 잠금 안에서 호출).
+        별도 연결의 트랜잭션으로 바꾸므로 검색은 막지 않고, 검색은 병합 전이나 후 상태만 본다.
+        """
+        merges = 0
+        conn = sqlite3.connect(self.path)
+        try:
+            while max_merges is None or merges < max_merges:
+                plan = self._plan(conn.execute("SELECT id, level, docs, dead FROM blocks ORDER BY id").fetchall(),
+                                  dead_fraction)
+                if plan is None:
+                    break
+                self._merge(conn, *plan, alive)
+                merges += 1
+        finally:
+            conn.close()
+        return merges
+
+    def _merge(self, conn: sqlite3.Connection, blocks: List[int], level: int, alive: np.ndarray):
+        placeholders = ",".join("?" * len(blocks))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DELETE FROM docs WHERE block IN ({placeholders}) AND dead = 1", blocks)
+            live_docs = conn.execute(f"SELECT COUNT(*) FROM docs WHERE block IN ({placeholders})", blocks).fetchone()[0]
+            merged = None
+            if live_docs:
+                merged = conn.execute("INSERT INTO blocks (level, docs) VALUES (?, ?)", (level, live_docs)).lastrowid
+                conn.execute(f"UPDATE docs SET block = ? WHERE block IN ({placeholders})", [merged, *blocks])
+
+                # 용어를 나눠서 합쳐 메모리 사용량을 제한한다
+                terms = [term for (term,) in conn.execute(
+                    f"SELECT DISTINCT term FROM postings WHERE block IN ({placeholders})", blocks
+                )]
+                for start in range(0, len(terms), MERGE_TERM_BATCH):
+                    batch = terms[start:start + MERGE_TERM_BATCH]
+                    per_term: Dict[str, Tuple[List[np.ndarray], List[np.ndarray]]] = {}
+                    for term, rows_blob, tfs_blob in conn.execute(
+                        f"SELECT term, rows, tfs FROM postings WHERE term IN ({','.join('?' * len(batch))}) "
+                        f"AND block IN ({placeholders})", [*batch, *blocks]
+                    ):
+                        rows_list, tfs_list = per_term.setdefault(term, ([], []))
+                        rows_list.append(np.frombuffer(rows_blob, dtype=np.int64))
+                        tfs_list.append(np.frombuffer(tfs_blob, dtype=np.int32))
+                    records = []
+                    for term, (rows_list, tfs_list) in per_term.items():
+                        rows, tfs = np.concatenate(rows_list), np.concatenate(tfs_list)
+                        keep = alive[rows] != 0
+                        if not keep.all():
+                            rows, tfs = rows[keep], tfs[keep]
+                        if len(rows) == 0:
+                            continue
+                        order = np.argsort(-self._impact(rows, tfs), kind='stable')
+                        rows, tfs = rows[order], tfs[order]
+                        for part, start_at in enumerate(range(0, len(rows), PART_POSTINGS)):
+                            end_at = start_at + PART_POSTINGS
+                            records.append((term, merged, part, len(rows), rows[start_at:end_at].tobytes(),
+                                            tfs[start_at:end_at].tobytes()))
+                    conn.executemany(
+                        "INSERT INTO postings (term, block, part, df, rows, tfs) VALUES (?, ?, ?, ?, ?, ?)", records
+                    )
+
+            conn.execute(f"DELETE FROM postings WHERE block IN ({placeholders})", blocks)
+            conn.execute(f"DELETE FROM blocks WHERE id IN ({placeholders})", blocks)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.debug(f"키워드 블록 병합: {len(blocks)}개 -> 단계 {level} (문서 {live_docs}개)")
+
+    def search(self, query: str, n: int, limit: int, alive: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 상위 limit개 (행 번호, 점수), n 이상의 행(아직 커밋되지 않은 행)은 제외"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or self.total_chunks <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        with self.lock:
+            placeholders = ",".join("?" * len(terms))
+            records = self.conn.execute(
+                f"SELECT term, part, df, rows, tfs FROM postings WHERE term IN ({placeholders}) AND part < ?",
+                [*terms, SCAN_PARTS]
+            ).fetchall()
+            avg_length = self.total_tokens / self.total_chunks
+
+            # df는 읽지 않은 조각까지 포함한 블록별 포스팅 수의 합 (삭제된 행도 병합 전까지는 포함)
+            per_term: Dict[str, Tuple[List[int], List[np.ndarray], List[np.ndarray]]] = {}
+            for term, part, df, rows_blob, tfs_blob in records:
+                dfs, rows_list, tfs_list = per_term.setdefault(term, ([], [], []))
+                if part == 0:
+                    dfs.append(df)
+                rows_list.append(np.frombuffer(rows_blob, dtype=np.int64))
+                tfs_list.append(np.frombuffer(tfs_blob, dtype=np.int32))
+
+            all_rows, all_scores = [], []
+            for dfs, rows_list, tfs_list in per_term.values():
+                rows = np.concatenate(rows_list)
+                tfs = np.concatenate(tfs_list).astype(np.float32)
+                keep = rows < n
+                if alive is not None:
+                    keep &= alive[np.minimum(rows, n - 1)] != 0
+                rows, tfs = rows[keep], tfs[keep]
+                if len(rows) == 0:
+                    continue
+                # 삭제된 행이 남은 블록의 df는 살아있는 청크 수보다 클 수 있다 (idf가 음수가 되지 않게)
+                df = min(max(sum(dfs), len(rows)), self.total_chunks)
+                idf = np.log(1 + (self.total_chunks - df + 0.5) / (df + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths.data[rows] / avg_length)
+                all_rows.append(rows)
+                all_scores.append((idf * tfs * (BM25_K1 + 1) / (tfs + norm)).astype(np.float32))
+
+        if not all_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if sum(len(rows) for rows in all_rows) * 8 >= n:
+            # 포스팅이 많으면 정렬(np.unique) 대신 행 번호 크기의 누적 배열에 더한다 (용어 안에서 행은 겹치지 않는다)
+            accumulated = np.zeros(n, dtype=np.float32)
+            for rows, term_scores in zip(all_rows, all_scores):
+                accumulated[rows] += term_scores
+            unique_rows = np.flatnonzero(accumulated)
+            scores = accumulated[unique_rows]
+        else:
+            unique_rows, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(all_scores)).astype(np.float32)
+
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return unique_rows[top], scores[top]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            blocks = self.conn.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+        return {"chunks": self.total_chunks, "tokens": self.total_tokens, "blocks": blocks}
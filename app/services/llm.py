@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Ollama 클라이언트 기본 설정
+DEFAULT_MAX_CONCURRENCY = 4  # 동시에 Ollama로 보내는 생성 요청 수
+DEFAULT_MAX_WAITING = 16  # 슬롯을 기다릴 수 있는 요청 수 (넘으면 즉시 거절)
+DEFAULT_QUEUE_TIMEOUT = 30.0  # 슬롯 대기 최대 초
+DEFAULT_TIMEOUT = 120.0  # 응답 전체가 아니라 읽기 간격 기준 (스트리밍 중에는 토큰 사이 간격)
+DEFAULT_HEALTH_INTERVAL = 30.0  # 백그라운드 준비 상태 확인 간격 (초)
+HEALTH_TIMEOUT = 5.0
+DEFAULT_OPTIONS = {
+    "temperature": 0.3,  # 창의성 줄이고 정확성 향상
+    "top_p": 0.9
+}
+
+
+class OllamaBusyError(Exception):
+    """동시 생성 요청 한도를 넘어 대기열도 가득 찬 경우"""
+
+
+class OllamaClient:
+    """연결 풀을 공유하는 비동기 Ollama 클라이언트
+
+    요청마다 연결을 새로 맺지 않고 keep-alive 연결을 재사용한다.
+    동시에 생성하는 요청 수를 세마포어로 제한하고, 대기열이 차거나 대기 시간이 지나면
+    OllamaBusyError를 던져 호출 측이 503으로 빠르게 거절하게 한다(백프레셔).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        model: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_waiting: int = DEFAULT_MAX_WAITING,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+        timeout: float = DEFAULT_TIMEOUT
+    ):
+        self.host = host
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.client = httpx.AsyncClient(
+            base_url=host,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._active = 0
+        self._waiting = 0
+        # 준비 상태는 백그라운드에서 주기적으로 갱신하고 /api/health는 마지막 결과만 읽는다
+        self.health: Dict[str, Any] = {"ready": False, "model_available": False, "checked_at": None, "error": "확인 전"}
+        self._health_client: Optional[httpx.AsyncClient] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    def slot(self):
+        """생성 슬롯 하나를 잡는 컨텍스트 (혼잡하면 OllamaBusyError)
+
+        스트리밍 응답은 시작하면 상태 코드를 바꿀 수 없으므로, 응답 전에 미리 잡고 stream(reserved=True)를 쓴다.
+        """
+        return self._slot()
+
+    @asynccontextmanager
+    async def _slot(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            if self._waiting >= self.max_waiting:
+                raise OllamaBusyError(f"생성 요청 대기열이 가득 찼습니다 (대기 {self._waiting}개)")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise OllamaBusyError(f"생성 슬롯 대기 시간 초과 ({self.queue_timeout}초)")
+            finally:
+                self._waiting -= 1
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def _payload(self, prompt: str, stream: bool, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": options or DEFAULT_OPTIONS
+        }
+
+    async def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """답변 전체를 한 번에 받아 반환"""
+        async with self._slot():
+            response = await self.client.post("/api/generate", json=self._payload(prompt, False, options))
+            response.raise_for_status()
+            return response.json().get("response", "")
+
+    async def stream(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                     reserved: bool = False) -> AsyncIterator[str]:
+        """Ollama의 NDJSON 스트림에서 토큰 조각을 받는 대로 생성
+
+        소비자가 읽는 만큼만 응답 본문을 읽으므로 느린 클라이언트가 메모리에 토큰을 쌓지 않는다.
+        소비자가 중간에 멈추면(연결 끊김) 응답을 닫아 Ollama 쪽 생성도 중단된다.
+        reserved=True면 호출자가 slot()으로 이미 잡은 슬롯을 쓴다.
+        """
+        async with (nullcontext() if reserved else self._slot()):
+            async with self.client.stream("POST", "/api/generate", json=self._payload(prompt, True, options)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise Exception(f"Ollama 생성 실패: {data['error']}")
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        break
+
+    async def check_health(self) -> Dict[str, Any]:
+        """Ollama 응답 여부와 모델 설치 여부 확인 (생성 요청과 연결 풀을 나누어 혼잡해도 막히지 않음)"""
+        if self._health_client is None:
+            self._health_client = httpx.AsyncClient(base_url=self.host, timeout=HEALTH_TIMEOUT)
+        try:
+            response = await self._health_client.get("/api/tags")
+            response.raise_for_status()
+            models = {model.get("name") for model in response.json().get("models", [])}
+            available = self.model in models or f"{self.model}:latest" in models
+            self.health = {
+                "ready": available,
+                "model_available": available,
+                "checked_at": datetime.now().isoformat(),
+                "error": None if available else f"모델이 설치되어 있지 않습니다: {self.model}"
+            }
+        except Exception as e:
+            self.health = {
+                "ready": False,
+                "model_available": False,
+                "checked_at": datetime.now().isoformat(),
+                "error": str(e) or type(e).__name__
+            }
+        return self.health
+
+    def start_health_checks(self, interval: float = DEFAULT_HEALTH_INTERVAL):
+        async def loop():
+            while True:
+                previous = self.health["ready"]
+                health = await self.check_health()
+                if health["ready"] != previous:
+                    log = logger.info if health["ready"] else logger.warning
+                    log(f"Ollama 준비 상태 변경: {'준비됨' if health['ready'] else '사용 불가'} ({health['error'] or self.model})")
+                await asyncio.sleep(interval)
+
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(loop())
+
+    async def stop_health_checks(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    async def close(self):
+        await self.stop_health_checks()
+        if self._health_client is not None:
+            await self._health_client.aclose()
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_waiting": self.max_waiting
+        }
@@ -0,0 +1,90 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_CACHE_PATH = os.path.join("data", "page_cache.sqlite3")
+DEFAULT_MAX_PAGES = 100000  # 이보다 많으면 가장 오래 쓰지 않은 페이지부터 지운다
+
+
+class PageTextCache:
+    """PDF 페이지별 추출 텍스트 캐시 (SQLite)
+
+    키는 페이지 내용 스트림(과 글꼴)의 해시이므로, 개정판 PDF나 실패 후 재시도에서는
+    바뀐 페이지만 다시 추출한다. 텍스트는 zlib으로 압축해 저장한다.
+    """
+
+    def __init__(self, path: str = DEFAULT_PAGE_CACHE_PATH, max_pages: int = DEFAULT_MAX_PAGES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_pages = max_pages
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "key TEXT PRIMARY KEY, text BLOB NOT NULL, used_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_used_at ON pages(used_at)")
+        self.conn.commit()
+        # 행 수는 시작할 때 한 번만 세고 이후에는 직접 더하고 뺀다
+        # (다른 워커가 넣은 행은 빠지므로, 한도를 넘었다고 판단될 때만 다시 센다)
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """캐시에 있는 페이지 텍스트 {키: 텍스트} (사용 시각 갱신)"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        with self.lock:
+            # SQLite 변수 개수 제한을 넘지 않도록 나눠서 조회
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, text FROM pages WHERE key IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((key, zlib.decompress(text).decode('utf-8')) for key, text in rows)
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE pages SET used_at = ? WHERE key = ?", [(now, key) for key in found])
+                self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, pages: Dict[str, str]):
+        if not pages:
+            return
+        now = time.time()
+        with self.lock:
+            rows = [(key, zlib.compress(text.encode('utf-8')), now) for key, text in pages.items()]
+            self.entries += self.conn.executemany(
+                "INSERT OR IGNORE INTO pages (key, text, used_at) VALUES (?, ?, ?)", rows
+            ).rowcount
+            # 이미 있던 키(다른 워커가 먼저 넣은 페이지)는 내용과 사용 시각만 갱신
+            self.conn.executemany("UPDATE pages SET text = ?, used_at = ? WHERE key = ?",
+                                  [(text, used_at, key) for key, text, used_at in rows])
+            if self.entries > self.max_pages:
+                self.entries = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+                overflow = self.entries - self.max_pages
+                if overflow > 0:
+                    self.entries -= self.conn.execute(
+                        "DELETE FROM pages WHERE key IN (SELECT key FROM pages ORDER BY used_at LIMIT ?)", (overflow,)
+                    ).rowcount
+                    logger.debug(f"페이지 캐시 정리: {overflow}개 삭제")
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": self.entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,201 @@
+import logging
+import os
+import shutil
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.storage import MappedArray
+
+logger = logging.getLogger(__name__)
+
+# 세그먼트 기본 설정
+DEFAULT_SEGMENT_ROWS = 50000  # 쓰기 세그먼트가 이 행 수를 넘으면 봉인하고 새 세그먼트에 추가
+DEFAULT_MAX_SEGMENTS = 8  # 봉인된 세그먼트가 이보다 많으면 이웃한 작은 세그먼트끼리 병합
+DEFAULT_DEAD_FRACTION = 0.3  # 삭제 표시된 행 비율이 이 이상인 세그먼트는 다시 쓴다
+ROW_IDS_FILE = "row_ids.i64"
+MERGE_BATCH_ROWS = 8192  # 병합 시 한 번에 복사하는 행 수 (메모리 사용량 제한)
+
+
+class Segment:
+    """행 번호 구간 하나를 담는 세그먼트 (벡터/청크 범위/페이지/해시)
+
+    쓰기 세그먼트는 [base, base + count) 행을 빈틈없이 담고 끝에만 추가한다.
+    봉인된 세그먼트의 내용은 바뀌지 않으며, 삭제는 엔진의 alive 비트맵에만 표시된다.
+    병합으로 만든 세그먼트는 살아있던 행만 담으므로 행 번호 목록(row_ids)을 따로 둔다.
+    """
+
+    def __init__(self, root: str, name: str, dim: int, base: int, count: int = 0, dead: int = 0,
+                 sealed: bool = False, dense: bool = True):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self.base = base
+        self.count = count
+        self.dead = dead
+        self.sealed = sealed
+        self.dense = dense
+
+        self.vectors = MappedArray(os.path.join(self.path, "vectors.f32"), np.float32, (dim,))
+        self.spans = MappedArray(os.path.join(self.path, "spans.i64"), np.int64, (2,))
+        self.pages = MappedArray(os.path.join(self.path, "pages.i32"), np.int32)
+        self.hashes = MappedArray(os.path.join(self.path, "hashes.u64"), np.uint64)
+        self.arrays = (self.vectors, self.spans, self.pages, self.hashes)
+        self.row_ids: Optional[np.ndarray] = None
+        if not dense and count:
+            self.row_ids = np.fromfile(os.path.join(self.path, ROW_IDS_FILE), dtype=np.int64, count=count)
+
+    @classmethod
+    def create(cls, root: str, dim: int, base: int, **kwargs) -> "Segment":
+        name = uuid.uuid4().hex[:12]
+        os.makedirs(os.path.join(root, name))
+        return cls(root, name, dim, base, **kwargs)
+
+    @classmethod
+    def open(cls, root: str, dim: int, meta: Dict[str, Any]) -> "Segment":
+        """meta.json에 기록된 세그먼트 열기 (병합으로 이미 지워졌으면 FileNotFoundError)"""
+        if not os.path.isdir(os.path.join(root, meta["name"])):
+            raise FileNotFoundError(f"세그먼트가 없습니다: {meta['name']}")
+        return cls(root, meta["name"], dim, meta["base"], meta["count"], meta.get("dead", 0),
+                   meta.get("sealed", False), meta.get("dense", True))
+
+    def to_meta(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "base": self.base,
+            "count": self.count,
+            "dead": self.dead,
+            "sealed": self.sealed,
+            "dense": self.dense
+        }
+
+    @property
+    def end(self) -> int:
+        """담고 있는 가장 큰 행 번호 + 1"""
+        if self.dense:
+            return self.base + self.count
+        return int(self.row_ids[-1]) + 1 if self.count else self.base
+
+    @property
+    def live(self) -> int:
+        return self.count - self.dead
+
+    @property
+    def dead_fraction(self) -> float:
+        return self.dead / self.count if self.count else 0.0
+
+    def rows(self) -> np.ndarray:
+        if self.dense:
+            return np.arange(self.base, self.base + self.count, dtype=np.int64)
+        return self.row_ids
+
+    def local(self, rows):
+        """행 번호 -> 세그먼트 안 위치"""
+        if self.dense:
+            return rows - self.base
+        return np.searchsorted(self.row_ids, rows)
+
+    def write_row_ids(self, row_ids: np.ndarray):
+        row_ids.astype(np.int64).tofile(os.path.join(self.path, ROW_IDS_FILE))
+        self.row_ids = row_ids.astype(np.int64)
+        self.dense = False
+
+    def reserve(self, size: int):
+        for array in self.arrays:
+            array.reserve(size)
+
+    def flush(self):
+        for array in self.arrays:
+            array.flush()
+
+    def refresh(self, meta: Dict[str, Any]):
+        """다른 프로세스가 커밋한 행 수/삭제 수 반영 (쓰기 세그먼트는 파일이 커졌을 수 있다)"""
+        self.count = meta["count"]
+        self.dead = meta.get("dead", 0)
+        self.sealed = meta.get("sealed", False)
+        for array in self.arrays:
+            array.refresh()
+
+    def remove(self):
+        """세그먼트 파일 삭제 (다른 프로세스가 매핑 중이어도 리눅스에서는 매핑이 유지된다)"""
+        self.vectors = self.spans = self.pages = self.hashes = None
+        self.arrays = ()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class SegmentRows:
+    """여러 세그먼트에 흩어진 배열을 행 번호로 읽는 보기 (IVF 학습/검색에 memmap 대신 넘긴다)"""
+
+    def __init__(self, segments: Sequence[Segment], field: str):
+        self.segments = segments
+        self.field = field
+        self.bases = np.array([segment.base for segment in segments], dtype=np.int64)
+
+    def __getitem__(self, rows):
+        if np.isscalar(rows):
+            segment = self.segments[int(np.searchsorted(self.bases, rows, side='right')) - 1]
+            return getattr(segment, self.field).data[segment.local(rows)]
+
+        rows = np.asarray(rows, dtype=np.int64)
+        sample = getattr(self.segments[0], self.field).data
+        out = np.empty((len(rows),) + sample.shape[1:], dtype=sample.dtype)
+        owners = np.searchsorted(self.bases, rows, side='right') - 1
+        for index in np.unique(owners):
+            mask = owners == index
+            segment = self.segments[index]
+            out[mask] = getattr(segment, self.field).data[segment.local(rows[mask])]
+        return out
+
+
+def plan_compaction(segments: Sequence[Segment], max_segments: int = DEFAULT_MAX_SEGMENTS,
+                    dead_fraction: float = DEFAULT_DEAD_FRACTION) -> Optional[Tuple[int, int]]:
+    """병합할 이웃 세그먼트 구간 [start, end) 하나를 고른다 (할 일이 없으면 None)
+
+    1. 삭제 비율이 dead_fraction 이상인 세그먼트 중 가장 높은 것을 혼자 다시 쓴다.
+    2. 봉인된 세그먼트가 max_segments보다 많으면 살아있는 행 합이 가장 작은 이웃 쌍을 합친다.
+    """
+    dirty = [(segment.dead_fraction, i) for i, segment in enumerate(segments)
+             if segment.dead and segment.dead_fraction >= dead_fraction]
+    if dirty:
+        _, index = max(dirty)
+        return index, index + 1
+
+    sealed = [i for i, segment in enumerate(segments) if segment.sealed]
+    if len(sealed) <= max_segments:
+        return None
+    pairs = [(segments[i].live + segments[i + 1].live, i) for i in sealed if i + 1 in sealed]
+    if not pairs:
+        return None
+    _, index = min(pairs)
+    return index, index + 2
+
+
+def merge_segments(root: str, dim: int, segments: List[Segment], alive: np.ndarray) -> Optional[Segment]:
+    """세그먼트들의 살아있는 행만 새 봉인 세그먼트로 복사 (모두 삭제되었으면 None)"""
+    parts = []
+    for segment in segments:
+        rows = segment.rows()
+        keep = np.flatnonzero(alive[rows] != 0)
+        if len(keep):
+            parts.append((segment, keep, rows[keep]))
+    total = sum(len(keep) for _, keep, _ in parts)
+    if total == 0:
+        return None
+
+    merged = Segment.create(root, dim, segments[0].base, count=total, sealed=True)
+    merged.reserve(total)
+    offset = 0
+    for segment, keep, _ in parts:
+        for start in range(0, len(keep), MERGE_BATCH_ROWS):
+            batch = keep[start:start + MERGE_BATCH_ROWS]
+            end = offset + len(batch)
+            for source, target in zip(segment.arrays, merged.arrays):
+                target.data[offset:end] = source.data[batch]
+            offset = end
+    merged.flush()
+    merged.write_row_ids(np.concatenate([rows for _, _, rows in parts]))
+    logger.info(
+        f"세그먼트 병합: {', '.join(segment.name for segment in segments)} -> {merged.name} "
+        f"(행 {sum(segment.count for segment in segments)}개 -> {total}개)"
+    )
+    return merged
@@ -0,0 +1,47 @@
+import html
+import re
+from typing import List, Tuple
+
+# 스니펫 설정
+SNIPPET_RADIUS = 120  # 첫 일치 위치 앞뒤로 보여줄 문자 수
+MIN_TERM_LENGTH = 2
+
+
+def _query_terms(query: str) -> List[str]:
+    terms = [query.strip()]
+    terms += [term for term in query.split() if len(term) >= MIN_TERM_LENGTH]
+    # 긴 용어부터 매칭해야 부분 용어가 먼저 잡히지 않는다
+    return sorted({term for term in terms if term}, key=len, reverse=True)
+
+
+def build_snippet(content: str, query: str, radius: int = SNIPPET_RADIUS) -> Tuple[str, int, int]:
+    """청크에서 질의가 처음 나오는 부근만 잘라 <mark>로 강조한 HTML 스니펫 생성
+
+    반환값은 (스니펫 HTML, 청크 내 시작 오프셋, 끝 오프셋)이다.
+    """
+    terms = _query_terms(query)
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE) if terms else None
+    first = pattern.search(content) if pattern else None
+
+    if first:
+        start = max(0, first.start() - radius)
+        end = min(len(content), first.end() + radius)
+    else:
+        start, end = 0, min(len(content), radius * 2)
+
+    window = content[start:end]
+    parts = []
+    cursor = 0
+    if pattern:
+        for match in pattern.finditer(window):
+            parts.append(html.escape(window[cursor:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            cursor = match.end()
+    parts.append(html.escape(window[cursor:]))
+
+    snippet = "".join(parts)
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(content):
+        snippet += "…"
+    return snippet, start, end
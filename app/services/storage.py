@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+INITIAL_CAPACITY = 1024
+
+
+def write_json_atomic(path: str, data: Any):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class MappedArray:
+    """용량을 두 배씩 늘려가는 파일 기반 memmap 배열"""
+
+    def __init__(self, path: str, dtype, row_shape=()):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.row_bytes = self.dtype.itemsize * int(np.prod(self.row_shape, dtype=np.int64))
+
+        if not os.path.exists(path) or os.path.getsize(path) < self.row_bytes * INITIAL_CAPACITY:
+            with open(path, 'ab') as f:
+                f.truncate(self.row_bytes * INITIAL_CAPACITY)
+        self.capacity = os.path.getsize(path) // self.row_bytes
+        self.data = None
+        self._map()
+
+    def _map(self):
+        self.data = np.memmap(self.path, dtype=self.dtype, mode='r+', shape=(self.capacity,) + self.row_shape)
+
+    def reserve(self, size: int):
+        if size <= self.capacity:
+            return
+        new_capacity = max(size, self.capacity * 2)
+        self.data.flush()
+        self.data = None
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.row_bytes * new_capacity)
+        self.capacity = new_capacity
+        self._map()
+
+    def refresh(self):
+        """다른 프로세스가 파일을 키웠으면 새 크기로 다시 매핑 (기존 범위는 공유 매핑이라 이미 보인다)"""
+        capacity = os.path.getsize(self.path) // self.row_bytes
+        if capacity != self.capacity:
+            self.capacity = capacity
+            self._map()
+
+    def flush(self):
+        self.data.flush()
+
+
+class FileLock:
+    """프로세스 간 배타 잠금 (fcntl.flock, Windows는 msvcrt.locking)
+
+    같은 프로세스의 스레드끼리는 threading.Lock으로 먼저 직렬화한다.
+    잠금을 쥔 프로세스가 죽으면 운영체제가 잠금을 풀어 준다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    @property
+    def locked(self) -> bool:
+        return self._file is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        f = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                while True:
+                    try:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.05)
+        except OSError:
+            f.close()
+            self._thread_lock.release()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        f, self._file = self._file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import aiofiles
+from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# 파일로 받는 multipart 필드 이름 (여러 개는 files, 하나는 file)
+UPLOAD_FIELDS = ("files", "file")
+
+
+class UploadTooLargeError(Exception):
+    """업로드 크기 제한 초과 (HTTP 413)"""
+
+
+@dataclass
+class SavedUpload:
+    filename: str
+    filepath: str
+    sha256: str
+    size: int
+
+
+class _FilePart:
+    def __init__(self, filename: str, ext: str, temp_path: str, file):
+        self.filename = filename
+        self.ext = ext
+        self.temp_path = temp_path
+        self.file = file
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+
+class MultipartUploadReceiver:
+    """multipart/form-data 요청 본문을 받는 대로 파싱해 파일 파트를 업로드 디렉터리에 바로 쓴다
+
+    본문을 메모리나 임시 스풀 파일에 모으지 않고 네트워크에서 받은 조각 단위로 해시/크기를
+    계산하며 기록하므로, 업로드당 메모리 사용량은 파일 크기와 무관하게 일정하다.
+    파일 이름/형식은 파트 헤더에서 바로 검사하고, 크기 제한은 넘는 순간 거절한다.
+    저장 경로는 내용 해시로 정한다 (uploads/{sha256}.{ext}).
+    """
+
+    def __init__(self, upload_dir: str, max_file_size: int, max_files: int, allowed_extensions: Sequence[str]):
+        self.upload_dir = upload_dir
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.allowed_extensions = tuple(allowed_extensions)
+
+    @property
+    def max_request_size(self) -> int:
+        """Content-Length로 미리 거절할 요청 크기 (파일당 multipart 헤더 여유 64KB 포함)"""
+        return self.max_files * (self.max_file_size + 64 * 1024)
+
+    async def receive(self, content_type: str, body: AsyncIterator[bytes]) -> List[SavedUpload]:
+        """요청 본문 스트림에서 파일을 저장하고 저장된 파일 목록 반환
+
+        잘못된 요청은 ValueError, 크기 제한 초과는 UploadTooLargeError를 던지며,
+        이 요청에서 새로 만든 파일은 모두 지운다.
+        """
+        mime, params = parse_options_header(content_type or "")
+        if mime != b"multipart/form-data" or not params.get(b"boundary"):
+            raise ValueError("multipart/form-data 형식의 업로드 요청이 아닙니다.")
+
+        # 파서 콜백은 동기 함수이므로 이벤트만 모아 두고, 본문 조각마다 비동기로 처리한다
+        events = []
+        parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": lambda: events.append(("part_begin", None)),
+            "on_header_field": lambda data, start, end: events.append(("header_field", data[start:end])),
+            "on_header_value": lambda data, start, end: events.append(("header_value", data[start:end])),
+            "on_header_end": lambda: events.append(("header_end", None)),
+            "on_headers_finished": lambda: events.append(("headers_finished", None)),
+            "on_part_data": lambda data, start, end: events.append(("part_data", memoryview(data)[start:end])),
+            "on_part_end": lambda: events.append(("part_end", None))
+        })
+
+        saved: List[SavedUpload] = []
+        created: List[str] = []
+        headers: Dict[bytes, bytes] = {}
+        field, value = b"", b""
+        part: Optional[_FilePart] = None
+        ignored_bytes = 0
+        try:
+            async for chunk in body:
+                parser.write(chunk)
+                for event, data in events:
+                    if event == "part_begin":
+                        headers, field, value, part = {}, b"", b"", None
+                    elif event == "header_field":
+                        field += data
+                    elif event == "header_value":
+                        value += data
+                    elif event == "header_end":
+                        headers[field.lower()] = value
+                        field, value = b"", b""
+                    elif event == "headers_finished":
+                        part = await self._open_part(headers, len(saved))
+                    elif event == "part_data":
+                        if part is None:
+                            # 파일이 아닌 폼 필드는 버리되 크기 제한에는 포함한다
+                            ignored_bytes += len(data)
+                            if ignored_bytes > self.max_file_size:
+                                raise UploadTooLargeError("폼 필드가 너무 큽니다.")
+                            continue
+                        part.size += len(data)
+                        if part.size > self.max_file_size:
+                            raise UploadTooLargeError(
+                                f"파일 크기 제한({self.max_file_size // (1024 * 1024)}MB)을 초과했습니다: {part.filename}"
+                            )
+                        part.digest.update(data)
+                        await part.file.write(data)
+                    elif event == "part_end" and part is not None:
+                        upload, is_new = await self._finish_part(part)
+                        part = None
+                        saved.append(upload)
+                        if is_new:
+                            created.append(upload.filepath)
+                events.clear()
+            parser.finalize()
+        except BaseException:
+            if part is not None:
+                await part.file.close()
+                if os.path.exists(part.temp_path):
+                    os.remove(part.temp_path)
+            for path in created:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        if not saved:
+            raise ValueError("업로드할 파일이 없습니다.")
+        return saved
+
+    async def _open_part(self, headers: Dict[bytes, bytes], saved_count: int) -> Optional[_FilePart]:
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if name not in UPLOAD_FIELDS or b"filename" not in options:
+            return None
+
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        if not filename:
+            raise ValueError("파일 이름이 없습니다.")
+        ext = filename.lower().split('.')[-1]
+        if ext not in self.allowed_extensions:
+            raise ValueError(f"지원하지 않는 파일 형식: {ext}")
+        if saved_count >= self.max_files:
+            raise ValueError(f"한 번에 최대 {self.max_files}개 파일까지 업로드할 수 있습니다.")
+
+        temp_path = os.path.join(self.upload_dir, f".{uuid.uuid4().hex}.part")
+        return _FilePart(filename, ext, temp_path, await aiofiles.open(temp_path, 'wb'))
+
+    async def _finish_part(self, part: _FilePart):
+        """임시 파일을 내용 해시 경로로 옮김, (저장 결과, 새로 만든 파일 여부) 반환"""
+        await part.file.close()
+        sha256 = part.digest.hexdigest()
+        file_path = os.path.join(self.upload_dir, f"{sha256}.{part.ext}")
+        is_new = not os.path.exists(file_path)
+        os.replace(part.temp_path, file_path)
+        logger.info(f"✅ [저장 완료] {part.filename} -> {file_path}, 크기: {part.size:,} bytes")
+        return SavedUpload(part.filename, file_path, sha256, part.size), is_new
@@ -0,0 +1,814 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from app.services.ann_index import (
+    IVFIndex, assign_rows, sample_vectors, spherical_kmeans, suggest_nlist, DEFAULT_NPROBE
+)
+from app.services.chunker import Segment as TextSegment, SEGMENT_SEPARATOR, iter_chunks
+from app.services.content_store import ContentStore
+from app.services.embeddings import create_embedder
+from app.services.keyword_index import KeywordIndex
+from app.services.metrics import observe_stage
+from app.services.segments import (
+    Segment, SegmentRows, merge_segments, plan_compaction,
+    DEFAULT_SEGMENT_ROWS, DEFAULT_MAX_SEGMENTS, DEFAULT_DEAD_FRACTION
+)
+from app.services.storage import FileLock, MappedArray, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# 벡터 인덱스 설정
+DEFAULT_INDEX_DIR = os.path.join("data", "vector_index")
+DEFAULT_CHUNK_SIZE = 1000  # 문자 단위
+DEFAULT_CHUNK_OVERLAP = 100
+EMBEDDING_BATCH_SIZE = 64
+SEGMENTS_DIR = "segments"
+
+# 근사 검색(IVF) 설정: 살아있는 청크가 IVF_MIN_TRAIN_SIZE 이상일 때만 사용 (학습은 compact()에서)
+INDEX_MODE_FLAT = "flat"
+INDEX_MODE_IVF = "ivf"
+IVF_MIN_TRAIN_SIZE = 10000
+IVF_RETRAIN_GROWTH = 4.0  # 학습 시점 대비 이 배수만큼 커지면 중심점 재학습
+
+# score_threshold=None 일 때 사용하는 동적 임계값
+MIN_SIMILARITY = 0.05
+RELATIVE_SIMILARITY = 0.5
+
+# 하이브리드 검색: 벡터/키워드 각각 n_results * 배수만큼 뽑아 RRF로 합친다
+HYBRID_CANDIDATE_FACTOR = 4
+RRF_K = 60
+
+
+def chunk_hash(text: str) -> int:
+    """청크 원문의 64비트 해시 (0은 '해시 없음'으로 예약)"""
+    value = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class VectorSearchEngine:
+    """NumPy 기반 인프로세스 벡터 검색 엔진
+
+    청크 임베딩은 세그먼트별 연속 float32 행렬(memmap)에 저장하고, 검색은 세그먼트마다
+    행렬곱 한 번과 argpartition으로 top-k를 구한다. 재시작 시 파일을 매핑만 하므로 재임베딩이 없다.
+    청크 원문은 따로 두지 않고 압축 본문 저장소에서 청크의 문자 범위만 읽는다.
+
+    추가는 쓰기 세그먼트 끝에 덧붙이고, 삭제는 alive 비트맵과 문서 로그에 표시만 한다(O(1)).
+    삭제된 행이 많은 세그먼트나 너무 많아진 세그먼트는 compact()가 살아있는 행만 새 세그먼트로 병합한다.
+    행 번호는 병합 후에도 바뀌지 않으므로 키워드 포스팅/IVF 리스트/문서 목록은 다시 쓰지 않는다.
+    """
+
+    def __init__(
+        self,
+        index_dir: str = DEFAULT_INDEX_DIR,
+        embedder=None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        index_mode: str = INDEX_MODE_FLAT,
+        nprobe: int = DEFAULT_NPROBE,
+        segment_rows: int = DEFAULT_SEGMENT_ROWS,
+        max_segments: int = DEFAULT_MAX_SEGMENTS,
+        dead_fraction: float = DEFAULT_DEAD_FRACTION
+    ):
+        if index_mode not in (INDEX_MODE_FLAT, INDEX_MODE_IVF):
+            raise ValueError(f"지원하지 않는 인덱스 모드: {index_mode}")
+        self.index_dir = index_dir
+        self.index_mode = index_mode
+        self.embedder = embedder or create_embedder(os.getenv("EMBEDDING_MODEL"))
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.segment_rows = segment_rows
+        self.max_segments = max_segments
+        self.dead_fraction = dead_fraction
+        self.lock = threading.RLock()
+        self.write_lock = threading.Lock()  # 문서 추가는 한 번에 하나씩 (검색은 막지 않음)
+        self.segments_dir = os.path.join(index_dir, SEGMENTS_DIR)
+        os.makedirs(self.segments_dir, exist_ok=True)
+        # 여러 워커 프로세스가 같은 인덱스를 쓸 때 추가/삭제는 파일 잠금으로 한 번에 한 프로세스만
+        self.file_lock = FileLock(os.path.join(index_dir, "write.lock"))
+
+        self.meta_path = os.path.join(index_dir, "meta.json")
+
+        meta = self._load_json(self.meta_path, {})
+        if meta.get("count") and meta.get("model") != self.embedder.model_name:
+            raise ValueError(
+                f"인덱스 임베딩 모델 불일치: 저장된 모델 {meta.get('model')}, "
+                f"현재 모델 {self.embedder.model_name} - 인덱스를 다시 생성해야 합니다."
+            )
+        self.dim = self.embedder.dim
+
+        # 삭제 비트맵은 행 번호로 바로 찾도록 세그먼트와 별도로 하나만 둔다 (행당 1바이트)
+        self.alive = MappedArray(os.path.join(index_dir, "alive.u8"), np.uint8)
+        self.content = ContentStore(os.path.join(index_dir, "content"))
+        self.keywords = KeywordIndex(index_dir)
+        self.ann = IVFIndex(index_dir, nprobe=nprobe)
+
+        self.segments: List[Segment] = []
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.count = 0  # 다음에 쓸 행 번호 (병합으로 빠진 행 번호는 다시 쓰지 않는다)
+        self.dead_count = 0
+        self.generation = 0
+        self.documents_epoch = -1
+        self.documents_log_bytes = 0
+        self._meta_signature = None
+        self._hash_rows: Optional[Dict[int, int]] = None
+        # 프로세스 시작 이후 누적 카운터 (통계 스냅샷에 포함)
+        self.counters = {
+            "documents_added": 0, "documents_removed": 0, "chunks_embedded": 0, "chunks_reused": 0,
+            "compactions": 0, "compacted_rows": 0
+        }
+        with self.lock:
+            self._reload_locked()
+
+        if index_mode == INDEX_MODE_IVF:
+            self._load_ann()
+        logger.info(
+            f"벡터 인덱스 로드 완료: 문서 {len(self.documents)}개, 청크 {self._live_rows()}개, "
+            f"세그먼트 {len(self.segments)}개 (차원: {self.dim}, 모드: {index_mode}, 경로: {index_dir})"
+        )
+
+    @staticmethod
+    def _load_json(path: str, default):
+        if not os.path.exists(path):
+            return default
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # --- 세그먼트 ---
+
+    def _index_segments(self):
+        self._segment_bases = [segment.base for segment in self.segments]
+        self._vectors = SegmentRows(self.segments, "vectors")
+
+    def _locate(self, row: int) -> Tuple[Segment, int]:
+        segment = self.segments[bisect.bisect_right(self._segment_bases, row) - 1]
+        return segment, int(segment.local(row))
+
+    def _writable_segment(self) -> Optional[Segment]:
+        """새 행을 덧붙일 세그먼트 (없으면 None, 호출 측이 새로 만든다)"""
+        if self.segments:
+            segment = self.segments[-1]
+            if not segment.sealed and segment.dense and segment.end == self.count:
+                return segment
+        return None
+
+    def _live_rows(self) -> int:
+        return sum(segment.count for segment in self.segments) - self.dead_count
+
+    # --- 문서 목록 (스냅샷 + 추가 전용 로그) ---
+
+    def _snapshot_path(self, epoch: int) -> str:
+        return os.path.join(self.index_dir, "documents.json" if epoch == 0 else f"documents-{epoch}.json")
+
+    def _log_path(self, epoch: int) -> str:
+        return os.path.join(self.index_dir, f"documents-{epoch}.log")
+
+    def _read_log(self, epoch: int, start: int, end: int) -> List[Dict[str, Any]]:
+        if end <= start:
+            return []
+        with open(self._log_path(epoch), 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return [json.loads(line) for line in data.decode('utf-8').splitlines() if line]
+
+    def _append_log(self, records: List[Dict[str, Any]]):
+        path = self._log_path(self.documents_epoch)
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode('utf-8')
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(self.documents_log_bytes)
+            f.write(data)
+            f.truncate()  # 커밋되지 못한 꼬리(중단된 쓰기)는 버린다
+            self.documents_log_bytes = f.tell()
+
+    def _apply_records(self, records: List[Dict[str, Any]]):
+        for record in records:
+            old = self.documents.pop(record["id"], None)
+            if old is not None:
+                self._unindex_document(old)
+            if record["op"] == "add":
+                doc = {"start": record["start"], "count": record["count"], "metadata": record["metadata"]}
+                self.documents[record["id"]] = doc
+                self._index_document(record["id"], doc)
+
+    def _rebuild_row_lookup(self):
+        ranges = sorted((doc["start"], doc_id) for doc_id, doc in self.documents.items())
+        self._row_starts = [start for start, _ in ranges]
+        self._row_doc_ids = [doc_id for _, doc_id in ranges]
+
+    def _index_document(self, document_id: str, doc: Dict[str, Any]):
+        # 새 문서는 항상 가장 큰 행 번호에 추가되므로 보통 끝에 붙는다
+        pos = bisect.bisect_right(self._row_starts, doc["start"])
+        self._row_starts.insert(pos, doc["start"])
+        self._row_doc_ids.insert(pos, document_id)
+
+    def _unindex_document(self, doc: Dict[str, Any]):
+        pos = bisect.bisect_left(self._row_starts, doc["start"])
+        if pos < len(self._row_starts) and self._row_starts[pos] == doc["start"]:
+            del self._row_starts[pos]
+            del self._row_doc_ids[pos]
+
+    def _hash_lookup(self) -> Dict[int, int]:
+        if self._hash_rows is None:
+            self._rebuild_hash_lookup()
+        return self._hash_rows
+
+    def _rebuild_hash_lookup(self):
+        """청크 해시 -> 행 번호 (같은 원문의 청크는 임베딩을 다시 하지 않고 벡터를 복사)
+
+        삭제 표시된 행도 병합 전까지는 벡터가 남아 있으므로 포함한다.
+        """
+        hash_rows: Dict[int, int] = {}
+        for segment in self.segments:
+            hashes = segment.hashes.data[:segment.count]
+            known = hashes != 0  # 해시 도입 전에 추가된 행은 제외
+            hash_rows.update(zip(hashes[known].tolist(), segment.rows()[known].tolist()))
+        self._hash_rows = hash_rows
+
+    def _publish_stats(self):
+        """추가/삭제 시 갱신하는 통계 스냅샷 (읽기는 잠금 없이 O(1))"""
+        rows = sum(segment.count for segment in self.segments)
+        self._stats = {
+            "total_documents": len(self.documents),
+            "total_chunks": rows - self.dead_count,
+            "deleted_chunks": self.dead_count,
+            "rows": rows,
+            "segments": len(self.segments),
+            "vector_bytes": rows * self.dim * 4,
+            **self.counters
+        }
+
+    def _document_for_row(self, row: int) -> Optional[str]:
+        pos = bisect.bisect_right(self._row_starts, row) - 1
+        if pos < 0:
+            return None
+        doc_id = self._row_doc_ids[pos]
+        doc = self.documents[doc_id]
+        return doc_id if row < doc["start"] + doc["count"] else None
+
+    def _commit(self, records: Iterable[Dict[str, Any]] = (), snapshot: bool = False):
+        """행 배열/비트맵을 먼저 쓰고 문서 변경은 로그에 덧붙인 뒤 meta.json을 마지막에 교체
+
+        다른 프로세스는 meta.json 변경으로 새 세대를 알고, meta.json에 적힌 로그 길이까지만 읽는다.
+        snapshot=True면 문서 목록 스냅샷을 새로 쓰고 로그를 비운다 (세그먼트 병합 때).
+        """
+        if self.segments:
+            self.segments[-1].flush()
+        self.alive.flush()
+        previous_epoch = self.documents_epoch
+        if snapshot:
+            self.documents_epoch += 1
+            self.documents_log_bytes = 0
+            write_json_atomic(self._snapshot_path(self.documents_epoch), self.documents)
+            open(self._log_path(self.documents_epoch), 'wb').close()
+        else:
+            records = list(records)
+            if records:
+                self._append_log(records)
+        self.generation += 1
+        write_json_atomic(self.meta_path, {
+            "model": self.embedder.model_name,
+            "dim": self.dim,
+            "count": self.count,
+            "dead_count": self.dead_count,
+            "generation": self.generation,
+            "segments": [segment.to_meta() for segment in self.segments],
+            "documents_epoch": self.documents_epoch,
+            "documents_log_bytes": self.documents_log_bytes
+        })
+        self._meta_signature = self._signature()
+        if snapshot:
+            for path in (self._snapshot_path(previous_epoch), self._log_path(previous_epoch)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _signature(self):
+        """meta.json 식별값 (원자적 교체마다 바뀐다)"""
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """다른 프로세스가 커밋한 새 세대가 있으면 다시 읽음 (stat 한 번으로 확인), 다시 읽었으면 True"""
+        if self._signature() == self._meta_signature:
+            return False
+        with self.lock:
+            if self._signature() == self._meta_signature:
+                return False
+            self._reload_locked()
+        logger.info(f"인덱스 새 세대 반영: {self.generation} (문서 {len(self.documents)}개, 청크 {self._live_rows()}개)")
+        return True
+
+    def _reload_locked(self):
+        """meta.json 기준으로 세그먼트/문서 목록을 다시 읽음 (같은 스냅샷이면 문서 로그는 읽은 곳부터만)"""
+        while True:
+            signature = self._signature()
+            meta = self._load_json(self.meta_path, {})
+            epoch = meta.get("documents_epoch", 0)
+            log_bytes = meta.get("documents_log_bytes", 0)
+            incremental = epoch == self.documents_epoch and log_bytes >= self.documents_log_bytes
+            try:
+                snapshot = None if incremental else self._load_json(self._snapshot_path(epoch), {})
+                records = self._read_log(epoch, self.documents_log_bytes if incremental else 0, log_bytes)
+                segments = self._open_segments(meta.get("segments", []))
+            except FileNotFoundError:
+                # 읽는 사이 병합이 끝나 이전 파일이 지워졌다
+                continue
+            # 읽는 사이 다른 커밋이 끼어들었으면 다시 읽는다
+            if self._signature() == signature:
+                break
+
+        if snapshot is not None:
+            self.documents = snapshot
+            self._rebuild_row_lookup()
+        self._apply_records(records)
+        self.documents_epoch = epoch
+        self.documents_log_bytes = log_bytes
+        self.segments = segments
+        self._index_segments()
+        self.count = meta.get("count", 0)
+        self.dead_count = meta.get("dead_count", 0)
+        self.generation = meta.get("generation", 0)
+        self.alive.refresh()
+        self.keywords.reload()
+        if self.index_mode == INDEX_MODE_IVF:
+            self.ann.refresh(self.count)
+        if snapshot is not None:
+            self.content.clear_cache()
+        else:
+            self.content.clear_cache([record["id"] for record in records])
+        self._hash_rows = None  # 쓰기 시에만 필요하므로 그때 다시 만든다
+        self._meta_signature = signature
+        self._publish_stats()
+
+    def _open_segments(self, metas: List[Dict[str, Any]]) -> List[Segment]:
+        """이미 연 세그먼트는 재사용하고 새 세그먼트만 매핑"""
+        opened = {segment.name: segment for segment in self.segments}
+        segments = []
+        for meta in metas:
+            segment = opened.get(meta["name"])
+            if segment is None:
+                segment = Segment.open(self.segments_dir, self.dim, meta)
+            else:
+                segment.refresh(meta)
+            segments.append(segment)
+        return segments
+
+    def add_document(
+        self,
+        document_id: str,
+        content: Union[str, Iterable[TextSegment]],
+        metadata: Optional[Dict[str, Any]] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """문서 청크를 배치 단위로 임베딩하며 인덱스에 추가, 추가된 청크 수 반환
+
+        content는 문서 본문 문자열 또는 청커에 넘길 세그먼트(페이지, 단락 등)의 iterable이다.
+        세그먼트는 생성되는 대로 청크로 나눠 임베딩하고 압축 저장소에 이어 쓰므로, 문서 전체를
+        한 문자열로 만들지 않는다. 청크는 본문 내 문자 범위만 기록한다. 같은 ID의 문서는 교체된다.
+        이미 색인된 청크와 원문이 같은 청크는 기존 벡터를 복사하므로, 개정판 문서는 바뀐 청크만 임베딩한다.
+        progress는 배치마다 (지금까지 색인한 청크 수, 그중 재사용한 청크 수)로 호출된다.
+        metadata는 세그먼트를 모두 소비한 뒤(커밋 시점)에 복사하므로, 호출자가 세그먼트를 넘기며
+        채운 값(글자 수 등)도 저장된다.
+        """
+        if content is None:
+            raise ValueError("문서 본문(content)이 필요합니다.")
+        segments = [content] if isinstance(content, str) else content
+
+        # 단계별 소요 시간 (문서 하나당 한 번씩 기록)
+        timings = {"chunking": 0.0, "embedding": 0.0, "index_insert": 0.0}
+        with self.write_lock, self.file_lock:
+            self.refresh()
+            segment = self._writable_segment()
+            created = segment is None
+            if created:
+                segment = Segment.create(self.segments_dir, self.dim, self.count)
+            start = row = self.count
+            offset = segment.count - start  # 행 번호 -> 쓰기 세그먼트 안 위치
+            reused = 0
+            replacing = document_id in self.documents
+            hash_rows = self._hash_lookup()
+            # 본문은 임시 파일에 이어 쓰고 커밋 직전에 바꿔 끼운다 (실패하면 기존 본문은 그대로)
+            writer = self.content.writer(document_id)
+
+            def stored(items: Iterable[TextSegment]) -> Iterator[TextSegment]:
+                for i, item in enumerate(items):
+                    text = (item[1] if isinstance(item, tuple) else item) or ""
+                    writer.write(SEGMENT_SEPARATOR + text if i else text)
+                    yield item
+
+            chunks = iter_chunks(stored(segments), self.chunk_size, self.chunk_overlap)
+            try:
+                # 새 행은 count를 갱신하기 전까지 검색에 보이지 않는다
+                batches = _batched(chunks, EMBEDDING_BATCH_SIZE)
+                while True:
+                    # 청커는 지연 생성기이므로 다음 배치를 꺼내는 시간이 곧 청크 분할 시간이다
+                    clock = time.perf_counter()
+                    batch = next(batches, None)
+                    timings["chunking"] += time.perf_counter() - clock
+                    if batch is None:
+                        break
+                    texts = [chunk.text for chunk in batch]
+                    hashes = [chunk_hash(text) for text in texts]
+                    embeddings = np.empty((len(batch), self.dim), dtype=np.float32)
+                    with self.lock:
+                        # 벡터 행은 덮어쓰지 않으므로 삭제 표시된 행에서 복사해도 안전하다
+                        known = [hash_rows.get(value) for value in hashes]
+                        found = [i for i, known_row in enumerate(known) if known_row is not None]
+                        if found:
+                            embeddings[found] = self._vectors[[known[i] for i in found]]
+                    fresh = [i for i, known_row in enumerate(known) if known_row is None]
+                    if fresh:
+                        clock = time.perf_counter()
+                        embeddings[fresh] = self.embedder.encode([texts[i] for i in fresh])
+                        timings["embedding"] += time.perf_counter() - clock
+                    reused += len(batch) - len(fresh)
+
+                    clock = time.perf_counter()
+                    end = row + len(batch)
+                    self.keywords.add(start, row, texts)
+                    with self.lock:
+                        segment.reserve(offset + end)
+                        self.alive.reserve(end)
+                        segment.vectors.data[offset + row:offset + end] = embeddings
+                        segment.hashes.data[offset + row:offset + end] = hashes
+                        self.alive.data[row:end] = 1
+                        for i, chunk in enumerate(batch, offset + row):
+                            segment.spans.data[i] = (chunk.start, chunk.end)
+                            segment.pages.data[i] = chunk.page if chunk.page is not None else -1
+                    timings["index_insert"] += time.perf_counter() - clock
+                    row = end
+                    logger.debug(f"문서 임베딩 진행: {document_id} ({row - start}개 청크, 재사용 {reused}개)")
+                    if progress:
+                        progress(row - start, reused)
+                if row == start:
+                    raise ValueError("벡터화할 텍스트가 없습니다.")
+                clock = time.perf_counter()
+                writer.close()
+                timings["index_insert"] += time.perf_counter() - clock
+            except Exception:
+                writer.abort()
+                self.keywords.remove(start, row - start)
+                if created:
+                    segment.remove()
+                raise
+
+            clock = time.perf_counter()
+            with self.lock:
+                if replacing:
+                    self._remove_locked(document_id)
+                segment.count = offset + row
+                segment.sealed = segment.count >= self.segment_rows
+                if created:
+                    self.segments.append(segment)
+                    self._index_segments()
+                self.count = row
+                stored_metadata = {k: v for k, v in (metadata or {}).items() if k != 'content'}
+                doc = {"start": start, "count": row - start, "metadata": stored_metadata}
+                self.documents[document_id] = doc
+                self._index_document(document_id, doc)
+                for new_row, value in zip(range(start, row), segment.hashes.data[offset + start:offset + row].tolist()):
+                    hash_rows.setdefault(value, new_row)
+                if self.index_mode == INDEX_MODE_IVF:
+                    # 새 행은 기존 클러스터에 배정만 한다 ((재)학습은 백그라운드 병합 때 잠금 밖에서)
+                    self.ann.add(np.arange(start, row), np.asarray(segment.vectors.data[offset + start:offset + row]))
+                self._commit([{"op": "add", "id": document_id, **doc}])
+                self.counters["documents_added"] += 1
+                self.counters["chunks_embedded"] += row - start - reused
+                self.counters["chunks_reused"] += reused
+                self._publish_stats()
+            # 0단계 키워드 블록이 쌓였으면 합친다 (별도 트랜잭션이라 검색은 막지 않는다)
+            self.keywords.compact(self.alive.data, self.dead_fraction)
+            timings["index_insert"] += time.perf_counter() - clock
+
+        for stage, seconds in timings.items():
+            observe_stage(stage, seconds)
+        logger.info(
+            f"문서 인덱싱 완료: {document_id} ({row - start}개 청크, 재사용 {reused}개, 행 {start}~{row - 1})"
+        )
+        return row - start
+
+    def _ann_due(self) -> bool:
+        """IVF (재)학습이 필요한지: 처음 IVF_MIN_TRAIN_SIZE에 도달했거나 학습 시점보다 크게 늘었을 때"""
+        live = self._live_rows()
+        if not self.ann.is_trained:
+            return live >= IVF_MIN_TRAIN_SIZE
+        return live >= self.ann.trained_size * IVF_RETRAIN_GROWTH
+
+    def _load_ann(self):
+        self.ann.refresh(self.count)
+        if not self.ann.is_trained:
+            if self._ann_due():
+                self.build_ann_index()
+            return
+        # flat 모드로 운영하는 동안 추가된 행은 클러스터에 배정
+        if self.ann.next_row < self.count:
+            rows = self.ann.next_row + np.flatnonzero(self.alive.data[self.ann.next_row:self.count])
+            if len(rows):
+                self.ann.add(rows, self._vectors[rows])
+
+    def build_ann_index(self, nlist: Optional[int] = None) -> bool:
+        """살아있는 청크로 IVF 중심점을 (재)학습해 바꿔 끼움, 학습했으면 True
+
+        k-means는 표본 벡터 복사본으로 잠금 없이 돌리고, 전체 행 배정은 쓰기 잠금만 쥔 채로 한다
+        (검색은 계속되고 추가/삭제만 기다린다). 검색 잠금은 완성된 인덱스를 바꿔 끼울 때만 잡는다.
+        """
+        with self.lock:
+            self.refresh()
+            rows = np.flatnonzero(self.alive.data[:self.count])
+            if len(rows) == 0:
+                return False
+            nlist = nlist or suggest_nlist(len(rows))
+            sample = sample_vectors(self._vectors, rows, nlist)
+        clock = time.perf_counter()
+        centroids = spherical_kmeans(sample, nlist)
+
+        with self.write_lock, self.file_lock:
+            self.refresh()
+            # 학습하는 사이 추가/삭제된 행도 반영
+            rows = np.flatnonzero(self.alive.data[:self.count])
+            assignments = assign_rows(self._vectors, rows, centroids)
+            with self.lock:
+                self.ann.install(centroids, rows, assignments)
+        observe_stage("ann_train", time.perf_counter() - clock)
+        return True
+
+    def _remove_locked(self, document_id: str) -> int:
+        """삭제 표시만 한다 (행/포스팅/해시는 세그먼트 병합 때 정리), 문서 크기와 무관한 O(1)"""
+        doc = self.documents.pop(document_id)
+        self._unindex_document(doc)
+        self.alive.data[doc["start"]:doc["start"] + doc["count"]] = 0
+        segment, _ = self._locate(doc["start"])
+        segment.dead += doc["count"]
+        self.keywords.mark_deleted(doc["start"], doc["count"])
+        self.dead_count += doc["count"]
+        return doc["count"]
+
+    def remove_document(self, document_id: str) -> int:
+        """문서의 청크를 삭제 표시, 삭제된 청크 수 반환"""
+        with self.write_lock, self.file_lock, self.lock:
+            self.refresh()
+            if document_id not in self.documents:
+                logger.warning(f"인덱스에 없는 문서 삭제 요청: {document_id}")
+                return 0
+            removed = self._remove_locked(document_id)
+            self._commit([{"op": "remove", "id": document_id}])
+            self.content.remove(document_id)
+            self.counters["documents_removed"] += 1
+            self._publish_stats()
+        logger.info(f"문서 인덱스 삭제 완료: {document_id} ({removed}개 청크)")
+        return removed
+
+    def compact(self, max_merges: Optional[int] = None) -> Dict[str, int]:
+        """병합 정책(세그먼트 수, 삭제 비율)에 걸리는 세그먼트를 하나씩 병합
+
+        병합 중에는 추가/삭제를 막지만 검색은 막지 않는다 (새 세그먼트로 바꿔 끼울 때만 잠깐 기다린다).
+        IVF 모드에서는 (재)학습이 필요하면 여기서 한다 (검색을 막지 않음, build_ann_index 참고).
+        반환값: 세그먼트 병합 횟수, 회수한 (삭제 표시된) 행 수, 키워드 블록 병합 횟수, IVF 학습 여부
+        """
+        merges = reclaimed = 0
+        while max_merges is None or merges < max_merges:
+            with self.write_lock, self.file_lock:
+                self.refresh()
+                plan = plan_compaction(self.segments, self.max_segments, self.dead_fraction)
+                if plan is None:
+                    self._remove_orphan_segments()
+                    break
+                reclaimed += self._merge_locked(*plan)
+                merges += 1
+        with self.write_lock, self.file_lock:
+            self.refresh()
+            # 삭제된 문서가 많이 남은 키워드 블록도 다시 쓴다
+            keyword_merges = self.keywords.compact(self.alive.data, self.dead_fraction)
+        ann_trained = self.index_mode == INDEX_MODE_IVF and self._ann_due() and self.build_ann_index()
+        return {
+            "merges": merges, "reclaimed_rows": reclaimed, "keyword_merges": keyword_merges,
+            "ann_trained": ann_trained
+        }
+
+    def _merge_locked(self, start: int, end: int) -> int:
+        clock = time.perf_counter()
+        run = self.segments[start:end]
+        merged = merge_segments(self.segments_dir, self.dim, run, self.alive.data)
+        removed = sum(segment.dead for segment in run)
+        with self.lock:
+            self.segments[start:end] = [merged] if merged is not None else []
+            self._index_segments()
+            self.dead_count -= removed
+            if self.index_mode == INDEX_MODE_IVF:
+                self.ann.prune(self.alive.data)
+            self._hash_rows = None  # 병합으로 빠진 행을 가리킬 수 있으므로 다음 추가 때 다시 만든다
+            self._commit(snapshot=True)
+            self.counters["compactions"] += 1
+            self.counters["compacted_rows"] += removed
+            self._publish_stats()
+        for segment in run:
+            segment.remove()
+        observe_stage("segment_merge", time.perf_counter() - clock)
+        return removed
+
+    def _remove_orphan_segments(self):
+        """meta.json에 없는 세그먼트 디렉터리 삭제 (중단된 추가/병합이 남긴 것, 쓰기 잠금을 쥔 채로 호출)"""
+        names = {segment.name for segment in self.segments}
+        for entry in os.scandir(self.segments_dir):
+            if entry.is_dir() and entry.name not in names:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                logger.info(f"남은 세그먼트 정리: {entry.name}")
+
+    def read_content(self, document_id: str, start: int = 0, end: Optional[int] = None) -> str:
+        """문서 본문의 [start, end) 문자 범위 읽기 (필요한 압축 블록만 해제)"""
+        return self.content.read(document_id, start, end)
+
+    def _candidates(self, query_vector: np.ndarray, n: int, nprobe: Optional[int] = None):
+        """검색 후보 (행 번호, 점수): IVF가 준비되어 있으면 근사, 아니면 세그먼트별 전수 검색"""
+        if self.index_mode == INDEX_MODE_IVF and self.ann.is_trained:
+            return self.ann.search(query_vector, self._vectors, self.alive.data[:n], nprobe=nprobe)
+
+        all_rows, all_scores = [], []
+        for segment in self.segments:
+            if segment.live <= 0:
+                continue
+            rows = segment.rows()
+            scores = segment.vectors.data[:segment.count] @ query_vector
+            if segment.dead:
+                scores[self.alive.data[rows] == 0] = -np.inf
+            all_rows.append(rows)
+            all_scores.append(scores)
+        if not all_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(all_rows) == 1:
+            return all_rows[0], all_scores[0]
+        return np.concatenate(all_rows), np.concatenate(all_scores)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top])]
+
+    def search_documents(self, query: str, n_results: int = 5, score_threshold: Optional[float] = None,
+                         nprobe: Optional[int] = None, query_vector: Optional[np.ndarray] = None,
+                         hybrid: bool = True, include_vectors: bool = False) -> List[Dict[str, Any]]:
+        """벡터 유사도와 BM25 키워드 점수를 RRF로 합친 청크 top-k 검색
+
+        벡터 결과는 임계값(score_threshold, None이면 동적)을 넘는 것만 쓰고, 키워드 일치 결과는
+        임계값과 무관하게 후보가 된다. hybrid=False면 벡터 검색만 한다.
+        query_vector를 주면 임베딩을 건너뛴다 (비동기 임베딩 서비스에서 미리 계산한 경우).
+        nprobe는 IVF 모드에서만 사용한다. include_vectors=True면 결과에 청크 벡터("vector")를 포함한다.
+        """
+        if not query or n_results <= 0:
+            return []
+        self.refresh()
+        if query_vector is None:
+            query_vector = self.embedder.encode([query])[0]
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        pool_size = n_results * HYBRID_CANDIDATE_FACTOR if hybrid else n_results
+
+        with self.lock:
+            n = self.count
+            if n == 0 or not self.documents:
+                return []
+
+            # 1. 벡터 후보
+            rows, scores = self._candidates(query_vector, n, nprobe)
+            similarities: Dict[int, float] = {}
+            vector_ranked: List[int] = []
+            threshold = score_threshold if score_threshold is not None else MIN_SIMILARITY
+            if len(rows):
+                top = self._top_k(scores, min(pool_size, len(rows)))
+                if score_threshold is None:
+                    threshold = max(MIN_SIMILARITY, float(scores[top[0]]) * RELATIVE_SIMILARITY)
+                for i in top:
+                    score = float(scores[i])
+                    if not np.isfinite(score) or score < threshold:
+                        break
+                    similarities[int(rows[i])] = score
+                    vector_ranked.append(int(rows[i]))
+
+            # 2. 키워드(BM25) 후보
+            keyword_scores: Dict[int, float] = {}
+            if hybrid:
+                keyword_rows, bm25 = self.keywords.search(query, n, pool_size, self.alive.data[:n])
+                keyword_scores = {int(row): float(score) for row, score in zip(keyword_rows, bm25)}
+
+            # 3. Reciprocal Rank Fusion
+            fused: Dict[int, float] = {}
+            for rank, row in enumerate(vector_ranked):
+                fused[row] = fused.get(row, 0.0) + 1.0 / (RRF_K + rank + 1)
+            for rank, row in enumerate(keyword_scores):
+                fused[row] = fused.get(row, 0.0) + 1.0 / (RRF_K + rank + 1)
+            ranked = sorted(fused, key=fused.get, reverse=True)[:n_results]
+
+            results = []
+            for row in ranked:
+                doc_id = self._document_for_row(row)
+                if doc_id is None:
+                    continue
+                segment, local = self._locate(row)
+                if row not in similarities:
+                    similarities[row] = float(segment.vectors.data[local] @ query_vector)
+                doc = self.documents[doc_id]
+                chunk_index = row - doc["start"]
+                char_start, char_end = (int(v) for v in segment.spans.data[local])
+                page = int(segment.pages.data[local])
+                try:
+                    content = self.content.read(doc_id, char_start, char_end)
+                except FileNotFoundError:
+                    # 다른 프로세스가 방금 삭제한 문서 (다음 새로고침에서 사라진다)
+                    continue
+                results.append({
+                    "id": f"{doc_id}_{chunk_index}",
+                    "row": row,  # 전역 행 번호 (병합 후에도 유지되고 재색인하면 새로 배정된다)
+                    "document_id": doc_id,
+                    "chunk_index": chunk_index,
+                    "char_start": char_start,
+                    "char_end": char_end,
+                    "page": page if page >= 0 else None,
+                    "content": content,
+                    "metadata": doc["metadata"],
+                    "similarity": round(similarities[row], 4),
+                    "bm25_score": round(keyword_scores.get(row, 0.0), 4),
+                    "rrf_score": round(fused[row], 6),
+                    "threshold_used": round(threshold, 4)
+                })
+                if include_vectors:
+                    results[-1]["vector"] = np.array(segment.vectors.data[local])
+
+        logger.debug(
+            f"하이브리드 검색: '{query}' -> {len(results)}개 "
+            f"(벡터 {len(vector_ranked)}개, 키워드 {len(keyword_scores)}개, 임계값 {threshold:.3f})"
+        )
+        return results
+
+    def list_documents(self) -> List[str]:
+        with self.lock:
+            return list(self.documents.keys())
+
+    def document_chunk_count(self, document_id: str) -> int:
+        """문서의 청크 수 (색인되지 않은 문서는 0)"""
+        doc = self.documents.get(document_id)
+        return doc["count"] if doc else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """문서/청크 수와 누적 카운터 (검색 중에도 기다리지 않는 상수 시간 조회)"""
+        self.refresh()
+        return dict(self._stats, generation=self.generation)
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats(),
+            "dimension": self.dim,
+            "model": self.embedder.model_name,
+            "index_dir": self.index_dir,
+            "index_mode": self.index_mode,
+            "ann_trained": self.ann.is_trained,
+            "ann_lists": len(self.ann.lists),
+            "nprobe": self.ann.nprobe,
+            "keyword_index": self.keywords.stats(),
+            "compaction": {
+                "segment_rows": self.segment_rows,
+                "max_segments": self.max_segments,
+                "dead_fraction": self.dead_fraction,
+                "segments": [segment.to_meta() for segment in list(self.segments)]
+            }
+        }
+
+
+def create_vector_search_engine(
+    index_dir: str = DEFAULT_INDEX_DIR,
+    embedder=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
+) -> VectorSearchEngine:
+    return VectorSearchEngine(
+        index_dir=index_dir,
+        embedder=embedder,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        index_mode=os.getenv("VECTOR_INDEX_MODE", INDEX_MODE_FLAT),
+        nprobe=int(os.getenv("VECTOR_NPROBE", DEFAULT_NPROBE)),
+        segment_rows=int(os.getenv("VECTOR_SEGMENT_ROWS", DEFAULT_SEGMENT_ROWS)),
+        max_segments=int(os.getenv("VECTOR_MAX_SEGMENTS", DEFAULT_MAX_SEGMENTS)),
+        dead_fraction=float(os.getenv("VECTOR_COMPACTION_DEAD_FRACTION", DEFAULT_DEAD_FRACTION))
+    )
@@ -0,0 +1,100 @@
+"""IVF 근사 검색 재현율@k / 지연 시간 벤치마크 (정확 검색 대비)
+
+실행 예:
+    python -m benchmarks.ann_benchmark --vectors 200000 --nprobe 1 4 8 16 32
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.services.ann_index import IVFIndex
+
+
+def make_clustered_vectors(n: int, dim: int, n_topics: int, seed: int) -> np.ndarray:
+    """주제별로 뭉친 정규화 벡터 생성 (실제 문서 임베딩 분포 흉내)"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    labels = rng.integers(0, n_topics, n)
+    vectors = topics[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def run(args):
+    vectors = make_clustered_vectors(args.vectors, args.dim, args.topics, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    # 기준: 정확 검색
+    truth, exact_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(set(exact_top_k(vectors, query, args.k).tolist()))
+        exact_times.append(time.perf_counter() - start)
+
+    index = IVFIndex()
+    start = time.perf_counter()
+    index.train(vectors, np.arange(len(vectors)), nlist=args.nlist)
+    build_seconds = time.perf_counter() - start
+
+    report = {
+        "vectors": args.vectors,
+        "dim": args.dim,
+        "k": args.k,
+        "nlist": len(index.centroids),
+        "build_seconds": round(build_seconds, 3),
+        "exact": {
+            "p50_ms": percentile_ms(exact_times, 50),
+            "p95_ms": percentile_ms(exact_times, 95)
+        },
+        "ivf": []
+    }
+
+    for nprobe in args.nprobe:
+        hits, times = 0, []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            rows, scores = index.search(query, vectors, nprobe=nprobe)
+            k = min(args.k, len(rows))
+            top = rows[np.argpartition(-scores, k - 1)[:k]] if k else rows
+            times.append(time.perf_counter() - start)
+            hits += len(expected & set(top.tolist()))
+        report["ivf"].append({
+            "nprobe": nprobe,
+            f"recall@{args.k}": round(hits / (len(queries) * args.k), 4),
+            "p50_ms": percentile_ms(times, 50),
+            "p95_ms": percentile_ms(times, 95)
+        })
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF 재현율/지연 시간 벤치마크")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
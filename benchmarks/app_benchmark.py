@@ -0,0 +1,425 @@
+"""업로드/검색/채팅 처리량 벤치마크 (ASGI 앱 + 가짜 Ollama + 해싱 임베더)
+
+청크 수 규모마다 빈 작업 디렉터리에서 자식 프로세스를 띄워 앱을 uvicorn으로 새로 실행한 뒤,
+합성 한국어/영어 코퍼스(TXT/DOCX/PDF)를 /api/upload로 올리고 /api/search, /api/chat,
+/api/chat/stream을 동시에 호출해 지연 시간 분위수, 처리량, 최대 RSS를 JSON으로 출력한다.
+같은 시드면 같은 코퍼스와 질의를 쓰므로 커밋 간 결과를 비교할 수 있다.
+
+실행 예:
+    python -m benchmarks.app_benchmark --scales 1000 10000 100000 --output bench.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHARS_PER_CHUNK = 900  # 청크 크기 1000자 - 겹침 100자 (main.py 기본값 기준)
+PDF_LINE_CHARS = 90
+PDF_LINES_PER_PAGE = 40
+
+KOREAN_WORDS = (
+    "문서 검색 보안 규정 비밀번호 접근 통제 관리자 사용자 권한 승인 절차 점검 기록 보관 기간 "
+    "개인정보 암호화 서버 네트워크 백업 복구 장애 대응 교육 계획 예산 계약 구매 인사 평가 "
+    "휴가 출장 정산 회의 보고서 일정 프로젝트 품질 시험 배포 운영 모니터링 지표 성능 지연 "
+    "처리량 용량 증설 위험 감사 정책 지침 예외 신청 결재 부서 담당자 책임 협조 공지 변경"
+).split()
+ENGLISH_WORDS = (
+    "document search security policy password access control administrator user permission "
+    "approval procedure review audit log retention period privacy encryption server network "
+    "backup recovery incident response training plan budget contract purchase report schedule "
+    "project quality test deploy operation monitoring metric latency throughput capacity risk "
+    "exception request department owner responsibility notice change release version index"
+).split()
+
+
+# --- 합성 코퍼스 ---
+
+def make_sentence(rng: random.Random, words, tag: str) -> str:
+    """단어를 무작위로 이어 붙인 문장 (tag로 청크마다 내용이 달라 중복 제거에 걸리지 않게 한다)"""
+    return " ".join(rng.choice(words) for _ in range(rng.randint(6, 14))) + f" {tag}."
+
+
+def make_text(rng: random.Random, chars: int, doc_index: int, words) -> str:
+    sentences, length = [], 0
+    while length < chars:
+        sentence = make_sentence(rng, words, f"{doc_index}-{len(sentences)}")
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def make_pdf(text: str) -> bytes:
+    """글꼴 없이 만들 수 있는 최소 PDF (Helvetica, ASCII 본문)"""
+    lines = [text[i:i + PDF_LINE_CHARS] for i in range(0, len(text), PDF_LINE_CHARS)]
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[]]
+
+    objects = []  # 1: 카탈로그, 2: 페이지 트리, 3: 글꼴, 이후 페이지/내용 스트림 쌍
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for page_id, page_lines in zip(page_ids, pages):
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in page_lines]
+        stream = "BT /F1 9 Tf 12 TL 36 800 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(text: str, paragraph_chars: int = 600) -> bytes:
+    from docx import Document
+
+    document = Document()
+    for start in range(0, len(text), paragraph_chars):
+        document.add_paragraph(text[start:start + paragraph_chars])
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def make_document(seed: int, index: int, chunks_per_doc: int) -> Tuple[str, bytes, str]:
+    """index번째 문서 (파일명, 내용, MIME 형식): TXT/DOCX는 한국어+영어, PDF는 영어"""
+    rng = random.Random(seed * 1_000_003 + index)
+    chars = chunks_per_doc * CHARS_PER_CHUNK
+    kind = ("txt", "docx", "pdf")[index % 3]
+    if kind == "pdf":
+        return f"bench_{index:06d}.pdf", make_pdf(make_text(rng, chars, index, ENGLISH_WORDS)), "application/pdf"
+    words = KOREAN_WORDS + ENGLISH_WORDS[:len(KOREAN_WORDS) // 3]
+    text = make_text(rng, chars, index, words)
+    if kind == "docx":
+        mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        return f"bench_{index:06d}.docx", make_docx(text), mime
+    return f"bench_{index:06d}.txt", text.encode("utf-8"), "text/plain"
+
+
+def make_queries(seed: int, count: int) -> List[str]:
+    rng = random.Random(seed + 7)
+    words = KOREAN_WORDS + ENGLISH_WORDS
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+# --- 가짜 Ollama ---
+
+def create_fake_ollama(tokens: int, token_delay: float):
+    """/api/generate (스트리밍/비스트리밍)와 /api/tags만 흉내 내는 Ollama 서버"""
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    pieces = [f"답변{i} " for i in range(tokens)]
+
+    async def generate(request):
+        body = await request.json()
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * tokens)
+            return JSONResponse({"model": body.get("model"), "response": "".join(pieces), "done": True})
+
+        async def lines():
+            for piece in pieces:
+                await asyncio.sleep(token_delay)
+                yield json.dumps({"response": piece, "done": False}, ensure_ascii=False) + "\n"
+            yield json.dumps({"response": "", "done": True}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def tags(request):
+        return JSONResponse({"models": [{"name": os.getenv("OLLAMA_MODEL", "llama3.2:1b")}]})
+
+    return Starlette(routes=[
+        Route("/api/generate", generate, methods=["POST"]),
+        Route("/api/tags", tags, methods=["GET"])
+    ])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- 측정 ---
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3) if len(samples) else None
+
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else None
+    }
+
+
+async def drive(count: int, concurrency: int, request: Callable[[int], Awaitable[bool]]):
+    """request(i)를 count번, 동시에 concurrency개씩 호출 → (성공 지연 시간 목록, 실패 수, 전체 시간)"""
+    latencies, errors = [], 0
+    next_index = iter(range(count))
+
+    async def worker():
+        nonlocal errors
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                ok = await request(i)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def peak_rss_mb() -> float:
+    from app.services.metrics import process_memory
+
+    return round(process_memory().get("peak_rss_bytes", 0) / 1024 / 1024, 1)
+
+
+async def run_scale(args) -> Dict[str, Any]:
+    """작업 디렉터리에서 앱을 띄우고 업로드 → 검색 → 채팅 순서로 측정 (자식 프로세스에서 실행)"""
+    import httpx
+    import uvicorn
+
+    port = free_port()
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{port}"
+    os.environ.pop("EMBEDDING_MODEL", None)  # 결정적인 해싱 임베더 사용
+    for name in ("static", "templates"):
+        if not os.path.exists(name):
+            os.symlink(os.path.join(REPO_ROOT, name), name)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    sys.path.insert(0, REPO_ROOT)
+    import main
+
+    # 가짜 Ollama와 앱을 같은 이벤트 루프의 uvicorn으로 띄운다
+    # (httpx.ASGITransport는 응답 본문을 모아서 돌려주므로 스트리밍 첫 토큰 시간을 잴 수 없다)
+    fake = uvicorn.Server(uvicorn.Config(
+        create_fake_ollama(args.llm_tokens, args.llm_token_ms / 1000),
+        host="127.0.0.1", port=port, log_level="warning", lifespan="off"
+    ))
+    app_port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        main.app, host="127.0.0.1", port=app_port, log_level="warning", access_log=False
+    ))
+    tasks = [asyncio.create_task(fake.serve()), asyncio.create_task(server.serve())]
+    while not (fake.started and server.started):
+        await asyncio.sleep(0.01)
+
+    documents = max(1, -(-args.chunks // args.chunks_per_doc))
+    queries = make_queries(args.seed, max(args.searches, args.chats))
+    result: Dict[str, Any] = {"target_chunks": args.chunks, "documents": documents}
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=600) as client:
+            # 1. 업로드 + 백그라운드 수집 완료까지
+            job_ids = []
+
+            async def upload(i):
+                filename, body, mime = await asyncio.to_thread(make_document, args.seed, i, args.chunks_per_doc)
+                response = await client.post("/api/upload", files=[("files", (filename, body, mime))])
+                if response.status_code != 202:
+                    return False
+                job_ids.extend(job["job_id"] for job in response.json()["jobs"] if job["job_id"])
+                return True
+
+            start = time.perf_counter()
+            latencies, errors, upload_seconds = await drive(documents, args.concurrency, upload)
+            pending, failed, chunks = set(job_ids), 0, 0
+            while pending:
+                await asyncio.sleep(0.2)
+                for job_id in list(pending):
+                    job = (await client.get(f"/api/jobs/{job_id}")).json()
+                    if job["status"] in ("completed", "failed"):
+                        pending.discard(job_id)
+                        failed += job["status"] == "failed"
+                        chunks += job["chunks"] or 0
+            ingest_seconds = time.perf_counter() - start
+            result["upload"] = summarize(latencies, errors, upload_seconds)
+            result["ingestion"] = {
+                "seconds": round(ingest_seconds, 3),
+                "failed_jobs": failed,
+                "chunks": chunks,
+                "chunks_per_second": round(chunks / ingest_seconds, 1) if ingest_seconds else None,
+                "peak_rss_mb": peak_rss_mb()
+            }
+
+            # 2. 검색
+            async def search(i):
+                response = await client.post("/api/search", json={"query": queries[i]})
+                return response.status_code == 200
+
+            result["search"] = summarize(*await drive(args.searches, args.concurrency, search))
+            result["search"]["peak_rss_mb"] = peak_rss_mb()
+
+            # 3. 채팅 (전체 응답) / 스트리밍 채팅 (첫 토큰까지 시간 포함)
+            cached = 0
+
+            async def chat(i):
+                nonlocal cached
+                response = await client.post("/api/chat", json={"message": queries[i]})
+                cached += bool(response.status_code == 200 and response.json().get("cached"))
+                return response.status_code == 200
+
+            result["chat"] = summarize(*await drive(args.chats, args.concurrency, chat))
+            result["chat"]["cached_answers"] = cached
+
+            first_tokens = []
+
+            async def chat_stream(i):
+                start = time.perf_counter()
+                # 같은 질문이면 답변 캐시에 걸리므로 순서를 뒤집어 다른 질문을 쓴다
+                question = queries[-1 - i] + " 요약"
+                first_token = None
+                async with client.stream("POST", "/api/chat/stream", json={"message": question}) as response:
+                    async for line in response.aiter_lines():
+                        if line == "event: token" and first_token is None:
+                            first_token = time.perf_counter() - start
+                        elif line == "event: error":
+                            return False
+                if first_token is not None:
+                    first_tokens.append(first_token)
+                return response.status_code == 200
+
+            result["chat_stream"] = summarize(*await drive(args.chats, args.concurrency, chat_stream))
+            result["chat_stream"]["first_token_p50_ms"] = percentile_ms(first_tokens, 50)
+            result["chat_stream"]["first_token_p95_ms"] = percentile_ms(first_tokens, 95)
+            result["chat_stream"]["peak_rss_mb"] = peak_rss_mb()
+
+            stats = (await client.get("/api/debug/vector-stats")).json()
+            result["index"] = {
+                "chunks": stats.get("stats", {}).get("total_chunks"),
+                "disk_bytes": stats.get("index", {}).get("disk_bytes")
+            }
+    finally:
+        server.should_exit = fake.should_exit = True
+        await asyncio.gather(*tasks)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run(args):
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "seed": args.seed,
+            "chunks_per_doc": args.chunks_per_doc,
+            "concurrency": args.concurrency,
+            "searches": args.searches,
+            "chats": args.chats,
+            "llm_tokens": args.llm_tokens,
+            "llm_token_ms": args.llm_token_ms
+        },
+        "scales": []
+    }
+
+    for chunks in args.scales:
+        workdir = tempfile.mkdtemp(prefix=f"bench_{chunks}_")
+        result_path = os.path.join(workdir, "result.json")
+        command = [
+            sys.executable, "-m", "benchmarks.app_benchmark", "--child",
+            "--chunks", str(chunks), "--result-file", result_path,
+            "--seed", str(args.seed), "--chunks-per-doc", str(args.chunks_per_doc),
+            "--concurrency", str(args.concurrency), "--searches", str(args.searches), "--chats", str(args.chats),
+            "--llm-tokens", str(args.llm_tokens), "--llm-token-ms", str(args.llm_token_ms)
+        ] + (["--verbose"] if args.verbose else [])
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        print(f"[{chunks:,} 청크] 측정 시작 (작업 디렉터리: {workdir})", file=sys.stderr)
+        try:
+            subprocess.run(command, cwd=workdir, env=env, check=True)
+            with open(result_path, "r", encoding="utf-8") as f:
+                report["scales"].append(json.load(f))
+        except subprocess.CalledProcessError as e:
+            report["scales"].append({"target_chunks": chunks, "error": f"벤치마크 프로세스 실패 (종료 코드 {e.returncode})"})
+        finally:
+            if not args.keep_workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="업로드/검색/채팅 처리량 벤치마크")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000], help="청크 수 규모")
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--llm-tokens", type=int, default=20, help="가짜 Ollama 답변 토큰 수")
+    parser.add_argument("--llm-token-ms", type=float, default=5.0, help="가짜 Ollama 토큰 간격 (밀리초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="결과 JSON 파일 경로")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="앱 INFO 로그 출력")
+    # 규모별 자식 프로세스용
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--chunks", type=int, default=1000, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(run_scale(args))
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,68 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import os
 import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterator, Optional, Tuple
 import json
 import aiofiles
+import httpx
 from datetime import datetime
-import PyPDF2
-import hashlib
-import re
 import logging
+import time
+import asyncio
+from contextlib import AsyncExitStack, aclosing
 from app.services.vector_search import create_vector_search_engine
+from app.services.embeddings import create_embedding_service
+from app.services.chunker import SEGMENT_SEPARATOR
+from app.services.snippets import build_snippet
+from app.services.extraction import DocumentExtractor
+from app.services.page_cache import PageTextCache
+from app.services.catalog import DocumentCatalog
+from app.services.answer_cache import AnswerCache
+from app.services.context_builder import build_context, estimate_tokens
+from app.services.llm import OllamaClient, OllamaBusyError
+from app.services.uploads import MultipartUploadReceiver, UploadTooLargeError
+from app.services.metrics import (
+    REGISTRY, MetricsMiddleware, stage_timer, observe_stage, process_memory, directory_size
+)
+from app.services.ingestion import (
+    JobStore, IngestionQueue, DEFAULT_LOCK_PATH, STATUS_COMPLETED, STATUS_FAILED, STAGE_EXTRACTING, STAGE_INDEXING, STAGE_DONE
+)
 
 # 메모리 관리 개선
 import gc
 # 문서 처리 설정
 MAX_CHUNK_SIZE = 1000  # 문자 단위
-MAX_MEMORY_USAGE = 8  # GB 단위
-MAX_DOCUMENT_SIZE = 10 * 1024 * 1024  # 10MB 제한
+CHUNK_OVERLAP = 100  # 인접 청크 간 겹치는 문자 수 (문장 단위로 맞춤)
+MAX_DOCUMENT_SIZE = int(os.getenv("MAX_FILE_SIZE", 10 * 1024 * 1024))  # 파일당 10MB 제한
+MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", 20))  # 한 번에 올릴 수 있는 파일 수
+# PDF/DOCX 추출 프로세스 풀 크기 (검색/채팅용 코어를 남겨두도록 기본값은 코어 수의 절반)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+EXTRACTION_TIMEOUT = int(os.getenv("EXTRACTION_TIMEOUT", 120))  # 문서 하나당 초
+# PDF 페이지 텍스트 캐시에 보관할 최대 페이지 수 (재업로드/재시도 시 바뀐 페이지만 다시 추출)
+PAGE_CACHE_MAX_PAGES = int(os.getenv("PAGE_CACHE_MAX_PAGES", 100000))
+# 백그라운드 수집 작업 워커 수 (추출/임베딩을 동시에 진행할 문서 수)
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 2))
+# 웹 워커 프로세스 수 (검색/채팅은 모든 프로세스가, 수집 작업은 잠금을 잡은 한 프로세스만 처리)
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))
+# 인덱스 세그먼트 병합 확인 간격 (초, 수집 작업을 맡은 프로세스에서만 실행)
+COMPACTION_INTERVAL = int(os.getenv("COMPACTION_INTERVAL", 60))
+SUPPORTED_EXTENSIONS = ('pdf', 'txt', 'md', 'docx')
+# 응답에 단계별 소요 시간(Server-Timing 헤더)을 붙일지 여부
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+
+# logs 디렉토리 생성 (FileHandler 생성 전에 필요)
+os.makedirs("logs", exist_ok=True)
 
 # 로깅 설정
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name%)s - %(levelname)s - %(message)s',
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler('logs/app.log', encoding='utf-8'),
         logging.StreamHandler()
@@ -33,21 +70,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# logs 디렉토리 생성
-os.makedirs("logs", exist_ok=True)
-
 # 벡터 엔진 초기화에 예외 처리 추가
 try:
     logger.info("벡터 검색 엔진 초기화 시작")
-    vector_engine = create_vector_search_engine()
+    embedding_service = create_embedding_service(os.getenv("EMBEDDING_MODEL"))
+    vector_engine = create_vector_search_engine(
+        embedder=embedding_service, chunk_size=MAX_CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
     logger.info("벡터 검색 엔진 초기화 완료")
 except Exception as e:
     logger.error(f"벡터 엔진 초기화 실패: {e}")
     # 백업 처리 또는 안전 모드로 실행
+    embedding_service = None
     vector_engine = None
 
 # FastAPI 앱 생성
 app = FastAPI(title="Document Search & Chat System", version="1.0.0")
+app.add_middleware(MetricsMiddleware, server_timing=SERVER_TIMING)
 logger.info("FastAPI 앱 생성 완료")
 
 # 정적 파일과 템플릿 설정
@@ -56,39 +95,45 @@ templates = Jinja2Templates(directory="templates")
 
 # 디렉토리 설정
 UPLOAD_DIR = "uploads"
-PROCESSED_DIR = "processed"
+PROCESSED_DIR = "processed"  # 이전 버전의 문서별 메타데이터 JSON (카탈로그로 가져오기만 한다)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(PROCESSED_DIR, exist_ok=True)
-logger.info("업로드 및 처리 디렉토리 생성 완료")
+logger.info("업로드 디렉토리 생성 완료")
 
 # Ollama 설정
-OLLAMA_HOST = "http://localhost:11434"
-MODEL_NAME = "llama3.2:1b"
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+MODEL_NAME = os.getenv("OLLAMA_MODEL", "llama3.2:1b")
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 4))  # 동시 생성 요청 수
+OLLAMA_MAX_WAITING = int(os.getenv("OLLAMA_MAX_WAITING", 16))  # 넘으면 503으로 즉시 거절
+OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", 120))
+OLLAMA_HEALTH_INTERVAL = int(os.getenv("OLLAMA_HEALTH_INTERVAL", 30))  # 준비 상태 확인 간격 (초)
+# 답변 캐시 (비슷한 질문 + 같은 검색 결과면 저장된 답변 재사용)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 512))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 3600))  # 초
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.92))
+CHAT_CANDIDATE_CHUNKS = 12  # 컨텍스트 후보로 검색할 청크 수 (MMR로 골라 토큰 예산만큼 사용)
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", 1200))  # 프롬프트의 문서 내용 토큰 예산
+CHAT_MMR_LAMBDA = float(os.getenv("CHAT_MMR_LAMBDA", 0.7))
 
 # 문서 처리 클래스
 class DocumentProcessor:
-    def __init__(self):
-        logger.info("DocumentProcessor 초기화")
-
-    def generate_document_id(self, filename: str) -> str:
-        timestamp = str(int(datetime.now().timestamp() * 1000))
-        unique_string = f"{filename}_{timestamp}"
-        doc_id = hashlib.md5(unique_string.encode()).hexdigest()[:12]
-        logger.debug(f"문서 ID 생성: {doc_id} (파일: {filename})")
+    def __init__(self, extractor: DocumentExtractor):
+        self.extractor = extractor
+        logger.info(f"DocumentProcessor 초기화 (추출 워커: {extractor.max_workers}개)")
+
+    def generate_document_id(self, sha256: str) -> str:
+        """문서 ID는 파일 내용의 SHA-256 앞부분 (같은 내용이면 같은 ID)"""
+        doc_id = sha256[:12]
+        logger.debug(f"문서 ID 생성: {doc_id} (SHA-256: {sha256})")
         return doc_id
 
-    async def extract_pdf_text(self, file_path: str) -> str:
+    async def iter_pdf_pages(self, file_path: str) -> AsyncIterator[Tuple[int, str]]:
+        """PDF를 페이지 단위로 (페이지 번호, 텍스트) 생성 (추출은 프로세스 풀에서 실행)"""
         logger.info(f"PDF 텍스트 추출 시작: {file_path}")
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page_num, page in enumerate(pdf_reader.pages):
-                    text += page.extract_text() + "\n"
-                    logger.debug(f"PDF 페이지 {page_num + 1} 텍스트 추출 완료")
-
-                logger.info(f"PDF 텍스트 추출 완료: {len(text)} 문자")
-                return text.strip()
+            async with aclosing(self.extractor.iter_pdf_pages(file_path)) as pages:
+                async for page_num, page_text in pages:
+                    logger.debug(f"PDF 페이지 {page_num} 텍스트 추출 완료")
+                    yield page_num, page_text
         except Exception as e:
             logger.error(f"PDF 텍스트 추출 실패: {file_path} - {str(e)}")
             raise Exception(f"PDF 텍스트 추출 실패: {str(e)}")
@@ -114,89 +159,252 @@ class DocumentProcessor:
                     logger.info(f"latin-1로 텍스트 파일 읽기 완료: {len(content)} 문자")
                     return content.strip()
 
-    async def extract_docx_text(self, file_path: str) -> str:
+    async def extract_docx_paragraphs(self, file_path: str) -> List[Tuple[Optional[int], str]]:
+        """DOCX를 단락 단위로 추출 (DOCX에는 페이지 정보가 없다)"""
         logger.info(f"DOCX 텍스트 추출 시작: {file_path}")
         try:
-            from docx import Document
-            doc = Document(file_path)
-            text = []
-            for para_num, paragraph in enumerate(doc.paragraphs):
-                text.append(paragraph.text)
-                logger.debug(f"DOCX 단락 {para_num + 1} 추출 완료")
-
-            content = '\n'.join(text)
-            logger.info(f"DOCX 텍스트 추출 완료: {len(content)} 문자")
-            return content
+            paragraphs = await self.extractor.extract_docx_paragraphs(file_path)
+            logger.debug(f"DOCX 단락 {len(paragraphs)}개 추출 완료")
+            return [(None, text) for text in paragraphs]
         except Exception as e:
             logger.error(f"DOCX 텍스트 추출 실패: {file_path} - {str(e)}")
             raise Exception(f"DOCX 텍스트 추출 실패: {str(e)}")
 
-    async def process_file(self, file: UploadFile) -> Dict[str, Any]:
-        logger.info(f"📝 [파일 처리] 시작 - {file.filename}")
-        try:
-            if not file.filename:
-                logger.error("❌ [처리 실패] 파일 이름이 없음")
-                raise ValueError("파일 이름이 없습니다.")
-
-            # 파일 저장
-            file_path = os.path.join(UPLOAD_DIR, file.filename)
-            logger.info(f"💾 [파일 저장] 경로: {file_path}")
-
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
-
-            logger.info(f"✅ [저장 완료] 크기: {len(content):,} bytes")
-
-            ext = file.filename.lower().split('.')[-1]
-            logger.info(f"📄 [파일 형식] {ext.upper()}")
-
-            # 텍스트 추출
-            text_extract_start = datetime.now()
-            if ext == 'pdf':
-                content = await self.extract_pdf_text(file_path)
-            elif ext in ['txt', 'md']:
-                content = await self.extract_txt_text(file_path)
-            elif ext == 'docx':
-                content = await self.extract_docx_text(file_path)
-            else:
-                logger.error(f"❌ [지원하지 않는 형식] {ext}")
-                raise ValueError(f"지원하지 않는 파일 형식: {ext}")
-
-            text_extract_time = (datetime.now() - text_extract_start).total_seconds()
+    async def iter_segments(
+        self, file_path: str, ext: str, progress: Optional[Callable[[int], None]] = None
+    ) -> AsyncIterator[Tuple[Optional[int], str]]:
+        """파일 형식별로 청커에 넘길 세그먼트 (페이지 번호, 텍스트)를 추출되는 대로 생성
+
+        progress는 PDF 페이지가 추출될 때마다 지금까지의 페이지 수로 호출된다.
+        """
+        if ext == 'pdf':
+            count = 0
+            async with aclosing(self.iter_pdf_pages(file_path)) as pages:
+                async for page in pages:
+                    count += 1
+                    if progress:
+                        progress(count)
+                    yield page
+        elif ext in ['txt', 'md']:
+            yield None, await self.extract_txt_text(file_path)
+        elif ext == 'docx':
+            for paragraph in await self.extract_docx_paragraphs(file_path):
+                yield paragraph
+
+    async def process_saved_file(
+        self, filename: str, file_path: str, document_id: str, sha256: Optional[str] = None,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> Tuple[Dict[str, Any], AsyncIterator[Tuple[Optional[int], str]]]:
+        """저장된 파일의 메타데이터와 청커용 세그먼트의 비동기 iterator 반환
+
+        세그먼트는 추출되는 대로 생성되므로 (PDF는 페이지 순서대로) 소비자가 임베딩하는 동안
+        다음 페이지가 추출된다. 한 문자열로 합치지 않으며, word_count/char_count는 세그먼트가
+        소비되는 동안 누적되므로 다 소비한 뒤에 확정된다. 다 쓰거나 중단하면 aclose()로 닫는다.
+        """
+        logger.info(f"📝 [파일 처리] 시작 - {filename}")
+        ext = filename.lower().split('.')[-1]
+        logger.info(f"📄 [파일 형식] {ext.upper()}")
+        if ext not in ['pdf', 'txt', 'md', 'docx']:
+            logger.error(f"❌ [지원하지 않는 형식] {ext}")
+            raise Exception(f"파일 처리 중 오류: 지원하지 않는 파일 형식: {ext}")
+
+        metadata = {
+            'id': document_id,
+            'filename': filename,
+            'size': os.stat(file_path).st_size,
+            'upload_time': datetime.now().isoformat(),
+            'file_type': ext,
+            'word_count': 0,
+            'char_count': 0,
+            'filepath': file_path,
+            'sha256': sha256
+        }
+
+        async def counted() -> AsyncIterator[Tuple[Optional[int], str]]:
+            # 추출 시간은 다음 세그먼트를 기다린 시간의 합 (소비자가 임베딩하는 시간은 제외)
+            text_extract_time = 0.0
+            index = 0
+            try:
+                async with aclosing(self.iter_segments(file_path, ext, progress)) as segments:
+                    while True:
+                        clock = time.perf_counter()
+                        try:
+                            page, text = await segments.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            text_extract_time += time.perf_counter() - clock
+                        # 문서 전체 텍스트 = 세그먼트를 SEGMENT_SEPARATOR로 이은 것 (구분자도 공백이라 단어 수는 합과 같다)
+                        metadata['char_count'] += len(text) + (len(SEGMENT_SEPARATOR) if index else 0)
+                        metadata['word_count'] += len(text.split())
+                        index += 1
+                        yield page, text
+            except Exception as e:
+                logger.error(f"💥 [처리 실패] 파일: {filename} - 오류: {str(e)}")
+                raise Exception(f"파일 처리 중 오류: {str(e)}")
+            observe_stage("extraction", text_extract_time)
             logger.info(f"⏱️ [텍스트 추출 완료] {text_extract_time:.2f}초 소요")
+            logger.info(f"✅ [처리 완료] ID: {document_id}")
 
-            file_stats = os.stat(file_path)
-            document_id = self.generate_document_id(file.filename)
-
-            metadata = {
-                'id': document_id,
-                'filename': file.filename,
-                'content': content,
-                'size': file_stats.st_size,
-                'upload_time': datetime.now().isoformat(),
-                'file_type': ext,
-                'word_count': len(content.split()),
-                'char_count': len(content),
-                'filepath': file_path
-            }
+        return metadata, counted()
 
-            processed_file_path = os.path.join(PROCESSED_DIR, f"{document_id}.json")
-            logger.info(f"💾 [메타데이터 저장] {processed_file_path}")
 
-            async with aiofiles.open(processed_file_path, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(metadata, ensure_ascii=False, indent=2))
+def iterate_from_thread(iterator: AsyncIterator, loop: asyncio.AbstractEventLoop) -> Iterator:
+    """이벤트 루프의 비동기 iterator를 스레드 풀의 동기 코드가 차례로 꺼내 쓸 수 있게 감싼다"""
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(iterator.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
 
-            logger.info(f"✅ [처리 완료] ID: {document_id}")
-            logger.info(f"📊 [문서 통계] 단어: {metadata['word_count']:,}개, 문자: {metadata['char_count']:,}개")
-            return metadata
+# 전역 인스턴스
+page_cache = PageTextCache(max_pages=PAGE_CACHE_MAX_PAGES)
+doc_processor = DocumentProcessor(DocumentExtractor(EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, page_cache=page_cache))
+job_store = JobStore()
+document_catalog = DocumentCatalog()
+upload_receiver = MultipartUploadReceiver(UPLOAD_DIR, MAX_DOCUMENT_SIZE, MAX_UPLOAD_FILES, SUPPORTED_EXTENSIONS)
+answer_cache = AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY)
+document_catalog.migrate_from(PROCESSED_DIR)
+ollama_client = OllamaClient(
+    OLLAMA_HOST, MODEL_NAME,
+    max_concurrency=OLLAMA_MAX_CONCURRENCY,
+    max_waiting=OLLAMA_MAX_WAITING,
+    timeout=OLLAMA_TIMEOUT
+)
 
-        except Exception as e:
-            logger.error(f"💥 [처리 실패] 파일: {file.filename} - 오류: {str(e)}")
-            raise Exception(f"파일 처리 중 오류: {str(e)}")
+# 성능 지표 (/metrics)
+UPLOADS = REGISTRY.counter("docsearch_uploads_total", "업로드된 파일 수", labelnames=("result",))
+CHAT_ANSWERS = REGISTRY.counter("docsearch_chat_answers_total", "채팅 답변 수 (답변 출처별)", labelnames=("source",))
+
+
+def _cache_hit_rates() -> Dict[Tuple[str, ...], float]:
+    rates = {("answer",): answer_cache.stats()["hit_rate"], ("pdf_page",): page_cache.stats()["hit_rate"]}
+    if embedding_service is not None:
+        rates[("embedding",)] = embedding_service.stats().get("hit_rate", 0.0)
+    if vector_engine is not None:
+        content = vector_engine.content.cache_stats()
+        rates[("content_index",)] = content["hit_rate"]
+        rates[("content_block",)] = content["block_hit_rate"]
+    return rates
+
+
+def _index_sizes() -> Dict[Tuple[str, ...], float]:
+    if vector_engine is None:
+        return {}
+    stats = vector_engine.stats()
+    return {
+        ("documents",): stats["total_documents"],
+        ("live_chunks",): stats["total_chunks"],
+        ("deleted_chunks",): stats["deleted_chunks"],
+        ("segments",): stats["segments"],
+        ("vector_bytes",): stats["vector_bytes"]
+    }
+
+
+REGISTRY.gauge("docsearch_cache_hit_ratio", "캐시 적중률", _cache_hit_rates, labelnames=("cache",))
+REGISTRY.gauge("docsearch_index_size", "벡터 인덱스 크기", _index_sizes, labelnames=("kind",))
+REGISTRY.gauge(
+    "docsearch_process_memory_bytes", "프로세스 메모리",
+    lambda: {(kind,): value for kind, value in process_memory().items()}, labelnames=("kind",)
+)
+REGISTRY.gauge(
+    "docsearch_llm_requests", "Ollama 생성 요청 (처리 중/대기 중)",
+    lambda: {("active",): ollama_client.stats()["active"], ("waiting",): ollama_client.stats()["waiting"]},
+    labelnames=("state",)
+)
 
-# 전역 인스턴스
-doc_processor = DocumentProcessor()
+
+async def ingest_document(job: Dict[str, Any]):
+    """수집 작업 하나 처리: 텍스트 추출 → 청크 임베딩/색인 (단계와 진행률을 작업에 기록)"""
+    job_id = job['id']
+    ingest_start_time = datetime.now()
+    logger.info(f"🔄 [수집 시작] 작업: {job_id}, 파일: {job['filename']}")
+
+    job_store.update(job_id, stage=STAGE_EXTRACTING, pages=0, chunks=0, error=None)
+    document_id = job['document_id'] or doc_processor.generate_document_id(job['sha256'])
+    doc_data, segments = await doc_processor.process_saved_file(
+        job['filename'], job['filepath'], document_id, job['sha256'],
+        progress=lambda pages: job_store.update(job_id, pages=pages)
+    )
+    job_store.update(job_id, stage=STAGE_INDEXING, document_id=doc_data['id'])
+
+    # 벡터 데이터베이스에 문서 추가 (페이지가 추출되는 대로 청크로 나눠 임베딩)
+    logger.info(f"🔍 [벡터화 시작] 문서 ID: {doc_data['id']}")
+    try:
+        # 임베딩은 스레드 풀에서 실행해 다른 요청을 막지 않고, 그동안 이벤트 루프에서 다음 페이지를 추출한다
+        chunk_count = await run_in_threadpool(
+            vector_engine.add_document,
+            document_id=doc_data["id"],
+            content=iterate_from_thread(segments, asyncio.get_running_loop()),
+            metadata=doc_data,
+            progress=lambda chunks, reused: job_store.update(job_id, chunks=chunks, reused_chunks=reused)
+        )
+        logger.info(f"✅ [벡터화 성공] 문서 ID: {doc_data['id']}, 청크: {chunk_count}개")
+        logger.info(f"📊 [문서 통계] 단어: {doc_data['word_count']:,}개, 문자: {doc_data['char_count']:,}개")
+    except Exception as e:
+        logger.error(f"❌ [벡터화 실패] 문서 ID: {doc_data['id']} - 오류: {str(e)}")
+        # 원본 파일은 남겨 둔다 (재시도 시 재사용, 추출된 페이지는 캐시에 있음)
+        raise Exception(f"문서 벡터화 실패: {e}")
+    finally:
+        # 중간에 실패하면 남은 추출 작업을 취소한다
+        await segments.aclose()
+
+    document_catalog.add(doc_data)
+    answer_cache.invalidate_document(doc_data['id'])
+    job_store.update(job_id, status=STATUS_COMPLETED, stage=STAGE_DONE, chunks=chunk_count)
+
+    processing_time = (datetime.now() - ingest_start_time).total_seconds()
+    observe_stage("ingestion_total", processing_time)
+    logger.info(f"🎉 [수집 성공] 파일: {job['filename']}")
+    logger.info(f"📋 [처리 결과] ID: {doc_data['id']}, 단어: {doc_data['word_count']:,}개, 문자: {doc_data['char_count']:,}개")
+    logger.info(f"⏱️ [처리 시간] {processing_time:.2f}초")
+
+
+ingestion_queue = IngestionQueue(job_store, ingest_document, workers=INGESTION_WORKERS, lock_path=DEFAULT_LOCK_PATH)
+REGISTRY.gauge("docsearch_ingestion_queued_jobs", "대기 중인 수집 작업 수",
+               lambda: {(): ingestion_queue.stats()["queued"]})
+compaction_task: Optional[asyncio.Task] = None
+
+
+async def compaction_loop():
+    """삭제가 쌓이거나 세그먼트가 많아지면 백그라운드에서 병합 (검색은 막지 않음)"""
+    while True:
+        await asyncio.sleep(COMPACTION_INTERVAL)
+        if vector_engine is None or not ingestion_queue.is_writer:
+            continue
+        try:
+            result = await run_in_threadpool(vector_engine.compact)
+            if result["merges"] or result["keyword_merges"]:
+                logger.info(
+                    f"🧹 [세그먼트 병합] {result['merges']}회, 삭제된 청크 {result['reclaimed_rows']}개 정리, "
+                    f"키워드 블록 병합 {result['keyword_merges']}회"
+                )
+            if result["ann_trained"]:
+                logger.info("🧭 [IVF 학습] 중심점 재학습 완료")
+        except Exception as e:
+            logger.error(f"세그먼트 병합 실패: {e}")
+
+
+@app.on_event("startup")
+async def startup():
+    ingestion_queue.start()
+    if ingestion_queue.is_writer:
+        # 추출은 수집 작업을 맡은 프로세스만 한다 (나중에 이어받으면 처음 쓸 때 풀을 띄운다)
+        doc_processor.extractor.start()
+        logger.info(f"추출 프로세스 풀 준비 완료: {EXTRACTION_WORKERS}개 워커")
+    ollama_client.start_health_checks(OLLAMA_HEALTH_INTERVAL)
+    global compaction_task
+    compaction_task = asyncio.create_task(compaction_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if compaction_task is not None:
+        compaction_task.cancel()
+    await ingestion_queue.stop()
+    await ollama_client.close()
+    doc_processor.extractor.shutdown()
+    logger.info("추출 프로세스 풀 종료")
 
 # 라우트들
 @app.get("/", response_class=HTMLResponse)
@@ -206,98 +414,142 @@ async def home(request: Request):
 
 
 @app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
-    upload_start_time = datetime.now()
-    logger.info(f"📤 [업로드 시작] 파일: {file.filename}, 시작시간: {upload_start_time.strftime('%H:%M:%S')}")
-
-    if not file.filename:
-        logger.error("❌ [업로드 실패] 파일 이름이 없는 업로드 요청")
-        raise HTTPException(status_code=400, detail="파일 이름이 없습니다.")
+async def upload_file(request: Request):
+    """파일(files 필드 여러 개 또는 file 필드)을 받는 대로 디스크에 저장하고 수집 작업을 등록, 작업 ID를 바로 반환
+
+    본문은 스트리밍으로 처리하므로 파일 크기만큼 메모리를 쓰지 않으며, 크기 제한(MAX_DOCUMENT_SIZE)을
+    넘으면 Content-Length 단계 또는 제한을 넘는 순간 413으로 거절한다.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > upload_receiver.max_request_size:
+        logger.error(f"❌ [업로드 거절] 요청 크기 초과: {int(content_length):,} bytes")
+        UPLOADS.inc(result="too_large")
+        raise HTTPException(status_code=413, detail="업로드 요청이 너무 큽니다.")
 
     try:
-        # 파일 크기 체크 추가
-        content = await file.read()
-        file_size_mb = len(content) / (1024 * 1024)
-        logger.info(f"📊 [파일 정보] 크기: {file_size_mb:.2f}MB ({len(content):,} bytes)")
-
-        # 파일 포인터를 처음으로 되돌리기
-        await file.seek(0)
-
-        # 파일 처리
-        logger.info("🔄 [처리 중] 파일 분석 및 텍스트 추출 시작")
-        doc_data = await doc_processor.process_file(file)
-
-        # 벡터 데이터베이스에 문서 추가
-        logger.info(f"🔍 [벡터화 시작] 문서 ID: {doc_data['id']}")
-        try:
-            vector_engine.add_document(
-                document_id=doc_data["id"],
-                content=doc_data["content"],
-                metadata=doc_data
-            )
-            logger.info(f"✅ [벡터화 성공] 문서 ID: {doc_data['id']}")
-        except Exception as e:
-            logger.error(f"❌ [벡터화 실패] 문서 ID: {doc_data['id']} - 오류: {str(e)}")
-            # 만약 벡터 DB 추가에 실패하면 이미 저장된 파일을 정리
-            if os.path.exists(doc_data['filepath']):
-                os.remove(doc_data['filepath'])
-                logger.info(f"🧹 [정리 완료] 원본 파일: {doc_data['filepath']}")
-            if os.path.exists(os.path.join(PROCESSED_DIR, f"{doc_data['id']}.json")):
-                os.remove(os.path.join(PROCESSED_DIR, f"{doc_data['id']}.json"))
-                logger.info(f"🧹 [정리 완료] 메타데이터: {doc_data['id']}.json")
-            raise HTTPException(status_code=500, detail=f"문서 벡터화 실패: {e}")
-
-        # 성공 로그
-        upload_end_time = datetime.now()
-        processing_time = (upload_end_time - upload_start_time).total_seconds()
-
-        logger.info(f"🎉 [업로드 성공] 파일: {file.filename}")
-        logger.info(f"📋 [처리 결과] ID: {doc_data['id']}, 단어: {doc_data['word_count']:,}개, 문자: {doc_data['char_count']:,}개")
-        logger.info(f"⏱️ [처리 시간] {processing_time:.2f}초")
+        with stage_timer("upload_read"):
+            saved = await upload_receiver.receive(request.headers.get("content-type", ""), request.stream())
+    except UploadTooLargeError as e:
+        logger.error(f"❌ [업로드 거절] {str(e)}")
+        UPLOADS.inc(result="too_large")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        logger.error(f"❌ [업로드 실패] {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"💥 [업로드 실패] {str(e)}")
+        raise HTTPException(status_code=500, detail=f"파일 업로드 실패: {str(e)}")
+    logger.info(f"📤 [업로드 수신] 파일 {len(saved)}개: {[upload.filename for upload in saved]}")
 
+    try:
+        jobs = []
+        for upload in saved:
+            document_id = doc_processor.generate_document_id(upload.sha256)
+
+            # 같은 내용이 이미 색인되어 있거나 처리 중이면 새 작업을 만들지 않는다
+            existing = document_catalog.find_by_hash(upload.sha256)
+            if existing:
+                logger.info(f"♻️ [중복 업로드] {upload.filename} = 기존 문서 {existing['id']} ({existing['filename']})")
+                UPLOADS.inc(result="duplicate")
+                jobs.append({
+                    "job_id": None, "filename": upload.filename, "status": "duplicate",
+                    "document_id": existing["id"], "existing_filename": existing["filename"]
+                })
+                continue
+            active = job_store.find_active(upload.sha256)
+            if active:
+                logger.info(f"♻️ [중복 업로드] {upload.filename} = 처리 중인 작업 {active['id']}")
+                UPLOADS.inc(result="in_progress")
+                jobs.append({"job_id": active["id"], "filename": upload.filename, "status": active["status"],
+                             "document_id": active["document_id"]})
+                continue
+
+            job = ingestion_queue.submit(upload.filename, upload.filepath, upload.sha256, document_id)
+            UPLOADS.inc(result="queued")
+            jobs.append({"job_id": job["id"], "filename": upload.filename, "status": job["status"],
+                         "document_id": document_id})
+
+        logger.info(f"📥 [작업 등록 완료] {len(jobs)}개, 대기 중: {ingestion_queue.stats()['queued']}개")
         return JSONResponse(
-            status_code=201,
+            status_code=202,
             content={
-                "message": "파일 업로드 및 처리 성공",
-                "document": doc_data
+                "message": f"{len(jobs)}개 파일 업로드 완료, 백그라운드에서 처리합니다.",
+                "jobs": jobs
             }
         )
 
-    except HTTPException:
-        # HTTPException은 그대로 재발생
-        raise
     except Exception as e:
-        upload_end_time = datetime.now()
-        processing_time = (upload_end_time - upload_start_time).total_seconds()
-
-        logger.error(f"💥 [업로드 실패] 파일: {file.filename}")
-        logger.error(f"❌ [오류 내용] {str(e)}")
-        logger.error(f"⏱️ [실패까지 시간] {processing_time:.2f}초")
-
+        logger.error(f"💥 [업로드 실패] {str(e)}")
         raise HTTPException(status_code=500, detail=f"파일 업로드 실패: {str(e)}")
 
-@app.get("/api/documents")
-async def get_documents():
-    logger.info("문서 목록 조회 요청")
-    try:
-        documents = []
-        for filename in os.listdir(PROCESSED_DIR):
-            if filename.endswith('.json'):
-                file_path = os.path.join(PROCESSED_DIR, filename)
-                async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    doc_data = json.loads(content)
-                    doc_summary = {k: v for k, v in doc_data.items() if k != 'content'}
-                    documents.append(doc_summary)
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return JSONResponse(job)
+
+@app.post("/api/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """실패한 수집 작업을 저장된 업로드 파일로 다시 실행 (바뀌지 않은 PDF 페이지는 캐시 재사용)"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    if job["status"] != STATUS_FAILED:
+        raise HTTPException(status_code=409, detail="실패한 작업만 다시 시도할 수 있습니다.")
+    if not os.path.exists(job["filepath"]):
+        raise HTTPException(status_code=410, detail="업로드 파일이 없습니다. 다시 업로드해주세요.")
+    logger.info(f"🔁 [작업 재시도] {job_id} ({job['filename']})")
+    return JSONResponse(status_code=202, content=ingestion_queue.retry(job_id))
+
+@app.get("/api/jobs")
+async def list_jobs(limit: int = 50):
+    return JSONResponse({"jobs": job_store.list_recent(limit), "queue": ingestion_queue.stats()})
 
-        documents.sort(key=lambda x: x['upload_time'], reverse=True)
-        logger.info(f"문서 목록 조회 완료: {len(documents)}개")
-        return JSONResponse({"documents": documents})
+@app.get("/api/documents")
+async def get_documents(
+    page: int = 1,
+    page_size: int = 50,
+    sort: str = "upload_time",
+    order: str = "desc",
+    file_type: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+):
+    """문서 목록 (카탈로그에서 메타데이터만 조회, 페이지/정렬/형식·날짜 필터 지원)"""
+    logger.info(f"문서 목록 조회 요청: page={page}, page_size={page_size}, sort={sort} {order}")
+    if page < 1 or page_size < 1:
+        raise HTTPException(status_code=400, detail="page와 page_size는 1 이상이어야 합니다.")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order는 asc 또는 desc여야 합니다.")
 
+    try:
+        documents, total = document_catalog.list(
+            offset=(page - 1) * page_size,
+            limit=page_size,
+            sort=sort,
+            descending=order == "desc",
+            file_type=file_type,
+            date_from=date_from,
+            date_to=date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"문서 목록 조회 실패: {str(e)}")
         raise HTTPException(status_code=500, detail=f"문서 목록 조회 실패: {str(e)}")
 
+    if vector_engine is not None:
+        for document in documents:
+            document["chunks"] = vector_engine.document_chunk_count(document["id"])
+    logger.info(f"문서 목록 조회 완료: {len(documents)}개 (전체 {total}개)")
+    return JSONResponse({
+        "documents": documents,
+        "total": total,
+        "page": page,
+        "page_size": page_size
+    })
+
 @app.post("/api/search")
 async def search_documents(request: Request):
     logger.info("문서 검색 요청")
@@ -312,30 +564,35 @@ async def search_documents(request: Request):
 
         # 벡터 검색을 통해 의미적으로 유사한 문서 조각을 검색합니다.
         logger.info("벡터 검색 시작")
-        vector_results = vector_engine.search_documents(
-            query=query,
-            n_results=10,
-            score_threshold=None  # 동적 임계값 사용
-        )
+        with stage_timer("query_embedding"):
+            query_vector = (await embedding_service.embed([query]))[0]
+        with stage_timer("retrieval"):
+            # 검색(행렬곱, 본문 블록 해제)은 이벤트 루프를 막지 않도록 스레드에서 실행
+            vector_results = await run_in_threadpool(
+                vector_engine.search_documents,
+                query=query,
+                n_results=10,
+                score_threshold=None,  # 동적 임계값 사용
+                query_vector=query_vector
+            )
         logger.info(f"벡터 검색 완료: {len(vector_results)}개 결과")
 
         # 결과 처리
         results = []
         for res in vector_results:
             metadata = res.get('metadata', {})
-            snippet = res.get('content', '')
-            highlighted_snippet = re.sub(
-                re.escape(query),
-                f"<mark>{query}</mark>",
-                snippet,
-                flags=re.IGNORECASE
-            )
+            # 청크 안에서 일치 부근만 잘라 강조 (오프셋은 문서 전체 기준으로 환산)
+            highlighted_snippet, snippet_start, snippet_end = build_snippet(res.get('content', ''), query)
+            chunk_start = res.get('char_start', 0)
 
             results.append({
                 "id": metadata.get("id"),
                 "filename": metadata.get("filename"),
                 "file_type": metadata.get("file_type"),
                 "upload_time": metadata.get("upload_time"),
+                "page": res.get('page'),
+                "char_start": chunk_start + snippet_start,
+                "char_end": chunk_start + snippet_end,
                 "content_snippet": highlighted_snippet,
                 "similarity": res.get('similarity', 0),  # 유사도 정보 추가
                 "threshold_used": res.get('threshold_used', 0)  # 사용된 임계값 추가
@@ -352,53 +609,79 @@ async def search_documents(request: Request):
         logger.error(f"검색 실패: {str(e)}")
         raise HTTPException(status_code=500, detail=f"검색 실패: {str(e)}")
 
-@app.post("/api/chat")
-async def chat_with_documents(request: Request):
-    logger.info("채팅 요청")
-    try:
-        import requests
+NO_CONTEXT_ANSWER = "업로드된 문서에서 질문과 관련된 정보를 찾을 수 없습니다. 다른 키워드로 검색해보세요."
 
-        data = await request.json()
-        question = data.get("message", "").strip()
-        logger.info(f"질문: '{question}'")
-
-        if not question:
-            logger.warning("빈 질문으로 요청")
-            raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
-
-        # 1. 벡터 검색으로 질문과 가장 관련 높은 문서 조각(chunk)을 찾습니다.
-        logger.info(f"벡터 DB 문서 수: {len(vector_engine.list_documents())}")
-        logger.info(f"검색 전 컬렉션 상태: {vector_engine.get_collection_stats()}")
-        logger.info("관련 문서 조각 검색 시작")
-        relevant_chunks = vector_engine.search_documents(
-            query=question,
-            n_results=5,
-            score_threshold=None
-        )
-        logger.info(f"관련 문서 조각 검색 완료: {len(relevant_chunks)}개")
 
-        if not relevant_chunks:
-            logger.info("관련 문서를 찾을 수 없음")
-            return JSONResponse({
-                "response": "업로드된 문서에서 질문과 관련된 정보를 찾을 수 없습니다. 다른 키워드로 검색해보세요.",
-                "sources": []
-            })
+def format_source(filename: str, pages) -> str:
+    """출처 표시: 페이지가 있으면 '파일명 (p.3, 5)'"""
+    if not pages:
+        return filename
+    return f"{filename} (p.{', '.join(str(page) for page in sorted(pages))})"
 
-        # 2. 중복 제거 및 품질 향상된 컨텍스트 구성
-        logger.info("컨텍스트 구성 시작")
-        context_parts = []
-        source_filenames = set()
-        for chunk in relevant_chunks:
-            metadata = chunk.get('metadata', {})
-            filename = metadata.get('filename', '알 수 없는 파일')
-            context_parts.append(f"문서명: {filename}\n내용:\n{chunk['content']}")
-            source_filenames.add(filename)
 
-        context = "\n\n---\n\n".join(context_parts)
-        logger.info(f"컨텍스트 구성 완료: {len(context_parts)}개 조각, {len(source_filenames)}개 파일")
+async def prepare_chat(question: str) -> Dict[str, Any]:
+    """질문과 관련된 문서 조각을 찾아 프롬프트 구성
 
-        # 3. 구성된 컨텍스트를 기반으로 AI에게 질문합니다.
-        prompt = f"""당신은 문서 분석 전문가입니다. 아래 제공된 문서 내용을 바탕으로 질문에 대해 상세하고 친절하게 답변해주세요.
+    답변 캐시는 검색 직후(청크 행 번호 집합이 나오자마자) 조회하고, 적중하면 본문 읽기와
+    컨텍스트 구성을 건너뛴다.
+    반환값: cached(답변 캐시 적중 시 항목), prompt(관련 문서가 없거나 캐시 적중이면 None),
+    sources(출처 파일명과 페이지), chunk_ids, document_ids, question_vector (답변 캐시 저장용)
+    """
+    # 1. 벡터 검색으로 질문과 가장 관련 높은 문서 조각(chunk)을 찾습니다.
+    logger.info("관련 문서 조각 검색 시작")
+    with stage_timer("query_embedding"):
+        question_vector = (await embedding_service.embed([question]))[0]
+    with stage_timer("retrieval"):
+        relevant_chunks = await run_in_threadpool(
+            vector_engine.search_documents,
+            query=question,
+            n_results=CHAT_CANDIDATE_CHUNKS,
+            score_threshold=None,
+            query_vector=question_vector,
+            include_vectors=True
+        )
+    logger.info(f"관련 문서 조각 검색 완료: {len(relevant_chunks)}개")
+
+    chat = {
+        "cached": None,
+        "prompt": None,
+        "sources": [],
+        # 답변 캐시 키: 재색인하면 바뀌는 행 번호라서 다른 워커에서 교체된 문서의 답변과 섞이지 않는다
+        "chunk_ids": [chunk['row'] for chunk in relevant_chunks],
+        "document_ids": sorted({chunk['document_id'] for chunk in relevant_chunks}),
+        "question_vector": question_vector
+    }
+    if not relevant_chunks:
+        logger.info("관련 문서를 찾을 수 없음")
+        return chat
+
+    cached = answer_cache.get(question_vector, chat["chunk_ids"])
+    if cached:
+        logger.info("답변 캐시 적중: 컨텍스트 구성 생략")
+        chat["cached"] = cached
+        chat["sources"] = cached.sources
+        return chat
+
+    # 2. MMR로 중복을 줄이고 인접 청크를 합쳐 토큰 예산 안에서 컨텍스트 구성
+    logger.info("컨텍스트 구성 시작")
+    with stage_timer("context_build"):
+        pieces = await run_in_threadpool(
+            build_context, relevant_chunks, vector_engine.read_content,
+            token_budget=CHAT_CONTEXT_TOKENS, lambda_=CHAT_MMR_LAMBDA
+        )
+    context_parts = [f"문서명: {format_source(piece.filename, piece.pages)}\n내용:\n{piece.text}" for piece in pieces]
+    source_pages: Dict[str, set] = {}
+    for piece in pieces:
+        source_pages.setdefault(piece.filename, set()).update(piece.pages)
+
+    context = "\n\n---\n\n".join(context_parts)
+    logger.info(
+        f"컨텍스트 구성 완료: 후보 {len(relevant_chunks)}개 -> {len(context_parts)}개 조각, "
+        f"{len(source_pages)}개 파일, 약 {sum(piece.tokens for piece in pieces)} 토큰"
+    )
+
+    # 3. 구성된 컨텍스트를 기반으로 AI에게 질문합니다.
+    prompt = f"""당신은 문서 분석 전문가입니다. 아래 제공된 문서 내용을 바탕으로 질문에 대해 상세하고 친절하게 답변해주세요.
 
 [제공된 문서 내용]
 {context}
@@ -414,73 +697,174 @@ async def chat_with_documents(request: Request):
 5. 한국어로 명확하고 이해하기 쉽게 답변하세요
 
 답변:"""
+    chat["prompt"] = prompt
+    logger.info(f"프롬프트 크기: {len(prompt)} 문자, 약 {estimate_tokens(prompt)} 토큰")
+    chat["sources"] = [format_source(filename, pages) for filename, pages in sorted(source_pages.items())]
+    return chat
 
-        logger.info("Ollama AI에 요청 전송")
-        ollama_response = requests.post(
-            f"{OLLAMA_HOST}/api/generate",
-            json={
-                "model": MODEL_NAME,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,  # 창의성 줄이고 정확성 향상
-                    "top_p": 0.9
-                }
-            },
-            timeout=60
-        )
 
-        ollama_response.raise_for_status()
-        logger.info("Ollama AI 응답 수신 완료")
+async def read_question(request: Request) -> str:
+    data = await request.json()
+    question = data.get("message", "").strip()
+    logger.info(f"질문: '{question}'")
+
+    if not question:
+        logger.warning("빈 질문으로 요청")
+        raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
+    return question
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 
-        ai_response = ollama_response.json()
-        answer = ai_response.get("response", "오류: 답변을 생성할 수 없습니다.")
+@app.post("/api/chat")
+async def chat_with_documents(request: Request):
+    logger.info("채팅 요청")
+    try:
+        question = await read_question(request)
+        chat = await prepare_chat(question)
+        cached = chat["cached"]
+        if cached:
+            CHAT_ANSWERS.inc(source="cache")
+            return JSONResponse({"response": cached.answer, "sources": cached.sources, "cached": True})
+        if chat["prompt"] is None:
+            CHAT_ANSWERS.inc(source="no_context")
+            return JSONResponse({"response": NO_CONTEXT_ANSWER, "sources": []})
+
+        logger.info("Ollama AI에 요청 전송")
+        with stage_timer("llm_total"):
+            answer = await ollama_client.generate(chat["prompt"])
+        CHAT_ANSWERS.inc(source="llm")
+        logger.info("Ollama AI 응답 수신 완료")
+        if answer:
+            answer_cache.put(question, chat["question_vector"], chat["chunk_ids"], chat["document_ids"],
+                             answer, chat["sources"])
+        else:
+            answer = "오류: 답변을 생성할 수 없습니다."
 
-        logger.info(f"채팅 응답 완료: {len(answer)} 문자, 출처: {sorted(list(source_filenames))}")
+        logger.info(f"채팅 응답 완료: {len(answer)} 문자, 출처: {chat['sources']}")
         return JSONResponse({
             "response": answer,
-            "sources": sorted(list(source_filenames))
+            "sources": chat["sources"],
+            "cached": False
         })
 
-    except requests.exceptions.RequestException as e:
+    except HTTPException:
+        raise
+    except OllamaBusyError as e:
+        logger.warning(f"AI 모델 서버 혼잡: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"요청이 많아 잠시 후 다시 시도해주세요: {e}", headers={"Retry-After": "5"})
+    except httpx.HTTPError as e:
         logger.error(f"AI 모델 서버 연결 실패: {str(e)}")
         raise HTTPException(status_code=503, detail=f"AI 모델 서버에 연결할 수 없습니다: {e}")
     except Exception as e:
         logger.error(f"채팅 처리 중 오류 발생: {str(e)}")
         raise HTTPException(status_code=500, detail=f"채팅 처리 중 오류 발생: {str(e)}")
 
+@app.post("/api/chat/stream")
+async def chat_with_documents_stream(request: Request):
+    """답변 토큰을 Server-Sent Events로 전달 (sources → token... → done, 실패 시 error)"""
+    logger.info("스트리밍 채팅 요청")
+    question = await read_question(request)
+    try:
+        chat = await prepare_chat(question)
+    except Exception as e:
+        logger.error(f"채팅 처리 중 오류 발생: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"채팅 처리 중 오류 발생: {str(e)}")
+
+    sources = chat["sources"]
+    cached = chat["cached"]
+    # 생성 슬롯은 응답을 시작하기 전에 잡는다 (스트림이 시작된 뒤에는 혼잡해도 503을 보낼 수 없다)
+    slot = AsyncExitStack()
+    if chat["prompt"] is not None:
+        try:
+            await slot.enter_async_context(ollama_client.slot())
+        except OllamaBusyError as e:
+            logger.warning(f"AI 모델 서버 혼잡: {str(e)}")
+            raise HTTPException(status_code=503, detail=f"요청이 많아 잠시 후 다시 시도해주세요: {e}", headers={"Retry-After": "5"})
+
+    async def events() -> AsyncIterator[str]:
+        yield sse_event("sources", sources)
+        if cached:
+            CHAT_ANSWERS.inc(source="cache")
+            yield sse_event("token", cached.answer)
+            yield sse_event("done", {"chars": len(cached.answer), "cached": True})
+            return
+
+        if chat["prompt"] is None:
+            CHAT_ANSWERS.inc(source="no_context")
+            yield sse_event("token", NO_CONTEXT_ANSWER)
+            yield sse_event("done", {"chars": len(NO_CONTEXT_ANSWER)})
+            return
+
+        stream_start = time.perf_counter()
+        first_token_time = None
+        tokens = []
+        try:
+            async with slot:
+                async for token in ollama_client.stream(chat["prompt"], reserved=True):
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter() - stream_start
+                        observe_stage("llm_first_token", first_token_time)
+                        logger.info(f"첫 토큰 수신: {first_token_time:.2f}초")
+                    tokens.append(token)
+                    yield sse_event("token", token)
+            observe_stage("llm_total", time.perf_counter() - stream_start)
+            CHAT_ANSWERS.inc(source="llm")
+        except httpx.HTTPError as e:
+            logger.error(f"AI 모델 서버 연결 실패: {str(e)}")
+            yield sse_event("error", f"AI 모델 서버에 연결할 수 없습니다: {e}")
+            return
+        except Exception as e:
+            logger.error(f"스트리밍 채팅 중 오류 발생: {str(e)}")
+            yield sse_event("error", f"채팅 처리 중 오류 발생: {str(e)}")
+            return
+
+        answer = "".join(tokens)
+        if answer:
+            answer_cache.put(question, chat["question_vector"], chat["chunk_ids"], chat["document_ids"],
+                             answer, sources)
+        logger.info(f"스트리밍 채팅 완료: {len(answer)} 문자, 출처: {sources}")
+        yield sse_event("done", {"chars": len(answer), "cached": False})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 본문을 보내기 전에 연결이 끊겨 events()가 시작되지 않아도 슬롯을 놓는다 (이미 놓았으면 아무 일도 없음)
+        background=BackgroundTask(slot.aclose)
+    )
+
 @app.delete("/api/documents/{document_id}")
 async def delete_document(document_id: str):
     logger.info(f"문서 삭제 요청: {document_id}")
 
-    # JSON 파일 경로
-    json_path = os.path.join(PROCESSED_DIR, f"{document_id}.json")
-
-    if not os.path.exists(json_path):
+    doc_data = document_catalog.get(document_id)
+    if doc_data is None:
         logger.error(f"삭제할 문서를 찾을 수 없음: {document_id}")
         raise HTTPException(status_code=404, detail="문서를 찾을 수 없습니다.")
 
     try:
-        # 원본 파일 경로 찾기 및 삭제
-        logger.info(f"메타데이터 파일 읽기: {json_path}")
-        async with aiofiles.open(json_path, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            doc_data = json.loads(content)
-
+        # 원본 파일 삭제
         original_filepath = doc_data.get('filepath')
         if original_filepath and os.path.exists(original_filepath):
             os.remove(original_filepath)
             logger.info(f"원본 파일 삭제 완료: {original_filepath}")
 
-        # JSON 파일 삭제
-        os.remove(json_path)
-        logger.info(f"메타데이터 파일 삭제 완료: {json_path}")
+        # 이전 버전이 남긴 JSON 파일 삭제 (카탈로그가 비었을 때 다시 가져오지 않도록)
+        json_path = os.path.join(PROCESSED_DIR, f"{document_id}.json")
+        if os.path.exists(json_path):
+            os.remove(json_path)
+            logger.info(f"메타데이터 파일 삭제 완료: {json_path}")
 
         # 벡터 데이터베이스에서 문서 삭제
         logger.info(f"벡터 데이터베이스에서 문서 삭제 시작: {document_id}")
-        vector_engine.remove_document(document_id=document_id)
+        await run_in_threadpool(vector_engine.remove_document, document_id)
         logger.info(f"벡터 데이터베이스에서 문서 삭제 완료: {document_id}")
 
+        document_catalog.remove(document_id)
+        answer_cache.invalidate_document(document_id)
         logger.info(f"문서 삭제 완료: {document_id}")
         return JSONResponse(content={"message": f"문서(ID: {document_id})가 성공적으로 삭제되었습니다."})
 
@@ -488,15 +872,56 @@ async def delete_document(document_id: str):
         logger.error(f"문서 삭제 중 오류 발생: {document_id} - {str(e)}")
         raise HTTPException(status_code=500, detail=f"문서 삭제 중 오류 발생: {str(e)}")
 
-# 디버깅을 위한 임시 라우트 추가
+@app.get("/api/health")
+async def health():
+    """서버 상태 (상수 시간): 벡터 엔진 문서/청크 수, 마지막 Ollama 준비 상태, 수집 대기열
+
+    Ollama 상태는 백그라운드에서 OLLAMA_HEALTH_INTERVAL마다 확인한 결과를 그대로 돌려준다.
+    벡터 엔진이 없으면 503, Ollama만 사용할 수 없으면 검색은 되므로 degraded로 200을 돌려준다.
+    """
+    ollama = dict(ollama_client.health, model=MODEL_NAME)
+    if vector_engine is None:
+        status, status_code = "unavailable", 503
+    else:
+        status, status_code = ("ok" if ollama["ready"] else "degraded"), 200
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "status": status,
+            "index": vector_engine.stats() if vector_engine is not None else None,
+            "ollama": ollama,
+            "llm": ollama_client.stats(),
+            "ingestion": ingestion_queue.stats()
+        }
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식 지표 (단계별 소요 시간 히스토그램, 요청/업로드/답변 수, 캐시 적중률 등)"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/debug/vector-stats")
 async def get_vector_stats():
-    """벡터 DB 상태 디버깅용"""
+    """인덱스 크기, 메모리, 캐시 적중률 등 서버 상태"""
     try:
         stats = vector_engine.get_collection_stats()
         documents = vector_engine.list_documents()
         return JSONResponse({
             "stats": stats,
+            "index": {
+                "disk_bytes": await run_in_threadpool(directory_size, vector_engine.index_dir),
+                "content_store": await run_in_threadpool(vector_engine.content.stats)
+            },
+            "memory": process_memory(),
+            "caches": {
+                "embedding": embedding_service.stats(),
+                "answer": answer_cache.stats(),
+                "content_index": vector_engine.content.cache_stats(),
+                "pdf_page": page_cache.stats()
+            },
+            "llm": ollama_client.stats(),
+            "ingestion": ingestion_queue.stats(),
+            "catalog_documents": document_catalog.count(),
             "document_ids": documents,
             "total_documents": len(documents)
         })
@@ -510,5 +935,7 @@ if __name__ == "__main__":
     print(f"📝 Model: {MODEL_NAME}")
     print("=" * 50)
 
-    logger.info("애플리케이션 서버 시작")
-    uvicorn.run(app, host="localhost", port=8004, log_level="info")
\ No newline at end of file
+    logger.info(f"애플리케이션 서버 시작 (웹 워커 {WEB_WORKERS}개)")
+    # 여러 워커는 각 프로세스가 앱을 새로 불러와야 하므로 import 문자열로 넘긴다
+    uvicorn.run("main:app" if WEB_WORKERS > 1 else app, host="localhost", port=8004, log_level="info",
+                workers=WEB_WORKERS)
\ No newline at end of file
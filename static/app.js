@@ -1,6 +1,9 @@
 ﻿// 전역 변수
 let documents = [];
 let isLoading = false;
+let messageCounter = 0;
+let documentsPage = 1;
+const DOCUMENTS_PAGE_SIZE = 50;
 
 // DOMContentLoaded에서 모든 이벤트 리스너 등록
 document.addEventListener("DOMContentLoaded", function() {
@@ -124,21 +127,21 @@ function initializeDragDrop() {
         const files = e.dataTransfer.files;
         if (files.length > 0) {
             fileInput.files = files;
-            uploadSingleFile(files[0]);
+            uploadFiles(files);
         }
     });
 
     fileInput.addEventListener('change', (e) => {
         if (e.target.files.length > 0) {
-            uploadSingleFile(e.target.files[0]);
+            uploadFiles(e.target.files);
         }
     });
 }
 
-// 단일 파일 업로드
-async function uploadSingleFile(file) {
+// 파일 업로드 (여러 개 가능, 처리는 서버의 백그라운드 작업으로 진행)
+async function uploadFiles(files) {
     const formData = new FormData();
-    formData.append('file', file);
+    Array.from(files).forEach(file => formData.append('files', file));
 
     showLoading(true);
     
@@ -151,18 +154,18 @@ async function uploadSingleFile(file) {
         const result = await response.json();
 
         if (response.ok) {
-            const docInfo = result.document || result;
             document.getElementById('uploadResult').innerHTML = `
-                <div class="alert alert-success">
-                    <h5>✅ 업로드 성공!</h5>
-                    <p><strong>파일:</strong> ${docInfo.filename}</p>
-                    <p><strong>크기:</strong> ${formatFileSize(docInfo.size)}</p>
-                    <p><strong>단어 수:</strong> ${docInfo.word_count || 'N/A'}</p>
-                    <p><strong>업로드 시간:</strong> ${formatDate(docInfo.upload_time)}</p>
+                <div class="alert alert-info">
+                    <h5>📥 ${result.jobs.length}개 파일 처리 중</h5>
+                    <ul id="jobList" class="mb-0">
+                        ${result.jobs.map(job => job.status === 'duplicate'
+                            ? `<li><strong>${escapeHtml(job.filename)}</strong>: ♻️ 이미 업로드된 문서입니다 (${escapeHtml(job.existing_filename)})</li>`
+                            : `<li id="job-${job.job_id}"><strong>${escapeHtml(job.filename)}</strong>: 대기 중</li>`).join('')}
+                    </ul>
                 </div>
             `;
-            showAlert("파일이 업로드되었습니다.", "success");
-            await loadDocuments();
+            showAlert(result.message, "success");
+            result.jobs.filter(job => job.job_id).forEach(job => pollJob(job.job_id));
         } else {
             throw new Error(result.detail || '업로드 실패');
         }
@@ -170,7 +173,7 @@ async function uploadSingleFile(file) {
         document.getElementById('uploadResult').innerHTML = `
             <div class="alert alert-danger">
                 <h5>❌ 업로드 실패</h5>
-                <p>${error.message}</p>
+                <p>${escapeHtml(error.message)}</p>
             </div>
         `;
         showAlert("업로드 실패: " + error.message, "danger");
@@ -182,16 +185,80 @@ async function uploadSingleFile(file) {
     document.getElementById('fileInput').value = '';
 }
 
+const JOB_STAGE_LABELS = {
+    queued: '대기 중',
+    extracting: '텍스트 추출 중',
+    indexing: '임베딩/색인 중',
+    done: '완료'
+};
+
+// 수집 작업 상태를 완료/실패할 때까지 주기적으로 확인
+async function pollJob(jobId) {
+    const item = document.getElementById(`job-${jobId}`);
+    try {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.detail || '작업 조회 실패');
+        }
+
+        let status = JOB_STAGE_LABELS[job.stage] || job.stage;
+        if (job.pages) status += ` (${job.pages}페이지`;
+        if (job.chunks) status += `${job.pages ? ', ' : ' ('}${job.chunks}개 청크`;
+        if (job.reused_chunks) status += `, 재사용 ${job.reused_chunks}개`;
+        if (job.pages || job.chunks) status += ')';
+
+        if (job.status === 'failed') {
+            status = `❌ 실패 - ${escapeHtml(job.error)} <button class="btn btn-sm btn-link p-0 align-baseline" onclick="retryJob('${jobId}')">다시 시도</button>`;
+        } else if (job.status === 'completed') {
+            status = `✅ ${status}`;
+        }
+        if (item) item.innerHTML = `<strong>${escapeHtml(job.filename)}</strong>: ${status}`;
+
+        if (job.status === 'completed') {
+            await loadDocuments();
+            return;
+        }
+        if (job.status === 'failed') return;
+    } catch (error) {
+        if (item) item.innerHTML += ` (${escapeHtml(error.message)})`;
+        return;
+    }
+    setTimeout(() => pollJob(jobId), 1000);
+}
+
+// 실패한 수집 작업 다시 시도 (서버에 남아 있는 업로드 파일 재사용)
+async function retryJob(jobId) {
+    const item = document.getElementById(`job-${jobId}`);
+    try {
+        const response = await fetch(`/api/jobs/${jobId}/retry`, { method: 'POST' });
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.detail || '재시도 실패');
+        }
+        pollJob(jobId);
+    } catch (error) {
+        showAlert("재시도 실패: " + error.message, "danger");
+        if (item) item.innerHTML += ` (${escapeHtml(error.message)})`;
+    }
+}
+
 // 문서 목록 로드
-async function loadDocuments() {
+async function loadDocuments(page = documentsPage) {
     try {
-        const response = await fetch("/api/documents");
+        const response = await fetch(`/api/documents?page=${page}&page_size=${DOCUMENTS_PAGE_SIZE}`);
         const data = await response.json();
         documents = data.documents || [];
+        documentsPage = page;
+        const totalPages = Math.max(1, Math.ceil((data.total || 0) / DOCUMENTS_PAGE_SIZE));
         
         const documentsList = document.getElementById("documentsList");
         
         if (documents.length === 0) {
+            if (page > 1) {
+                await loadDocuments(page - 1);
+                return;
+            }
             documentsList.innerHTML = "<p class=\"text-muted\">업로드된 문서가 없습니다.</p>";
             return;
         }
@@ -203,7 +270,7 @@ async function loadDocuments() {
                     <div class="card-body">
                         <div class="d-flex justify-content-between align-items-start">
                             <div>
-                                <h6 class="card-title">${doc.filename}</h6>
+                                <h6 class="card-title">${escapeHtml(doc.filename)}</h6>
                                 <small class="text-muted">
                                     ${formatFileSize(doc.size)} | ${formatDate(doc.upload_time)}
                                 </small>
@@ -218,6 +285,16 @@ async function loadDocuments() {
             `;
         });
         
+        if (totalPages > 1) {
+            html += `
+                <div class="d-flex justify-content-between align-items-center">
+                    <button class="btn btn-sm btn-outline-secondary" onclick="loadDocuments(${page - 1})" ${page <= 1 ? "disabled" : ""}>이전</button>
+                    <small class="text-muted">${page} / ${totalPages} 페이지 (전체 ${data.total}개)</small>
+                    <button class="btn btn-sm btn-outline-secondary" onclick="loadDocuments(${page + 1})" ${page >= totalPages ? "disabled" : ""}>다음</button>
+                </div>
+            `;
+        }
+        
         documentsList.innerHTML = html;
         
     } catch (error) {
@@ -284,7 +361,7 @@ function displaySearchResults(result) {
         html += `
             <div class="card mb-3">
                 <div class="card-body">
-                    <h6 class="card-title">📄 ${item.filename}</h6>
+                    <h6 class="card-title">📄 ${escapeHtml(item.filename)}${item.page ? ` <small class="text-muted">(p.${item.page})</small>` : ''}</h6>
                     <div class="card-text">${item.content_snippet}</div>
                 </div>
             </div>
@@ -311,7 +388,7 @@ async function sendMessage() {
     const loadingId = addMessageToChat("답변을 생성하고 있습니다...", "bot", true);
     
     try {
-        const response = await fetch("/api/chat", {
+        const response = await fetch("/api/chat/stream", {
             method: "POST",
             headers: {
                 "Content-Type": "application/json"
@@ -319,31 +396,79 @@ async function sendMessage() {
             body: JSON.stringify({ message: message })
         });
         
-        const result = await response.json();
+        if (!response.ok) {
+            const result = await response.json();
+            removeMessage(loadingId);
+            addMessageToChat("오류: " + result.detail, "bot");
+            return;
+        }
         
-        // 로딩 메시지 제거
-        removeMessage(loadingId);
+        // Server-Sent Events를 읽으며 토큰이 오는 대로 답변을 이어 붙인다
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let answer = "";
+        let sources = [];
+        let messageId = null;
         
-        if (response.ok) {
-            // AI 응답 표시
-            addMessageToChat(result.response, "bot", false, result.sources);
-        } else {
-            addMessageToChat("오류: " + result.detail, "bot");
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            const events = buffer.split("\n\n");
+            buffer = events.pop();
+            for (const raw of events) {
+                const eventMatch = raw.match(/^event: (.*)$/m);
+                const dataMatch = raw.match(/^data: (.*)$/m);
+                if (!eventMatch || !dataMatch) continue;
+                const data = JSON.parse(dataMatch[1]);
+                
+                if (eventMatch[1] === "sources") {
+                    sources = data;
+                } else if (eventMatch[1] === "token") {
+                    answer += data;
+                    if (!messageId) {
+                        removeMessage(loadingId);
+                        messageId = addMessageToChat("", "bot");
+                    }
+                    updateChatMessage(messageId, answer, sources);
+                } else if (eventMatch[1] === "error") {
+                    removeMessage(loadingId);
+                    addMessageToChat("오류: " + data, "bot");
+                }
+            }
         }
+        removeMessage(loadingId);
     } catch (error) {
         removeMessage(loadingId);
         addMessageToChat("오류: " + error.message, "bot");
     }
 }
 
+// 스트리밍 중인 답변 메시지 갱신
+function updateChatMessage(messageId, content, sources) {
+    const bubble = document.querySelector(`#${messageId} > div`);
+    if (!bubble) return;
+    
+    let sourcesHtml = "";
+    if (sources && sources.length > 0) {
+        sourcesHtml = `<div class="small text-muted mt-2">출처: ${escapeHtml(sources.join(", "))}</div>`;
+    }
+    bubble.innerHTML = `${escapeHtml(content)}${sourcesHtml}`;
+    
+    const chatMessages = document.getElementById("chatMessages");
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
 // 채팅 메시지 추가
 function addMessageToChat(content, sender, isLoading = false, sources = null) {
     const chatMessages = document.getElementById("chatMessages");
-    const messageId = "msg_" + Date.now();
+    const messageId = "msg_" + Date.now() + "_" + (++messageCounter);
     
     let sourcesHtml = "";
     if (sources && sources.length > 0) {
-        sourcesHtml = `<div class="small text-muted mt-2">출처: ${sources.join(", ")}</div>`;
+        sourcesHtml = `<div class="small text-muted mt-2">출처: ${escapeHtml(sources.join(", "))}</div>`;
     }
     
     let loadingSpinner = "";
@@ -357,7 +482,7 @@ function addMessageToChat(content, sender, isLoading = false, sources = null) {
     const messageHtml = `
         <div class="mb-3 ${messageClass}" id="${messageId}">
             <div class="d-inline-block p-3 rounded ${bgClass}" style="max-width: 70%;">
-                ${loadingSpinner}${content}
+                ${loadingSpinner}${escapeHtml(content)}
                 ${sourcesHtml}
             </div>
         </div>
@@ -437,6 +562,13 @@ function showAlert(message, type) {
     }, 5000);
 }
 
+// 모델 답변, 파일명처럼 서버에서 온 문자열을 HTML에 넣기 전에 이스케이프
+function escapeHtml(text) {
+    const div = document.createElement("div");
+    div.textContent = text == null ? "" : String(text);
+    return div.innerHTML.replace(/"/g, "&quot;").replace(/'/g, "&#39;");
+}
+
 function formatFileSize(bytes) {
     if (bytes === 0) return "0 Bytes";
     const k = 1024;
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.app_benchmark import create_fake_ollama
+
+FAKE_TOKENS = 5
+
+
+def run_app(main, scenario):
+    """앱을 시작하고 가짜 Ollama에 연결한 클라이언트로 scenario(client)를 실행"""
+    async def run():
+        await main.startup()
+        main.ollama_client.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_fake_ollama(FAKE_TOKENS, 0)), base_url="http://ollama"
+        )
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://app",
+                                         timeout=60) as client:
+                return await scenario(client)
+        finally:
+            await main.shutdown()
+
+    return asyncio.run(run())
+
+
+def parse_sse(text: str):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def wait_for_job(client, job_id: str):
+    for _ in range(600):
+        job = (await client.get(f"/api/jobs/{job_id}")).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError("수집 작업이 끝나지 않았습니다.")
+
+
+async def upload_and_wait(client, filename: str, data: bytes, content_type: str = "text/plain"):
+    response = await client.post("/api/upload", files=[("files", (filename, data, content_type))])
+    assert response.status_code == 202
+    return await wait_for_job(client, response.json()["jobs"][0]["job_id"])
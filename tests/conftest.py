@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    """빈 작업 디렉터리에서 앱을 불러온다 (main은 불러올 때 현재 디렉터리에 데이터 디렉터리를 만든다)"""
+    workdir = tmp_path_factory.mktemp("app")
+    for name in ("static", "templates"):
+        os.symlink(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    os.environ.pop("EMBEDDING_MODEL", None)  # 결정적인 해싱 임베더 사용
+    sys.path.insert(0, REPO_ROOT)
+    try:
+        import main
+        yield main
+    finally:
+        os.chdir(cwd)
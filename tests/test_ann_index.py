@@ -0,0 +1,80 @@
+import numpy as np
+
+from app.services.ann_index import IVFIndex
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_search import INDEX_MODE_IVF, VectorSearchEngine
+from tests.test_vector_search import make_text
+
+
+def clustered_vectors(n: int, dim: int = 32, clusters: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def top_rows(rows, scores, k):
+    return set(rows[np.argsort(-scores)[:k]].tolist())
+
+
+def test_ivf_recall_against_exact_search():
+    vectors = clustered_vectors(3000)
+    index = IVFIndex(nprobe=8)
+    index.train(vectors, np.arange(len(vectors)), nlist=32)
+    queries = clustered_vectors(50, seed=1)
+
+    recalls = []
+    for query in queries:
+        exact = top_rows(np.arange(len(vectors)), vectors @ query, 10)
+        rows, scores = index.search(query, vectors)
+        recalls.append(len(exact & top_rows(rows, scores, 10)) / 10)
+        # 모든 클러스터를 보면 전수 검색과 같다
+        rows, scores = index.search(query, vectors, nprobe=32)
+        assert top_rows(rows, scores, 10) == exact
+
+    assert np.mean(recalls) >= 0.9
+
+
+def test_rows_added_after_training_are_searchable():
+    vectors = clustered_vectors(1200)
+    index = IVFIndex(nprobe=4)
+    index.train(vectors[:1000], np.arange(1000), nlist=16)
+
+    index.add(np.arange(1000, 1200), vectors[1000:])
+
+    assert index.size == 1200
+    for row in (1000, 1100, 1199):
+        rows, scores = index.search(vectors[row], vectors)
+        assert rows[np.argmax(scores)] == row
+
+
+def test_deleted_rows_are_never_returned_and_pruned_on_compaction(tmp_path):
+    engine = VectorSearchEngine(str(tmp_path), embedder=HashingEmbedder(), chunk_size=200, chunk_overlap=20,
+                                index_mode=INDEX_MODE_IVF, nprobe=2, segment_rows=16, max_segments=2,
+                                dead_fraction=0.2)
+    for i in range(20):
+        engine.add_document(f"doc{i}", content=make_text(i))
+    assert engine.build_ann_index(nlist=8)
+    engine.add_document("late", content=make_text(99))  # 학습 뒤 추가한 행은 가까운 클러스터에 들어간다
+    assert engine.ann.size == engine.stats()["total_chunks"]
+
+    removed = {"doc3", "doc4", "doc11", "late"}
+    deleted_rows = set()
+    for document_id in removed:
+        doc = engine.documents[document_id]
+        deleted_rows.update(range(doc["start"], doc["start"] + doc["count"]))
+        engine.remove_document(document_id)
+
+    def returned(nprobe):
+        found = set()
+        for i in list(range(20)) + [99]:
+            for result in engine.search_documents(f"문서{i}", n_results=50, score_threshold=-1.0, nprobe=nprobe):
+                found.add(result["document_id"])
+        return found
+
+    assert engine.ann.is_trained
+    assert not returned(8) & removed
+    assert engine.compact()["reclaimed_rows"] > 0
+    assert not set(np.concatenate(engine.ann.lists).tolist()) & deleted_rows
+    assert not returned(8) & removed
+    assert returned(8) == {f"doc{i}" for i in range(20)} - removed
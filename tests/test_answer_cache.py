@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services.answer_cache import AnswerCache
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_search import VectorSearchEngine
+from tests.app_client import run_app, upload_and_wait
+
+
+def unit(values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_chunk_set_matches_regardless_of_order():
+    cache = AnswerCache()
+    question = unit([1, 0, 0])
+    cache.put("질문", question, [3, 1, 2], ["doc"], "답변", ["doc.txt"])
+
+    assert cache.get(unit([1, 0.05, 0]), [2, 3, 1]).answer == "답변"
+    assert cache.get(question, [1, 2]) is None
+    assert cache.get(unit([0, 1, 0]), [1, 2, 3]) is None
+
+
+def test_reindexed_document_misses_in_other_worker(tmp_path):
+    """다른 워커가 문서를 교체하면 invalidate_document 없이도 이 워커의 캐시가 맞지 않아야 한다"""
+    this_worker = VectorSearchEngine(str(tmp_path), embedder=HashingEmbedder())
+    other_worker = VectorSearchEngine(str(tmp_path), embedder=HashingEmbedder())
+    cache = AnswerCache()
+    this_worker.add_document("doc", content="보안 규정: 비밀번호는 90일마다 변경한다.")
+
+    results = this_worker.search_documents("비밀번호 변경", n_results=3)
+    question = unit(np.ones(3))
+    cache.put("비밀번호 변경 주기", question, [result["row"] for result in results], ["doc"], "90일", [])
+
+    other_worker.add_document("doc", content="보안 규정: 비밀번호는 30일마다 변경한다.")
+    results = this_worker.search_documents("비밀번호 변경", n_results=3)
+
+    assert [result["id"] for result in results] == ["doc_0"]  # 청크 ID는 그대로지만
+    assert cache.get(question, [result["row"] for result in results]) is None  # 행 번호는 새로 배정된다
+
+
+def test_cache_hit_skips_context_build(main, monkeypatch):
+    text = "\n\n".join(f"수달 서식지 조사 {i}. 하천 상류에서 관찰 기록을 남긴다." for i in range(10))
+    builds = []
+
+    def counting_build_context(*args, **kwargs):
+        builds.append(1)
+        return build_context(*args, **kwargs)
+
+    build_context = main.build_context
+    monkeypatch.setattr(main, "build_context", counting_build_context)
+
+    async def scenario(client):
+        assert (await upload_and_wait(client, "수달.txt", text.encode()))["status"] == "completed"
+        first = await client.post("/api/chat", json={"message": "수달 서식지 관찰"})
+        built = len(builds)
+        second = await client.post("/api/chat", json={"message": "수달 서식지 관찰"})
+        return first.json(), second.json(), built
+
+    first, second, built = run_app(main, scenario)
+
+    assert first["cached"] is False and second["cached"] is True
+    assert second["response"] == first["response"] and second["sources"] == first["sources"]
+    assert built == 1 and len(builds) == 1
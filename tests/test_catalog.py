@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from app.services.catalog import DocumentCatalog
+from tests.app_client import run_app
+
+
+def metadata(document_id: str, filename: str, upload_time: str, **extra):
+    return {"id": document_id, "filename": filename, "file_type": filename.rsplit('.', 1)[-1], "size": 100,
+            "upload_time": upload_time, "word_count": 10, "char_count": 50, **extra}
+
+
+def test_migrates_processed_json_once_when_empty(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    for i in range(3):
+        legacy = metadata(f"doc{i}", f"문서{i}.pdf", f"2024-01-0{i + 1}T00:00:00", content="본문")
+        del legacy["file_type"]  # 이전 버전 JSON에는 file_type이 없을 수 있다
+        (processed / f"doc{i}.json").write_text(json.dumps(legacy, ensure_ascii=False), encoding="utf-8")
+    (processed / "broken.json").write_text("{", encoding="utf-8")
+
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    assert catalog.migrate_from(str(processed)) == 3
+    assert catalog.get("doc1")["file_type"] == "pdf"
+
+    # 카탈로그가 비어 있지 않으면 다시 가져오지 않는다
+    catalog.remove("doc1")
+    assert catalog.migrate_from(str(processed)) == 0
+    assert catalog.get("doc1") is None
+
+
+def make_catalog(tmp_path):
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    for i in range(12):
+        file_type = ("pdf", "docx", "txt")[i % 3]
+        catalog.add(metadata(f"doc{i:02d}", f"{chr(ord('a') + (i * 5) % 12)}.{file_type}",
+                             f"2024-{i % 3 + 1:02d}-{i + 1:02d}T09:00:00", size=1000 - i))
+    return catalog
+
+
+def test_list_pages_and_sorts(tmp_path):
+    catalog = make_catalog(tmp_path)
+
+    first, total = catalog.list(offset=0, limit=5)
+    second, _ = catalog.list(offset=5, limit=5)
+    last, _ = catalog.list(offset=10, limit=5)
+    assert total == 12 and [len(page) for page in (first, second, last)] == [5, 5, 2]
+    times = [doc["upload_time"] for doc in first + second + last]
+    assert times == sorted(times, reverse=True)
+
+    by_name, _ = catalog.list(limit=12, sort="filename", descending=False)
+    assert [doc["filename"] for doc in by_name] == sorted(doc["filename"] for doc in by_name)
+    by_size, _ = catalog.list(limit=3, sort="size", descending=True)
+    assert [doc["size"] for doc in by_size] == [1000, 999, 998]
+
+
+def test_list_filters_by_type_and_date_prefix(tmp_path):
+    catalog = make_catalog(tmp_path)
+
+    pdfs, total = catalog.list(limit=50, file_type="PDF")
+    assert total == 4 and {doc["file_type"] for doc in pdfs} == {"pdf"}
+
+    # 날짜는 ISO 접두어로 비교하며 양쪽 끝을 포함한다
+    february, total = catalog.list(limit=50, date_from="2024-02", date_to="2024-02")
+    assert total == 4 and all(doc["upload_time"].startswith("2024-02") for doc in february)
+    docs, _ = catalog.list(limit=50, date_from="2024-01-04", date_to="2024-02-05", file_type="txt")
+    assert docs == []  # 조건은 AND로 합쳐진다
+    docs, _ = catalog.list(limit=50, date_from="2024-01-04", date_to="2024-03-12")
+    assert {doc["upload_time"][:10] for doc in docs} == {"2024-01-04", "2024-01-07", "2024-01-10",
+                                                         "2024-02-02", "2024-02-05", "2024-02-08", "2024-02-11",
+                                                         "2024-03-03", "2024-03-06", "2024-03-09", "2024-03-12"}
+
+
+def test_invalid_sort_never_reaches_sql(tmp_path):
+    catalog = make_catalog(tmp_path)
+    statements = []
+    catalog.conn.set_trace_callback(statements.append)
+
+    with pytest.raises(ValueError, match="정렬할 수 없는 필드"):
+        catalog.list(sort="size; DROP TABLE documents --")
+
+    assert statements == []
+    assert catalog.count() == 12
+
+
+def test_documents_endpoint_pages_filters_and_rejects_bad_sort(main):
+    for i in range(5):
+        main.document_catalog.add(metadata(f"listing{i}", f"listing{i}.docx", f"2023-06-0{i + 1}T00:00:00"))
+
+    async def scenario(client):
+        page = await client.get("/api/documents", params={"page": 2, "page_size": 2, "file_type": "docx",
+                                                          "date_from": "2023-06", "date_to": "2023-06"})
+        ascending = await client.get("/api/documents", params={"sort": "upload_time", "order": "asc",
+                                                               "date_to": "2023-06-02"})
+        bad_sort = await client.get("/api/documents", params={"sort": "filename; DROP TABLE documents"})
+        bad_order = await client.get("/api/documents", params={"order": "sideways"})
+        bad_page = await client.get("/api/documents", params={"page": 0})
+        return page, ascending, bad_sort, bad_order, bad_page
+
+    try:
+        page, ascending, bad_sort, bad_order, bad_page = run_app(main, scenario)
+    finally:
+        for i in range(5):
+            main.document_catalog.remove(f"listing{i}")
+
+    body = page.json()
+    assert body["total"] == 5 and body["page"] == 2
+    assert [doc["id"] for doc in body["documents"]] == ["listing2", "listing1"]
+    assert [doc["id"] for doc in ascending.json()["documents"]] == ["listing0", "listing1"]
+    assert bad_sort.status_code == 400 and bad_order.status_code == 400 and bad_page.status_code == 400
@@ -0,0 +1,66 @@
+from contextlib import AsyncExitStack
+
+from tests.app_client import FAKE_TOKENS, parse_sse, run_app, upload_and_wait
+
+
+def test_chat_stream_sends_sources_tokens_and_done(main):
+    text = "\n\n".join(f"제{i}조 얼룩말 이동 처리량 측정 기준 {i}. 측정 결과는 매달 보고한다." for i in range(20))
+
+    async def scenario(client):
+        job = await upload_and_wait(client, "얼룩말.txt", text.encode())
+        assert job["status"] == "completed" and job["chunks"] > 0
+
+        first = await client.post("/api/chat/stream", json={"message": "얼룩말 이동 처리량"})
+        second = await client.post("/api/chat/stream", json={"message": "얼룩말 이동 처리량"})
+        return first, second
+
+    first, second = run_app(main, scenario)
+
+    assert first.status_code == 200
+    assert first.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(first.text)
+    assert events[0] == ("sources", ["얼룩말.txt"])
+    tokens = [data for event, data in events if event == "token"]
+    assert "".join(tokens) == "".join(f"답변{i} " for i in range(FAKE_TOKENS))
+    assert events[-1] == ("done", {"chars": len("".join(tokens)), "cached": False})
+
+    # 같은 질문은 답변 캐시에서 한 번에 보낸다
+    events = parse_sse(second.text)
+    assert [event for event, _ in events] == ["sources", "token", "done"]
+    assert events[-1][1]["cached"] is True
+
+
+def test_chat_stream_returns_503_before_streaming_when_busy(main):
+    text = "\n\n".join(f"기린 사육 일지 {i}. 먹이는 하루 두 번 준다." for i in range(10))
+
+    async def scenario(client):
+        job = await upload_and_wait(client, "기린.txt", text.encode())
+        assert job["status"] == "completed"
+        ollama = main.ollama_client
+        max_waiting, ollama.max_waiting = ollama.max_waiting, 0
+        try:
+            # 생성 슬롯을 모두 차지해 대기열이 없는 상태로 만든다
+            async with AsyncExitStack() as stack:
+                for _ in range(ollama.max_concurrency):
+                    await stack.enter_async_context(ollama.slot())
+                busy = await client.post("/api/chat/stream", json={"message": "기린 먹이"})
+            # 슬롯이 풀리면 다시 스트리밍하고, 끝난 뒤에는 슬롯을 모두 돌려준다
+            ok = await client.post("/api/chat/stream", json={"message": "기린 먹이"})
+            return busy, ok, ollama.stats()
+        finally:
+            ollama.max_waiting = max_waiting
+
+    busy, ok, stats = run_app(main, scenario)
+
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "5"
+    assert ok.status_code == 200
+    assert parse_sse(ok.text)[-1][0] == "done"
+    assert stats["active"] == 0
+
+
+def test_chat_stream_rejects_empty_question(main):
+    async def scenario(client):
+        return await client.post("/api/chat/stream", json={"message": "  "})
+
+    assert run_app(main, scenario).status_code == 400
@@ -0,0 +1,65 @@
+from app.services.chunker import SEGMENT_SEPARATOR, iter_chunks
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_search import VectorSearchEngine
+
+
+PAGES = [
+    (1, "# 보안 규정\n\n제1조 목적. 이 규정은 정보 자산을 보호하기 위한 기준을 정한다. " * 3),
+    (2, "비밀번호는 90일마다 변경한다. 관리자는 변경 기록을 보관한다!\n\n1. 신청 절차\n신청서는 팀장이 승인한다. " * 6),
+    (3, "짧은 페이지."),
+    (4, "가" * 2500),  # 경계가 없는 긴 텍스트는 강제로 자른다
+]
+
+
+def test_chunk_offsets_point_into_joined_text():
+    full_text = SEGMENT_SEPARATOR.join(text for _, text in PAGES)
+
+    chunks = list(iter_chunks(PAGES, max_chars=300, overlap_chars=50))
+
+    assert chunks
+    for chunk in chunks:
+        assert full_text[chunk.start:chunk.end] == chunk.text
+        assert len(chunk.text) <= 300
+
+
+def test_chunk_pages_and_order():
+    full_text = SEGMENT_SEPARATOR.join(text for _, text in PAGES)
+    page_starts = []
+    offset = 0
+    for page, text in PAGES:
+        page_starts.append((offset, page))
+        offset += len(text) + len(SEGMENT_SEPARATOR)
+
+    chunks = list(iter_chunks(PAGES, max_chars=300, overlap_chars=50))
+
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    assert [chunk.start for chunk in chunks] == sorted(chunk.start for chunk in chunks)
+    assert chunks[-1].end == len(full_text)
+    for chunk in chunks:
+        # 청크의 페이지는 청크가 시작하는 페이지
+        expected = max(page for start, page in page_starts if start <= chunk.start)
+        assert chunk.page == expected
+
+
+def test_plain_string_segments_have_no_page():
+    chunks = list(iter_chunks(["첫 단락입니다.", "두 번째 단락입니다."], max_chars=1000))
+
+    assert len(chunks) == 1
+    assert chunks[0].page is None
+    assert chunks[0].text == "첫 단락입니다." + SEGMENT_SEPARATOR + "두 번째 단락입니다."
+
+
+def test_engine_stores_segments_without_joining(tmp_path):
+    engine = VectorSearchEngine(str(tmp_path), embedder=HashingEmbedder(), chunk_size=300, chunk_overlap=50)
+    metadata = {"filename": "pages.pdf"}
+
+    def segments():
+        yield from PAGES
+        metadata["pages"] = len(PAGES)  # 세그먼트를 다 소비한 뒤 채운 값도 저장된다
+
+    engine.add_document("pages", content=segments(), metadata=metadata)
+
+    assert engine.read_content("pages") == SEGMENT_SEPARATOR.join(text for _, text in PAGES)
+    assert engine.documents["pages"]["metadata"]["pages"] == len(PAGES)
+    results = engine.search_documents("비밀번호 변경 기록", n_results=3, hybrid=False)
+    assert results and results[0]["page"] == 2
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+
+from app.services.context_builder import build_context, estimate_tokens, merge_adjacent, mmr_order
+
+TEXT = "".join(f"제{i}조 보안 담당자는 매월 접근 기록(log)을 점검하고 결과를 보고한다. " for i in range(200))
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def chunk(document_id, start, end, similarity=0.5, vector=(1, 0, 0), page=None):
+    return {"id": f"{document_id}_{start}", "document_id": document_id, "char_start": start, "char_end": end,
+            "similarity": similarity, "vector": unit(vector), "page": page,
+            "metadata": {"filename": f"{document_id}.txt"}}
+
+
+def read_text(document_id, start, end):
+    return TEXT[start:end]
+
+
+def test_overlapping_neighbouring_chunks_are_emitted_once():
+    chunks = [chunk("a", 100, 300, page=2), chunk("a", 250, 450, page=3), chunk("b", 0, 100),
+              chunk("a", 451, 600, page=3), chunk("a", 900, 1000)]
+
+    pieces = merge_adjacent(chunks)
+
+    assert [(piece.document_id, piece.start, piece.end) for piece in pieces] == [
+        ("a", 100, 600), ("b", 0, 100), ("a", 900, 1000)
+    ]
+    assert pieces[0].chunk_ids == ["a_100", "a_250", "a_451"] and pieces[0].pages == [2, 3]
+
+    context = build_context(chunks, read_text, token_budget=10_000)
+    texts = [piece.text for piece in context if piece.document_id == "a"]
+    assert TEXT[100:600] in texts and sum(text.count(TEXT[250:300]) for text in texts) == 1
+
+
+def test_near_duplicate_chunks_are_demoted():
+    relevance = np.array([0.90, 0.89, 0.80], dtype=np.float32)
+    vectors = np.stack([unit([1, 0, 0]), unit([1, 0.02, 0]), unit([0, 1, 0])])
+
+    assert mmr_order(relevance, vectors) == [0, 2, 1]
+    assert mmr_order(relevance, vectors, lambda_=1.0) == [0, 1, 2]
+
+
+def test_context_never_exceeds_token_budget():
+    rng = random.Random(0)
+    for budget in (20, 60, 200, 1200):
+        chunks = []
+        for i in range(30):
+            start = rng.randrange(0, len(TEXT) - 500)
+            chunks.append(chunk(f"doc{i % 4}", start, start + rng.randint(50, 500), rng.random(),
+                                [rng.random() for _ in range(3)]))
+
+        context = build_context(chunks, read_text, token_budget=budget)
+
+        assert context
+        assert sum(piece.tokens for piece in context) <= budget
+        for piece in context:
+            assert piece.text == TEXT[piece.start:piece.end]
+            assert piece.tokens == estimate_tokens(piece.text) + 8
+
+
+def test_single_oversized_piece_is_truncated_to_budget():
+    # 앞은 한글, 뒤는 영문/숫자라 글자당 토큰 수가 고르지 않다 (비율로만 자르면 예산을 넘는다)
+    text = "가나다라마바사" * 100 + "1234 5678 ABCD " * 50
+
+    [piece] = build_context([chunk("doc", 0, len(text))], lambda *_: text, token_budget=100)
+
+    assert piece.tokens <= 100 and text.startswith(piece.text) and piece.text
@@ -0,0 +1,67 @@
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_search import VectorSearchEngine
+from tests.app_client import run_app, upload_and_wait, wait_for_job
+
+ARTICLES = [f"제{i}조 문서 보존 기간은 {i + 1}년으로 하며, 만료된 문서는 보안 절차에 따라 파기한다." for i in range(30)]
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return super().encode(texts)
+
+
+def test_revised_document_reuses_unchanged_chunks(tmp_path):
+    embedder = CountingEmbedder()
+    engine = VectorSearchEngine(str(tmp_path), embedder=embedder, chunk_size=200, chunk_overlap=0)
+    total = engine.add_document("v1", content="\n\n".join(ARTICLES))
+    embedder.encoded = 0
+
+    revised = list(ARTICLES)
+    revised[10] = "제10조 문서 보존 기간은 영구로 한다."
+    progress = []
+    chunks = engine.add_document("v2", content="\n\n".join(revised), progress=lambda *args: progress.append(args))
+
+    assert engine.counters["chunks_reused"] > 0
+    assert embedder.encoded == chunks - engine.counters["chunks_reused"] < total
+    assert progress[-1] == (chunks, engine.counters["chunks_reused"])
+
+
+def test_identical_upload_is_reported_as_duplicate(main):
+    data = "\n\n".join(f"중복 업로드 확인용 규정 {i}. 같은 파일은 한 번만 색인한다." for i in range(10)).encode()
+
+    async def scenario(client):
+        job = await upload_and_wait(client, "원본.txt", data)
+        jobs_before = len((await client.get("/api/jobs")).json()["jobs"])
+        again = await client.post("/api/upload", files=[("files", ("사본.txt", data, "text/plain"))])
+        jobs_after = len((await client.get("/api/jobs")).json()["jobs"])
+        return job, again, jobs_before, jobs_after
+
+    job, again, jobs_before, jobs_after = run_app(main, scenario)
+
+    assert job["status"] == "completed"
+    assert again.status_code == 202
+    [duplicate] = again.json()["jobs"]
+    assert duplicate["status"] == "duplicate" and duplicate["job_id"] is None
+    assert duplicate["document_id"] == job["document_id"] and duplicate["existing_filename"] == "원본.txt"
+    assert jobs_after == jobs_before
+
+
+def test_identical_files_in_one_request_share_a_job(main):
+    data = "\n\n".join(f"같은 요청 안의 중복 파일 {i}." for i in range(10)).encode()
+
+    async def scenario(client):
+        response = await client.post("/api/upload", files=[("files", ("a.txt", data, "text/plain")),
+                                                            ("files", ("b.txt", data, "text/plain"))])
+        first, second = response.json()["jobs"]
+        return first, second, await wait_for_job(client, first["job_id"])
+
+    first, second, job = run_app(main, scenario)
+
+    assert job["status"] == "completed"
+    assert second["job_id"] == first["job_id"]
+    assert second["document_id"] == first["document_id"]
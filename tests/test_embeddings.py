@@ -0,0 +1,73 @@
+import asyncio
+
+import numpy as np
+
+from app.services.embeddings import EmbeddingCache, EmbeddingService, HashingEmbedder
+
+
+def test_encode_matches_embedder_and_uses_cache():
+    embedder = HashingEmbedder()
+    service = EmbeddingService(embedder)
+    texts = ["보안 규정", "비밀번호 변경 절차", "보안 규정"]
+
+    vectors = service.encode(texts)
+
+    np.testing.assert_allclose(vectors, embedder.encode(texts), rtol=1e-6)
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+
+
+def test_embed_batches_concurrent_callers():
+    embedder = HashingEmbedder()
+
+    async def run():
+        service = EmbeddingService(embedder, max_wait_ms=50)
+        results = await asyncio.gather(
+            service.embed(["첫 번째 질문"]),
+            service.embed(["두 번째 질문", "세 번째 질문"]),
+        )
+        return results
+
+    first, second = asyncio.run(run())
+    np.testing.assert_allclose(first, embedder.encode(["첫 번째 질문"]), rtol=1e-6)
+    np.testing.assert_allclose(second, embedder.encode(["두 번째 질문", "세 번째 질문"]), rtol=1e-6)
+
+
+def test_cancelled_waiter_does_not_shift_other_results():
+    """배치 중 한 대기자가 취소되어도 나머지는 자기 텍스트의 벡터를 받아야 한다"""
+    embedder = HashingEmbedder()
+
+    async def run():
+        service = EmbeddingService(embedder, max_wait_ms=50)
+        cancelled = asyncio.create_task(service.embed(["취소될 질문", "함께 취소될 질문"]))
+        middle = asyncio.create_task(service.embed(["두 번째 질문"]))
+        last = asyncio.create_task(service.embed(["세 번째 질문"]))
+        await asyncio.sleep(0)  # 세 요청이 같은 배치에 들어가도록
+        cancelled.cancel()
+        return await middle, await last, cancelled.cancelled()
+
+    middle, last, was_cancelled = asyncio.run(run())
+    assert was_cancelled
+    np.testing.assert_allclose(middle, embedder.encode(["두 번째 질문"]), rtol=1e-6)
+    np.testing.assert_allclose(last, embedder.encode(["세 번째 질문"]), rtol=1e-6)
+
+
+def test_cache_hits_batch_last_used_updates(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    vector = np.ones(4, dtype=np.float32)
+    keys = [bytes([i]) * 32 for i in range(4)]
+    cache.put_many([(key, vector) for key in keys[:3]])
+    cache.memory.clear()
+
+    statements = []
+    cache.conn.set_trace_callback(statements.append)
+    assert set(cache.get_many([keys[0]])) == {keys[0]}
+    assert set(cache.get_many([keys[0]])) == {keys[0]}
+    cache.conn.set_trace_callback(None)
+
+    # 조회할 때마다 쓰지 않고, 사용 시각은 모아 두었다가 기록한다
+    assert not [sql for sql in statements if sql.startswith(("UPDATE", "COMMIT"))]
+
+    # 넘쳐서 제거할 때는 모아 둔 사용 시각이 반영되어 방금 쓴 항목이 남는다
+    cache.put_many([(keys[3], vector)])
+    cache.memory.clear()
+    assert set(cache.get_many(keys)) == {keys[0], keys[2], keys[3]}
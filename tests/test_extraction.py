@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.services import extraction
+from app.services.extraction import DocumentExtractor
+
+
+def hang(file_path):
+    time.sleep(60)
+
+
+def slow_unless_stuck(file_path):
+    if "stuck" in file_path:
+        time.sleep(60)
+    time.sleep(0.5)
+    return [file_path]
+
+
+def wait_until_gone(pid: int, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_timeout_replaces_pool_and_terminates_stuck_worker(monkeypatch):
+    extractor = DocumentExtractor(max_workers=1, timeout=0.5)
+    try:
+        extractor.start()
+        old = extractor.executor
+        worker = old.submit(os.getpid).result(timeout=10)
+        monkeypatch.setattr(extraction, "_extract_docx_paragraphs", hang)
+
+        with pytest.raises(TimeoutError, match="DOCX"):
+            asyncio.run(extractor.extract_docx_paragraphs("stuck.docx"))
+
+        # 새 작업은 멈춘 워커를 기다리지 않고 새 풀에서 바로 실행된다
+        assert extractor.executor is not old
+        assert extractor.executor.submit(extraction._warm_up).result(timeout=10) is None
+        assert wait_until_gone(worker)
+    finally:
+        extractor.shutdown()
+
+
+def test_timeout_requeues_other_documents_jobs(monkeypatch, caplog):
+    extractor = DocumentExtractor(max_workers=2, timeout=1.5)
+    monkeypatch.setattr(extraction, "_extract_docx_paragraphs", slow_unless_stuck)
+
+    async def healthy():
+        # 멈춘 작업의 시간 제한이 끝날 때 같은 풀에서 실행 중이도록 늦게 시작
+        await asyncio.sleep(1.2)
+        return await extractor.extract_docx_paragraphs("healthy.docx")
+
+    async def scenario():
+        return await asyncio.gather(extractor.extract_docx_paragraphs("stuck.docx"), healthy(),
+                                    return_exceptions=True)
+
+    try:
+        extractor.start()
+        stuck, result = asyncio.run(scenario())
+    finally:
+        extractor.shutdown()
+
+    # 시간 초과된 문서만 실패하고, 같은 풀에 있던 다른 문서의 작업은 새 풀에서 다시 실행된다
+    assert isinstance(stuck, TimeoutError)
+    assert result == ["healthy.docx"]
+    assert "새 풀에서 다시 실행" in caplog.text
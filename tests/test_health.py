@@ -0,0 +1,58 @@
+import httpx
+
+from benchmarks.app_benchmark import create_fake_ollama
+from tests.app_client import run_app
+
+
+def unreachable(request):
+    raise httpx.ConnectError("연결 거부", request=request)
+
+
+def without_model(request):
+    return httpx.Response(200, json={"models": [{"name": "other-model:latest"}]})
+
+
+def check_health(main, transport, monkeypatch=None, engine_loaded=True):
+    """백그라운드 확인을 멈추고 주어진 전송 계층으로 한 번 확인한 뒤 /api/health 응답 반환"""
+    async def scenario(client):
+        ollama = main.ollama_client
+        await ollama.stop_health_checks()
+        ollama._health_client = httpx.AsyncClient(transport=transport, base_url="http://ollama")
+        await ollama.check_health()
+        if not engine_loaded:
+            monkeypatch.setattr(main, "vector_engine", None)
+        return await client.get("/api/health")
+
+    return run_app(main, scenario)
+
+
+def test_health_ok_when_ollama_has_the_model(main):
+    response = check_health(main, httpx.ASGITransport(app=create_fake_ollama(1, 0)))
+
+    body = response.json()
+    assert response.status_code == 200 and body["status"] == "ok"
+    assert body["ollama"]["ready"] and body["ollama"]["error"] is None
+    assert body["index"]["total_chunks"] >= 0 and "queued" in body["ingestion"]
+
+
+def test_health_degraded_when_ollama_is_unreachable(main):
+    response = check_health(main, httpx.MockTransport(unreachable))
+
+    body = response.json()
+    assert response.status_code == 200 and body["status"] == "degraded"
+    assert body["ollama"]["ready"] is False and "연결 거부" in body["ollama"]["error"]
+    assert body["index"] is not None  # 검색은 계속 된다
+
+
+def test_health_degraded_when_model_is_missing(main):
+    body = check_health(main, httpx.MockTransport(without_model)).json()
+
+    assert body["status"] == "degraded"
+    assert body["ollama"]["model_available"] is False and main.MODEL_NAME in body["ollama"]["error"]
+
+
+def test_health_unavailable_without_index(main, monkeypatch):
+    response = check_health(main, httpx.ASGITransport(app=create_fake_ollama(1, 0)), monkeypatch, engine_loaded=False)
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable" and response.json()["index"] is None
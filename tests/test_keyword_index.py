@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.services.keyword_index import KeywordIndex
+
+
+def test_scores_stay_positive_with_unmerged_deletions(tmp_path):
+    index = KeywordIndex(str(tmp_path))
+    alive = np.ones(12, dtype=np.uint8)
+    for doc_start in range(0, 12, 2):
+        index.add(doc_start, doc_start, ["보안 규정 예산", "보안 규정 일정"])
+    # 삭제된 행은 블록이 병합될 때까지 df에 남는다
+    for doc_start in range(0, 8, 2):
+        index.mark_deleted(doc_start, 2)
+        alive[doc_start:doc_start + 2] = 0
+
+    rows, scores = index.search("보안 규정", 12, 10, alive)
+
+    assert sorted(rows.tolist()) == [8, 9, 10, 11]
+    assert np.all(np.isfinite(scores)) and np.all(scores > 0)
+
+
+def test_compact_keeps_live_results(tmp_path):
+    index = KeywordIndex(str(tmp_path))
+    alive = np.ones(40, dtype=np.uint8)
+    for doc_start in range(0, 40, 4):
+        index.add(doc_start, doc_start, [f"문서{doc_start} 보안", "예산 계약", "보안 보안 규정", "일정"])
+    index.mark_deleted(0, 4)
+    alive[0:4] = 0
+
+    before, _ = index.search("보안", 40, 40, alive)
+    assert index.compact(alive, dead_fraction=0.1) > 0
+    after, _ = index.search("보안", 40, 40, alive)
+
+    assert sorted(after.tolist()) == sorted(before.tolist())
+    assert not set(after.tolist()) & {0, 1, 2, 3}
+    assert index.stats()["blocks"] < 10
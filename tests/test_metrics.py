@@ -0,0 +1,101 @@
+import asyncio
+import re
+
+import httpx
+from fastapi import FastAPI
+
+from app.services.metrics import MetricsMiddleware, MetricsRegistry, stage_timer
+from tests.app_client import run_app
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+SERVER_TIMING = re.compile(r"^[a-z_]+;dur=\d+\.\d$")
+
+
+def parse_exposition(text: str):
+    """Prometheus 텍스트 형식 검사 후 {이름: [(라벨 문자열, 값)]} 반환"""
+    assert text.endswith("\n")
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram")
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.group(1), match.group(2) or "", match.group(3)
+        base = re.sub(r"_(bucket|sum|count)$", "", name)
+        assert name in types or base in types, f"TYPE 없는 지표: {name}"
+        samples.setdefault(name, []).append((labels, float(value)))
+    return samples, types
+
+
+def make_app(registry, server_timing=True):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, server_timing=server_timing, registry=registry)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        with stage_timer("lookup"):
+            pass
+        with stage_timer("lookup"):
+            pass
+        return {"id": item_id}
+
+    return app
+
+
+def get(app, *paths):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(run())
+
+
+def test_middleware_adds_server_timing_and_counts_by_route_template():
+    registry = MetricsRegistry()
+    response, _, _ = get(make_app(registry), "/items/1", "/items/2", "/missing")
+
+    entries = response.headers["server-timing"].split(", ")
+    assert all(SERVER_TIMING.match(entry) for entry in entries)
+    # 같은 단계는 합산해 한 번만, 전체 시간은 마지막에
+    assert [entry.split(";")[0] for entry in entries] == ["lookup", "total"]
+
+    samples, types = parse_exposition(registry.render())
+    assert types["docsearch_http_requests_total"] == "counter"
+    assert ('{method="GET",route="/items/{item_id}",status="200"}', 2.0) in samples["docsearch_http_requests_total"]
+    assert ('{method="GET",route="unmatched",status="404"}', 1.0) in samples["docsearch_http_requests_total"]
+
+    buckets = [value for labels, value in samples["docsearch_http_request_duration_seconds_bucket"]
+               if 'route="/items/{item_id}"' in labels]
+    assert buckets == sorted(buckets) and buckets[-1] == 2.0
+    assert 'le="+Inf"' in samples["docsearch_http_request_duration_seconds_bucket"][len(buckets) - 1][0]
+
+
+def test_server_timing_can_be_turned_off():
+    [response] = get(make_app(MetricsRegistry(), server_timing=False), "/items/1")
+    assert "server-timing" not in response.headers
+
+
+def test_metrics_endpoint_and_search_server_timing(main):
+    async def scenario(client):
+        search = await client.post("/api/search", json={"query": "지표 확인"})
+        return search, await client.get("/metrics")
+
+    search, response = run_app(main, scenario)
+
+    timings = [entry.split(";")[0] for entry in search.headers["server-timing"].split(", ")]
+    assert {"query_embedding", "retrieval", "total"} <= set(timings)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples, types = parse_exposition(response.text)
+    assert types["docsearch_stage_duration_seconds"] == "histogram"
+    stages = {labels for labels, _ in samples["docsearch_stage_duration_seconds_count"]}
+    assert {'{stage="query_embedding"}', '{stage="retrieval"}'} <= stages
+    assert types["docsearch_uploads_total"] == "counter"
+    assert types["docsearch_cache_hit_ratio"] == "gauge"
+    assert any(labels.startswith('{method="POST",route="/api/search"')
+               for labels, _ in samples["docsearch_http_requests_total"])
@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import extraction
+from app.services.extraction import DocumentExtractor
+from app.services.page_cache import PageTextCache
+from benchmarks.app_benchmark import PDF_LINE_CHARS, PDF_LINES_PER_PAGE, make_pdf
+from tests.app_client import run_app, wait_for_job
+
+PAGE_CHARS = PDF_LINE_CHARS * PDF_LINES_PER_PAGE
+
+
+def pdf_pages(texts) -> bytes:
+    """make_pdf가 페이지를 나누는 길이에 맞춰 페이지마다 한 텍스트가 들어가는 PDF"""
+    return make_pdf("".join(text.ljust(PAGE_CHARS) for text in texts))
+
+
+def extract(extractor, path):
+    async def run():
+        return [page async for page in extractor.iter_pdf_pages(str(path))]
+    return asyncio.run(run())
+
+
+def test_revised_pdf_only_extracts_changed_pages(tmp_path, monkeypatch):
+    extracted = []
+
+    def counting(file_path, indices):
+        extracted.extend(indices)
+        return real(file_path, indices)
+
+    real = extraction._extract_pdf_pages
+    monkeypatch.setattr(extraction, "_extract_pdf_pages", counting)
+    extractor = DocumentExtractor(2, pages_per_task=2, page_cache=PageTextCache(str(tmp_path / "pages.sqlite3")))
+    extractor._executor = ThreadPoolExecutor(2)  # 호출을 셀 수 있게 같은 프로세스에서 실행
+    texts = [f"Chapter {i} covers retention rule {i}." for i in range(6)]
+    original, revised = tmp_path / "v1.pdf", tmp_path / "v2.pdf"
+    original.write_bytes(pdf_pages(texts))
+    texts[3] = "Chapter 3 was rewritten in the revised edition."
+    revised.write_bytes(pdf_pages(texts))
+    try:
+        first = extract(extractor, original)
+        assert sorted(extracted) == list(range(6))
+
+        extracted.clear()
+        assert extract(extractor, original) == first
+        assert extracted == []
+
+        pages = extract(extractor, revised)
+        assert extracted == [3]
+        assert [number for number, _ in pages] == list(range(1, 7))
+        assert "rewritten" in pages[3][1] and pages[2] == first[2]
+    finally:
+        extractor.shutdown()
+
+
+def test_retry_reuses_pages_extracted_by_failed_attempt(main, monkeypatch):
+    texts = [f"Okapi survey section {i} lists sightings by region." for i in range(4)]
+    real = None  # 엔진은 시작할 때 만들어진다
+    attempts = []
+
+    def fail_once(document_id, content, **options):
+        if not attempts:
+            attempts.append(sum(1 for _ in content))  # 페이지를 모두 추출한 뒤 색인 단계에서 실패
+            raise RuntimeError("색인 실패")
+        attempts.append("retry")
+        return real(document_id, content, **options)
+
+    async def scenario(client):
+        nonlocal real
+        real = main.vector_engine.add_document
+        monkeypatch.setattr(main.vector_engine, "add_document", fail_once)
+        response = await client.post("/api/upload", files=[("files", ("okapi.pdf", pdf_pages(texts), "application/pdf"))])
+        job_id = response.json()["jobs"][0]["job_id"]
+        failed = await wait_for_job(client, job_id)
+        not_failed = await client.post("/api/jobs/unknown/retry")
+        hits = main.page_cache.hits
+        retry = await client.post(f"/api/jobs/{job_id}/retry")
+        done = await wait_for_job(client, job_id)
+        again = await client.post(f"/api/jobs/{job_id}/retry")
+        return failed, not_failed, retry, done, again, main.page_cache.hits - hits
+
+    failed, not_failed, retry, done, again, hits = run_app(main, scenario)
+
+    assert failed["status"] == "failed" and "색인 실패" in failed["error"]
+    assert not_failed.status_code == 404
+    assert retry.status_code == 202
+    assert done["status"] == "completed" and done["pages"] == 4
+    assert again.status_code == 409
+    assert hits == 4 and attempts == [4, "retry"]
+
+
+def test_row_count_is_kept_without_recounting(tmp_path):
+    cache = PageTextCache(str(tmp_path / "pages.sqlite3"), max_pages=10)
+    cache.put_many({f"page{i}": f"text {i}" for i in range(6)})
+    cache.put_many({f"page{i}": "updated" for i in range(4, 12)})  # 2개는 기존 키
+
+    assert cache.stats()["entries"] == 10
+    assert cache.get_many(["page5"]) == {"page5": "updated"}
+    assert cache.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 10
+    # 다시 열면 한 번 센 값에서 시작한다
+    assert PageTextCache(str(tmp_path / "pages.sqlite3"), max_pages=10).stats()["entries"] == 10
@@ -0,0 +1,49 @@
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_search import VectorSearchEngine
+from tests.test_vector_search import make_text, search_ids
+
+
+def make_engine(index_dir):
+    # 세그먼트를 작게 잡아 병합이 일어나게 한다
+    return VectorSearchEngine(str(index_dir), embedder=HashingEmbedder(), chunk_size=200, chunk_overlap=20,
+                              segment_rows=8, max_segments=2, dead_fraction=0.3)
+
+
+def test_compaction_reclaims_deleted_rows_and_keeps_results(tmp_path):
+    writer = make_engine(tmp_path)
+    reader = make_engine(tmp_path)
+    texts = {f"doc{i}": make_text(i) for i in range(12)}
+    for document_id, text in texts.items():
+        writer.add_document(document_id, content=text)
+    for document_id in ("doc1", "doc4", "doc7"):
+        assert writer.remove_document(document_id) > 0
+        texts.pop(document_id)
+    assert writer.stats()["deleted_chunks"] > 0
+
+    # 키워드 df는 병합 때 삭제된 행이 빠지며 바뀌므로 벡터 결과로 비교한다
+    before = search_ids(writer, "보안 규정 예산", hybrid=False)
+    result = writer.compact()
+
+    assert result["merges"] > 0 and result["reclaimed_rows"] > 0
+    assert writer.stats()["deleted_chunks"] == 0
+    assert search_ids(writer, "보안 규정 예산", hybrid=False) == before
+    assert search_ids(reader, "보안 규정 예산", hybrid=False) == before
+    assert search_ids(reader, "보안 규정 예산") == search_ids(writer, "보안 규정 예산")
+    assert {result["document_id"] for result in writer.search_documents("보안", n_results=50)} <= set(texts)
+
+    # 병합 후에도 본문 범위 읽기가 그대로다
+    for document_id, text in texts.items():
+        assert reader.read_content(document_id) == text
+        assert reader.read_content(document_id, 5, 40) == text[5:40]
+
+
+def test_compacted_index_reopens(tmp_path):
+    engine = make_engine(tmp_path)
+    for i in range(6):
+        engine.add_document(f"doc{i}", content=make_text(i))
+    engine.remove_document("doc0")
+    engine.compact()
+
+    reopened = make_engine(tmp_path)
+    assert sorted(reopened.list_documents()) == [f"doc{i}" for i in range(1, 6)]
+    assert search_ids(reopened, "비밀번호 변경") == search_ids(engine, "비밀번호 변경")
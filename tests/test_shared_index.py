@@ -0,0 +1,50 @@
+import multiprocessing
+
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_search import VectorSearchEngine
+from tests.test_vector_search import make_text, search_ids
+
+
+def make_engine(index_dir):
+    return VectorSearchEngine(str(index_dir), embedder=HashingEmbedder(), chunk_size=200, chunk_overlap=20)
+
+
+def add_documents(index_dir: str, worker: int):
+    engine = make_engine(index_dir)
+    for i in range(5):
+        engine.add_document(f"w{worker}-doc{i}", content=make_text(worker * 10 + i))
+
+
+def test_changes_are_visible_across_instances(tmp_path):
+    writer = make_engine(tmp_path)
+    reader = make_engine(tmp_path)
+    texts = {f"doc{i}": make_text(i) for i in range(6)}
+
+    for document_id, text in texts.items():
+        writer.add_document(document_id, content=text, metadata={"filename": f"{document_id}.txt"})
+    # 다른 인스턴스는 refresh(검색 시작 시 호출)에서 새 세대를 읽는다
+    assert reader.refresh()
+    assert not reader.refresh()
+    assert set(reader.list_documents()) == set(texts)
+    assert search_ids(reader, "비밀번호 변경 절차") == search_ids(writer, "비밀번호 변경 절차")
+
+    assert reader.remove_document("doc1") > 0
+    assert writer.refresh()
+    assert "doc1" not in writer.list_documents()
+    assert "doc1" not in {result["document_id"] for result in writer.search_documents("문서1", n_results=20)}
+
+
+def test_concurrent_writer_processes_do_not_lose_documents(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=add_documents, args=(str(tmp_path), worker)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    engine = make_engine(tmp_path)
+    assert sorted(engine.list_documents()) == sorted(f"w{w}-doc{i}" for w in range(3) for i in range(5))
+    for document_id in engine.list_documents():
+        worker, i = int(document_id[1]), int(document_id[-1])
+        assert engine.read_content(document_id) == make_text(worker * 10 + i)
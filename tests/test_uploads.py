@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.services.uploads import MultipartUploadReceiver, UploadTooLargeError
+from tests.app_client import run_app
+
+BOUNDARY = "test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def multipart_body(files, field="files") -> bytes:
+    body = b""
+    for filename, data in files:
+        body += (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode() + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def stream(body: bytes, chunk_size: int = 1000):
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def receive(receiver, body):
+    return asyncio.run(receiver.receive(CONTENT_TYPE, stream(body)))
+
+
+def make_receiver(upload_dir, max_file_size=10_000, max_files=3):
+    return MultipartUploadReceiver(str(upload_dir), max_file_size, max_files, ("pdf", "txt", "md", "docx"))
+
+
+def test_saves_files_by_content_hash(tmp_path):
+    receiver = make_receiver(tmp_path)
+    data = "보안 규정 본문".encode() * 100
+
+    saved = receive(receiver, multipart_body([("규정.txt", data), ("copy.md", b"# title")]))
+
+    assert [upload.filename for upload in saved] == ["규정.txt", "copy.md"]
+    assert saved[0].sha256 == hashlib.sha256(data).hexdigest()
+    assert saved[0].filepath == os.path.join(str(tmp_path), f"{saved[0].sha256}.txt")
+    assert saved[0].size == len(data)
+    with open(saved[0].filepath, 'rb') as f:
+        assert f.read() == data
+
+
+def test_rejects_file_over_size_limit_and_cleans_up(tmp_path):
+    receiver = make_receiver(tmp_path, max_file_size=1000)
+
+    with pytest.raises(UploadTooLargeError):
+        receive(receiver, multipart_body([("ok.txt", b"a" * 500), ("big.txt", b"b" * 1001)]))
+
+    # 같은 요청에서 먼저 저장된 파일과 쓰던 임시 파일 모두 지운다
+    assert os.listdir(tmp_path) == []
+
+
+def test_rejects_too_many_files(tmp_path):
+    receiver = make_receiver(tmp_path, max_files=2)
+
+    with pytest.raises(ValueError, match="최대 2개"):
+        receive(receiver, multipart_body([(f"{i}.txt", f"문서 {i}".encode()) for i in range(3)]))
+    assert os.listdir(tmp_path) == []
+
+
+def test_rejects_unsupported_extension_and_empty_request(tmp_path):
+    receiver = make_receiver(tmp_path)
+
+    with pytest.raises(ValueError, match="지원하지 않는 파일 형식"):
+        receive(receiver, multipart_body([("run.exe", b"MZ")]))
+    with pytest.raises(ValueError, match="업로드할 파일이 없습니다"):
+        receive(receiver, multipart_body([("note.txt", b"ignored")], field="comment"))
+
+
+def test_max_request_size_allows_all_files_at_limit(tmp_path):
+    receiver = make_receiver(tmp_path, max_file_size=1000, max_files=3)
+    body = multipart_body([(f"{i}.txt", bytes([65 + i]) * 1000) for i in range(3)])
+
+    assert len(body) <= receiver.max_request_size
+    assert len(receive(receiver, body)) == 3
+
+
+def test_upload_over_request_limit_is_rejected_before_reading(main):
+    async def scenario(client):
+        return await client.post(
+            "/api/upload", content=b"x",
+            headers={"content-type": "multipart/form-data; boundary=x",
+                     "content-length": str(main.upload_receiver.max_request_size + 1)}
+        )
+
+    assert run_app(main, scenario).status_code == 413
@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_search import VectorSearchEngine
+
+WORDS = "보안 규정 비밀번호 변경 절차 승인 예산 계약 보고서 일정 backup recovery incident budget".split()
+
+
+def make_engine(index_dir, **options):
+    return VectorSearchEngine(str(index_dir), embedder=HashingEmbedder(), chunk_size=200, chunk_overlap=20, **options)
+
+
+def make_text(seed: int) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))) + f" 문서{seed}."
+        for _ in range(rng.randint(5, 15))
+    )
+
+
+def search_ids(engine, query, hybrid=True):
+    return [(result["id"], result["content"]) for result in engine.search_documents(query, n_results=10, hybrid=hybrid)]
+
+
+def test_vector_search_matches_brute_force(tmp_path):
+    engine = make_engine(tmp_path)
+    for i in range(8):
+        engine.add_document(f"doc{i}", content=make_text(i))
+    query = "비밀번호 변경 승인 절차"
+    query_vector = engine.embedder.encode([query])[0]
+
+    everything = engine.search_documents(query, n_results=10_000, score_threshold=-1.0, hybrid=False,
+                                         include_vectors=True)
+    assert len(everything) == engine.stats()["total_chunks"]
+    expected = sorted(everything, key=lambda result: -float(result["vector"] @ query_vector))[:5]
+
+    results = engine.search_documents(query, n_results=5, score_threshold=-1.0, hybrid=False)
+
+    assert [result["id"] for result in results] == [result["id"] for result in expected]
+    assert np.allclose([result["similarity"] for result in results],
+                       [float(result["vector"] @ query_vector) for result in expected], atol=1e-4)
+
+
+def test_remove_document_hides_its_chunks(tmp_path):
+    engine = make_engine(tmp_path)
+    for i in range(4):
+        engine.add_document(f"doc{i}", content=make_text(i))
+
+    assert engine.remove_document("doc2") > 0
+    assert engine.remove_document("doc2") == 0
+
+    results = engine.search_documents("문서2 보안 규정", n_results=50, score_threshold=-1.0)
+    assert results and "doc2" not in {result["document_id"] for result in results}
+    assert engine.list_documents() == ["doc0", "doc1", "doc3"]
+
+
+def test_replace_and_reload(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.add_document("doc", content=make_text(1))
+    engine.add_document("doc", content=make_text(2), metadata={"filename": "v2.txt"})
+
+    # 다시 열면 저장된 행렬을 매핑만 하고 재임베딩하지 않는다
+    reloaded = make_engine(tmp_path)
+    reloaded.embedder = None
+    assert reloaded.list_documents() == ["doc"]
+    assert reloaded.read_content("doc") == make_text(2)
+    query_vector = engine.embedder.encode(["문서2"])[0]
+    assert ([result["id"] for result in reloaded.search_documents("문서2", query_vector=query_vector)]
+            == [result["id"] for result in engine.search_documents("문서2", query_vector=query_vector)])
+
+
+def test_content_reads_reuse_decompressed_blocks(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.add_document("doc", content=make_text(3))
+    engine.add_document("other", content=make_text(4))
+
+    first = search_ids(engine, "보안 규정")
+    stats = engine.content.cache_stats()
+    assert search_ids(engine, "보안 규정") == first
+    after = engine.content.cache_stats()
+    assert after["block_misses"] == stats["block_misses"] and after["block_hits"] > stats["block_hits"]
+
+    # 문서를 교체하면 이전 본문의 블록은 캐시에서 빠진다
+    engine.add_document("doc", content=make_text(5))
+    assert engine.read_content("doc") == make_text(5)